@@ -1,9 +1,15 @@
+from collections import Counter
+
 import pytest
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APIClient
 from pytest_factoryboy import register
 
 from leads.tests.factories import LeadsFactory, UserFactory, OrganizerUserFactory, AgentFactory, CategoryFactory
+from simplecrm.query_inspector import fingerprint
 
 register(LeadsFactory)
 register(UserFactory)
@@ -14,6 +20,46 @@ register(CategoryFactory)
 User = get_user_model()
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Cached responses shouldn't leak from one test to another"""
+    cache.clear()
+
+
+def repeated_queries(queries):
+    """[(fingerprint, count)] of the statements that ran more than once"""
+    counts = Counter(fingerprint(query["sql"]) for query in queries)
+    return [(sql, count) for sql, count in counts.most_common() if count > 1]
+
+
+@pytest.fixture()
+def query_budget(db):
+    """
+        query_budget(budget, request, label) calls request() and fails when it made more than `budget`
+        queries, with the repeated statements (usually an N+1) in the message.
+        Streaming responses are consumed while the queries are counted.
+        Returns the response and the number of queries.
+    """
+
+    def check(budget, request, label="request"):
+        with CaptureQueriesContext(connection) as context:
+            response = request()
+            if getattr(response, "streaming", False):
+                b"".join(response.streaming_content)
+
+        queries = context.captured_queries
+        if len(queries) > budget:
+            repeated = repeated_queries(queries)
+            if repeated:
+                details = "Repeated queries:\n" + "\n".join(f"  {count}x {sql}" for sql, count in repeated)
+            else:
+                details = "Queries:\n" + "\n".join(f"  {query['sql']}" for query in queries)
+            pytest.fail(f"{label}: {len(queries)} queries, budget {budget}\n{details}", pytrace=False)
+        return response, len(queries)
+
+    return check
+
+
 @pytest.fixture()
 def api_client():
     return APIClient()
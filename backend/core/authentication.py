@@ -0,0 +1,229 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+USER_CACHE_TIMEOUT = 60
+
+ROLE_CLAIM = "role"
+ORGANIZER_CLAIM = "organizer_id"
+AGENT_CLAIM = "agent_id"
+ROLE_VERSION_CLAIM = "role_version"
+
+# one-to-one roles of a user, see leads.models
+ROLES = {
+    "organizeruser": ["id", "user_id"],
+    "agent": ["id", "user_id", "organizer_id"],
+}
+
+
+def user_cache_key(user_id):
+    return f"core:auth:user:{user_id}"
+
+
+def role_version_key(user_id):
+    return f"core:auth:role_version:{user_id}"
+
+
+def invalidate_cached_user(user_id):
+    keys = [user_cache_key(user_id), role_version_key(user_id)]
+    cache.delete_many(keys)
+    if transaction.get_connection().in_atomic_block:
+        # a request may read the old rows and cache them again until the change commits
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def dump_user(user):
+    """
+        Fields of the user and its role rows, without the password hash.
+        load_user() leaves the password deferred, so it is fetched only if something needs it
+        and user.save() doesn't overwrite it.
+    """
+    fields = {
+        field.attname: getattr(user, field.attname)
+        for field in user._meta.concrete_fields
+        if field.attname != "password"
+    }
+    roles = {}
+    for accessor, role_fields in ROLES.items():
+        role = getattr(user, accessor, None)
+        roles[accessor] = None if role is None else [getattr(role, name) for name in role_fields]
+    return {"fields": fields, "roles": roles}
+
+
+def load_user(data, using="default"):
+    """Build the user and its role rows from dump_user() data, without any query"""
+    User = get_user_model()
+    user = User.from_db(using, list(data["fields"]), list(data["fields"].values()))
+    for accessor, values in data["roles"].items():
+        relation = User._meta.get_field(accessor)
+        if values is None:
+            # user.organizeruser raises DoesNotExist without a query
+            relation.set_cached_value(user, None)
+            continue
+        role = relation.related_model.from_db(using, ROLES[accessor], values)
+        relation.remote_field.set_cached_value(role, user)
+        relation.set_cached_value(user, role)
+    return user
+
+
+def get_cached_user(user_id):
+    """
+        The user with its organizeruser / agent. One query with joins on a cache miss, none on a hit.
+        Entries are deleted when the user or its roles change (core.signals, leads.signals).
+    """
+    data = cache.get(user_cache_key(user_id))
+    if data is not None:
+        return load_user(data)
+
+    User = get_user_model()
+    try:
+        user = User.objects.select_related(*ROLES).get(**{api_settings.USER_ID_FIELD: user_id})
+    except User.DoesNotExist:
+        return None
+    cache.set(user_cache_key(user_id), dump_user(user), USER_CACHE_TIMEOUT)
+    return user
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that reads the user and its role from the cache"""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = get_cached_user(user_id)
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        return user
+
+
+def get_role_version(user_id):
+    """
+        Current role_version of the user, None if the user doesn't exist.
+        Cached until the user is saved, at most USER_CACHE_TIMEOUT seconds.
+    """
+    version = cache.get(role_version_key(user_id))
+    if version is None:
+        version = (
+            get_user_model()
+            .objects.filter(**{api_settings.USER_ID_FIELD: user_id})
+            .values_list("role_version", flat=True)
+            .first()
+        )
+        if version is not None:
+            cache.set(role_version_key(user_id), version, USER_CACHE_TIMEOUT)
+    return version
+
+
+def get_role_claims(user):
+    """Claims added to the tokens of the user, see RoleTokenUser"""
+    if user.is_superuser:
+        role = "superuser"
+    elif user.is_organizer:
+        role = "organizer"
+    elif user.is_agent:
+        role = "agent"
+    else:
+        role = None
+
+    organizer = getattr(user, "organizeruser", None) if role == "organizer" else None
+    agent = getattr(user, "agent", None) if role == "agent" else None
+    return {
+        ROLE_CLAIM: role,
+        ORGANIZER_CLAIM: organizer and organizer.pk,
+        AGENT_CLAIM: agent and agent.pk,
+        ROLE_VERSION_CLAIM: user.role_version,
+    }
+
+
+class RoleTokenUser(TokenUser):
+    """
+        Request user built from the role claims of the token, without loading the user.
+        It answers what the leads API asks: is_superuser / is_organizer / is_agent and the
+        caller's organizeruser / agent (unsaved instances that only hold the pk).
+    """
+
+    @cached_property
+    def role(self):
+        return self.token.get(ROLE_CLAIM)
+
+    @cached_property
+    def is_superuser(self):
+        return self.role == "superuser"
+
+    @cached_property
+    def is_organizer(self):
+        return self.role == "organizer"
+
+    @cached_property
+    def is_agent(self):
+        return self.role == "agent"
+
+    @cached_property
+    def organizeruser(self):
+        return self._role_instance("organizeruser", self.token.get(ORGANIZER_CLAIM))
+
+    @cached_property
+    def agent(self):
+        return self._role_instance("agent", self.token.get(AGENT_CLAIM))
+
+    def _role_instance(self, accessor, pk):
+        model = get_user_model()._meta.get_field(accessor).related_model
+        if pk is None:
+            raise model.DoesNotExist(f"User has no {accessor}.")
+        return model.from_db(None, ["id", "user_id"], [pk, self.id])
+
+
+class TokenClaimsAuthentication(JWTAuthentication):
+    """
+        Trusts the role claims of the token and returns a RoleTokenUser. The only check against the
+        user is its role_version (cached), so a token issued before a role change is rejected.
+        Tokens without role claims are left to the next authentication class.
+    """
+
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        if ROLE_VERSION_CLAIM not in validated_token:
+            return None
+
+        return self.get_user(validated_token), validated_token
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        role_version = get_role_version(user_id)
+        if role_version is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if role_version != validated_token[ROLE_VERSION_CLAIM]:
+            raise AuthenticationFailed(
+                _("User roles have changed, please log in again"), code="role_changed"
+            )
+
+        return RoleTokenUser(validated_token)
+
+
+# the leads API only needs the caller's role
+ROLE_AUTHENTICATION_CLASSES = [TokenClaimsAuthentication, CachedJWTAuthentication]
@@ -0,0 +1,18 @@
+# Generated by Django 4.1 on 2026-10-18 14:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="role_version",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
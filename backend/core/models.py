@@ -3,12 +3,36 @@ from django.db import models
 from django.contrib.auth.models import AbstractUser
 
 
+# flags that decide what a user can access. the claims of issued tokens depend on them
+ROLE_FLAGS = ("is_active", "is_superuser", "is_organizer", "is_agent")
+
+
 class User(AbstractUser):
     email = models.EmailField(unique=True)
     is_organizer = models.BooleanField(default=False)
     is_agent = models.BooleanField(
         default=False,
     )
+    role_version = models.PositiveIntegerField(default=0)
+    # increased when a role flag changes. tokens with an older role_version claim are rejected
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        user = super().from_db(db, field_names, values)
+        # role flags as they are in the database, leads.signals.sync_user_role only acts when they change
+        user._loaded_flags = {name: user.__dict__.get(name) for name in ROLE_FLAGS}
+        return user
+
+    def save(self, *args, **kwargs):
+        loaded = getattr(self, "_loaded_flags", None)
+        if loaded and any(
+            value is not None and getattr(self, name) != value for name, value in loaded.items()
+        ):
+            self.role_version += 1
+            if kwargs.get("update_fields") is not None:
+                kwargs["update_fields"] = {*kwargs["update_fields"], "role_version"}
+        super().save(*args, **kwargs)
+        self._loaded_flags = {name: getattr(self, name) for name in ROLE_FLAGS}
 
     def clean(self):
         super().clean()
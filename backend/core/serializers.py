@@ -1,7 +1,10 @@
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer as BaseTokenObtainPairSerializer
 from djoser.serializers import UserCreateSerializer as BaseUserCreateSerializer
 from djoser.serializers import UserSerializer as BaseUserSerializer
 
+from .authentication import get_role_claims
+
 
 class UserSerializer(BaseUserSerializer):
     is_organizer = serializers.BooleanField()
@@ -50,3 +53,17 @@ class UserCreateSerializer(BaseUserCreateSerializer):
             "is_organizer",
             "is_agent",
         ]
+
+
+class TokenObtainPairSerializer(BaseTokenObtainPairSerializer):
+    """
+        Adds role, organizer_id, agent_id and role_version claims to the tokens.
+        Refreshed access tokens copy them from the refresh token.
+    """
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        for claim, value in get_role_claims(user).items():
+            token[claim] = value
+        return token
@@ -0,0 +1,167 @@
+import threading
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.authentication import get_role_version
+from core.serializers import TokenObtainPairSerializer
+
+User = get_user_model()
+
+
+@pytest.fixture()
+def jwt_client(api_client):
+    def authenticate(user):
+        api_client.credentials(HTTP_AUTHORIZATION=f"JWT {AccessToken.for_user(user)}")
+        return api_client
+
+    return authenticate
+
+
+@pytest.mark.django_db()
+class TestCachedJWTAuthentication:
+    def test_cached_user_costs_no_query(self, jwt_client, user_factory, django_assert_num_queries):
+        client = jwt_client(user_factory.create(is_organizer=True))
+        client.get("/api/categories/")
+
+        # the user and the categories come from the cache
+        with django_assert_num_queries(0):
+            response = client.get("/api/categories/")
+
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_cached_role_is_used_for_leads(
+            self, jwt_client, user_factory, leads_factory, django_assert_num_queries
+    ):
+        user = user_factory.create(is_organizer=True)
+        lead = leads_factory.create(organizer=user.organizeruser)
+        client = jwt_client(user)
+        client.get("/api/leads/")
+
+        # only the page of leads
+        with django_assert_num_queries(1):
+            response = client.get("/api/leads/")
+
+        assert [item["id"] for item in response.data["results"]] == [lead.id]
+
+    def test_role_change_invalidates_cached_user(self, jwt_client, user_factory):
+        user = user_factory.create(is_organizer=True)
+        client = jwt_client(user)
+        assert client.post("/api/categories/", {"title": "a"}).status_code == status.HTTP_201_CREATED
+
+        user.is_organizer, user.is_agent = False, True
+        user.save()
+
+        assert client.post("/api/categories/", {"title": "a"}).status_code == status.HTTP_403_FORBIDDEN
+
+    def test_inactive_user_return_401(self, jwt_client, user_factory):
+        user = user_factory.create(is_organizer=True)
+        client = jwt_client(user)
+        client.get("/api/categories/")
+
+        user.is_active = False
+        user.save()
+
+        assert client.get("/api/categories/").status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_profile_update_keeps_the_password(self, jwt_client, user_factory):
+        user = user_factory.create(is_organizer=True)
+        user.set_password("a.123456")
+        user.save()
+        client = jwt_client(user)
+        client.get("/api/categories/")
+
+        response = client.patch(
+            "/api/auth/users/me/", {"first_name": "a", "is_organizer": True, "is_agent": False}
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert User.objects.get(pk=user.pk).check_password("a.123456")
+
+
+@pytest.mark.django_db()
+class TestRoleClaims:
+    def login(self, api_client, user):
+        user.set_password("a.123456")
+        user.save()
+        response = api_client.post(
+            "/api/auth/jwt/create/", {"username": user.username, "password": "a.123456"}
+        )
+        api_client.credentials(HTTP_AUTHORIZATION=f"JWT {response.data['access']}")
+        return AccessToken(response.data["access"])
+
+    def test_tokens_contain_role_claims(self, api_client, user_factory):
+        user = user_factory.create(is_organizer=True)
+
+        token = self.login(api_client, user)
+
+        assert token["role"] == "organizer"
+        assert token["organizer_id"] == user.organizeruser.pk
+        assert token["agent_id"] is None
+        assert token["role_version"] == User.objects.get(pk=user.pk).role_version
+
+    def test_leads_need_no_user_query(
+            self, api_client, user_factory, leads_factory, django_assert_num_queries
+    ):
+        user = user_factory.create(is_agent=True)
+        lead = leads_factory.create(agent=user.agent)
+        self.login(api_client, user)
+        api_client.get(f"/api/leads/{lead.id}/")
+
+        # the page of leads and the lead, found within the agent's scope. nothing about the user
+        with django_assert_num_queries(2):
+            response = api_client.get("/api/leads/")
+            assert [item["id"] for item in response.data["results"]] == [lead.id]
+            response = api_client.get(f"/api/leads/{lead.id}/")
+
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_organizer_can_create_lead_with_token_user(self, api_client, user_factory, payload):
+        user = user_factory.create(is_organizer=True)
+        self.login(api_client, user)
+
+        response = api_client.post("/api/leads/", payload)
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data["organizer"] == user.organizeruser.pk
+
+    def test_token_is_rejected_after_role_change(self, api_client, user_factory):
+        user = user_factory.create(is_organizer=True)
+        self.login(api_client, user)
+        assert api_client.get("/api/leads/").status_code == status.HTTP_200_OK
+
+        user = User.objects.get(pk=user.pk)
+        user.is_organizer, user.is_agent = False, True
+        user.save()
+
+        response = api_client.get("/api/leads/")
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert response.data["code"] == "role_changed"
+
+
+@pytest.mark.django_db(transaction=True)
+def test_role_version_read_during_a_role_change_is_not_kept(api_client, user_factory):
+    user = user_factory.create(is_organizer=True)
+    api_client.credentials(HTTP_AUTHORIZATION=f"JWT {TokenObtainPairSerializer.get_token(user).access_token}")
+
+    def concurrent_request():
+        # another connection, it reads the role_version of before the change
+        try:
+            get_role_version(user.pk)
+        finally:
+            connection.close()
+
+    with transaction.atomic():
+        user = User.objects.get(pk=user.pk)
+        user.is_organizer, user.is_agent = False, True
+        user.save()
+        thread = threading.Thread(target=concurrent_request)
+        thread.start()
+        thread.join()
+
+    response = api_client.get("/api/leads/")
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert response.data["code"] == "role_changed"
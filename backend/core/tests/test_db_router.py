@@ -0,0 +1,121 @@
+import math
+
+import pytest
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.serializers import TokenObtainPairSerializer
+from leads.models import Category, Lead, OrganizerUser
+from simplecrm import db_router
+from simplecrm.db_router import ReplicaRouter, replica_scope
+
+
+def queries(alias, request):
+    """(response, [sql]) of the queries request() ran on the database alias"""
+    with CaptureQueriesContext(connections[alias]) as context:
+        response = request()
+    return response, [query["sql"] for query in context.captured_queries]
+
+
+def lead_queries(sqls):
+    return [sql for sql in sqls if 'FROM "leads_lead"' in sql]
+
+
+def jwt_client(user):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"JWT {TokenObtainPairSerializer.get_token(user).access_token}")
+    return client
+
+
+class TestReplicaRouter:
+    @pytest.fixture(autouse=True)
+    def replicas(self, settings):
+        settings.DATABASE_REPLICAS = ["replica1", "replica2"]
+        settings.DATABASE_REPLICA_SELECTION = "round_robin"
+
+    def test_reads_outside_a_request_use_the_primary(self):
+        assert ReplicaRouter().db_for_read(Lead) == "default"
+
+    def test_reads_are_spread_round_robin(self):
+        with replica_scope():
+            assert {ReplicaRouter().db_for_read(Lead) for _ in range(4)} == {"replica1", "replica2"}
+
+    def test_only_replica_models_are_read_from_replicas(self):
+        with replica_scope():
+            # categories are cached, a stale read would stay in the cache
+            assert ReplicaRouter().db_for_read(Category) == "default"
+
+    def test_a_write_pins_the_rest_of_the_request(self):
+        router = ReplicaRouter()
+        with replica_scope() as scope:
+            assert router.db_for_write(Lead) == "default"
+            assert scope.wrote
+            assert router.db_for_read(Lead) == "default"
+
+    def test_least_lag_skips_replicas_too_far_behind(self, settings, monkeypatch):
+        settings.DATABASE_REPLICA_SELECTION = "least_lag"
+        settings.DATABASE_REPLICA_MAX_LAG = 5
+        lags = {"replica1": 0.5, "replica2": 0.1}
+        monkeypatch.setattr(db_router, "lag_monitor", db_router.LagMonitor())
+        monkeypatch.setattr(db_router.LagMonitor, "measure", staticmethod(lags.get))
+
+        with replica_scope():
+            assert ReplicaRouter().db_for_read(Lead) == "replica2"
+
+            lags.update(replica1=6, replica2=math.inf)
+            db_router.lag_monitor.checked = -math.inf
+            assert ReplicaRouter().db_for_read(Lead) == "default"
+
+    def test_migrations_only_run_on_the_primary(self):
+        assert ReplicaRouter().allow_migrate("default", "leads")
+        assert not ReplicaRouter().allow_migrate("replica1", "leads")
+
+
+@pytest.mark.django_db(transaction=True, databases=["default", "replica"])
+class TestReplicaPinning:
+    """The replica alias of the development settings mirrors the test database"""
+
+    @pytest.fixture(autouse=True)
+    def replicas(self, settings):
+        settings.DATABASE_REPLICAS = ["replica"]
+        settings.READ_YOUR_WRITES_SECONDS = 60
+
+    @pytest.fixture()
+    def organizer(self, create_organizer_user):
+        return OrganizerUser.objects.get(user=create_organizer_user[0])
+
+    @pytest.fixture()
+    def organizer_client(self, organizer):
+        return jwt_client(organizer.user)
+
+    def test_safe_requests_read_leads_from_the_replica(self, organizer_client, leads_factory, organizer):
+        leads_factory.create_batch(organizer=organizer, size=2)
+
+        response, sqls = queries("replica", lambda: organizer_client.get("/api/leads/"))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data["results"]) == 2
+        assert lead_queries(sqls)
+
+    def test_client_reads_its_writes_from_the_primary(
+            self, organizer_client, leads_factory, organizer, user_factory
+    ):
+        lead = leads_factory.create(organizer=organizer)
+
+        response, sqls = queries(
+            "replica", lambda: organizer_client.patch(f"/api/leads/{lead.pk}/", {"age": 40}, format="json")
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert sqls == []
+
+        response, sqls = queries("replica", lambda: organizer_client.get(f"/api/leads/{lead.pk}/"))
+        assert response.data["age"] == 40
+        assert sqls == []
+
+        # other clients still read from the replica
+        other = jwt_client(user_factory.create(is_superuser=True))
+        response, sqls = queries("replica", lambda: other.get(f"/api/leads/{lead.pk}/"))
+        assert response.status_code == status.HTTP_200_OK
+        assert lead_queries(sqls)
@@ -0,0 +1,84 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from django.conf import settings
+from prometheus_client import REGISTRY
+from rest_framework import status
+
+RECORD = """
+import django
+django.setup()
+from simplecrm.metrics import get_children
+get_children("leads", "GET")[0].observe(0.2)
+"""
+
+
+def sample(name, view, method="GET", suffix="_count"):
+    return REGISTRY.get_sample_value(f"{name}{suffix}", {"view": view, "method": method}) or 0
+
+
+@pytest.mark.django_db()
+class TestMetricsMiddleware:
+    def test_request_is_recorded_with_url_name_and_method(self, api_client, admin_user):
+        latency = sample("simplecrm_http_request_duration_seconds", "categories-list")
+        queries = sample("simplecrm_db_queries_per_request", "categories-list", suffix="_sum")
+        size = sample("simplecrm_http_response_size_bytes", "categories-list", suffix="_sum")
+
+        response = api_client.get("/api/categories/")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert sample("simplecrm_http_request_duration_seconds", "categories-list") == latency + 1
+        # the categories and the version key are cached, the only query is the list of categories
+        assert sample("simplecrm_db_queries_per_request", "categories-list", suffix="_sum") == queries + 1
+        assert sample("simplecrm_db_duration_seconds", "categories-list") > 0
+        assert (
+            sample("simplecrm_http_response_size_bytes", "categories-list", suffix="_sum")
+            == size + len(response.content)
+        )
+        assert REGISTRY.get_sample_value(
+            "simplecrm_http_requests_total", {"view": "categories-list", "method": "GET", "status": "200"}
+        )
+
+    def test_unresolved_paths_share_a_label(self, client):
+        before = sample("simplecrm_http_request_duration_seconds", "<unresolved>")
+
+        client.get("/api/no-such-endpoint/1/")
+        client.get("/api/no-such-endpoint/2/")
+
+        assert sample("simplecrm_http_request_duration_seconds", "<unresolved>") == before + 2
+
+    def test_streamed_response_size_is_recorded_when_consumed(self, api_client, admin_user, leads_factory):
+        leads_factory.create_batch(size=3)
+        before = sample("simplecrm_http_response_size_bytes", "leads-export", suffix="_sum")
+
+        response = api_client.get("/api/leads/export/", {"format": "csv"})
+        assert sample("simplecrm_http_response_size_bytes", "leads-export", suffix="_sum") == before
+
+        content = b"".join(response.streaming_content)
+        assert sample("simplecrm_http_response_size_bytes", "leads-export", suffix="_sum") == before + len(content)
+
+    def test_metrics_endpoint(self, client):
+        client.get("/api/")
+
+        response = client.get("/metrics")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Content-Type"].startswith("text/plain")
+        body = response.content.decode()
+        assert 'simplecrm_http_request_duration_seconds_count{method="GET",view="api-root"}' in body
+        assert "simplecrm_db_queries_per_request_bucket" in body
+        assert "simplecrm_http_response_size_bytes_bucket" in body
+
+
+def test_metrics_endpoint_adds_up_worker_processes(client, tmp_path, monkeypatch):
+    # two "workers" writing their metrics to the shared directory
+    environment = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+    for _ in range(2):
+        subprocess.run([sys.executable, "-c", RECORD], check=True, cwd=settings.BASE_DIR, env=environment)
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+
+    body = client.get("/metrics").content.decode()
+
+    assert 'simplecrm_http_request_duration_seconds_count{method="GET",view="leads"} 2.0' in body
@@ -0,0 +1,142 @@
+import inspect
+import io
+import json
+import logging
+
+import pytest
+from asgiref.sync import SyncToAsync, async_to_sync, iscoroutinefunction
+from django.core.management import call_command
+from django.test import AsyncClient, Client
+from django.test.client import AsyncClientHandler
+from rest_framework import status
+
+from core.serializers import TokenObtainPairSerializer
+from core.tests.test_metrics import sample
+from core.tests.test_query_inspector import INSPECTOR, findings
+from leads.models import OrganizerUser
+
+
+@pytest.mark.django_db()
+class TestSiteMiddleware:
+    def test_api_requests_skip_the_site_middleware(self, api_client, admin_user):
+        response = api_client.get("/api/categories/")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert "X-Frame-Options" not in response
+        assert "Cookie" not in response.get("Vary", "")
+        # SecurityMiddleware still runs for every path
+        assert response["X-Content-Type-Options"] == "nosniff"
+
+    def test_site_requests_run_the_site_middleware(self, client):
+        response = client.get("/admin/login/")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["X-Frame-Options"] == "DENY"
+        assert "csrftoken" in response.cookies
+
+    def test_csrf_is_checked_outside_the_api(self, user_factory):
+        user = user_factory.create(is_superuser=True, is_staff=True)
+        user.set_password("a.123456")
+        user.save()
+        client = Client(enforce_csrf_checks=True)
+
+        response = client.post("/admin/login/", {"username": user.username, "password": "a.123456"})
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_admin_login_and_messages_work(self, user_factory):
+        user = user_factory.create(is_superuser=True, is_staff=True)
+        user.set_password("a.123456")
+        user.save()
+        client = Client()
+
+        response = client.post("/admin/login/", {"username": user.username, "password": "a.123456"})
+        assert response.status_code == status.HTTP_302_FOUND
+
+        other = user_factory.create()
+        response = client.post("/admin/leads/organizeruser/add/", {"user": other.pk}, follow=True)
+        assert response.status_code == status.HTTP_200_OK
+        assert "was added successfully" in response.content.decode()
+
+
+@async_to_sync
+async def get(path, **headers):
+    # the extra arguments of AsyncClient are ASGI headers
+    return await AsyncClient().get(path, **headers)
+
+
+def middleware_chain(handler):
+    """The middleware instances and sync_to_async adapters of the loaded handler, outermost first"""
+    get_response = handler._middleware_chain
+    while not inspect.ismethod(get_response):
+        if inspect.isfunction(get_response):
+            # convert_exception_to_response()
+            get_response = get_response.__wrapped__
+        elif isinstance(get_response, SyncToAsync):
+            yield get_response
+            get_response = get_response.func
+        else:
+            yield get_response
+            get_response = get_response.get_response
+
+
+@pytest.mark.django_db(transaction=True, databases=["default", "replica"])
+class TestAsgiStack:
+    @pytest.fixture(autouse=True)
+    def every_middleware(self, settings):
+        # the production stack, the debug toolbar of the development settings is sync only
+        settings.MIDDLEWARE = [path for path in settings.MIDDLEWARE if not path.startswith("debug_toolbar.")]
+        settings.DATABASE_REPLICAS = ["replica"]
+        settings.QUERY_INSPECTOR = {**INSPECTOR, "SLOW_QUERY_MS": 0}
+
+    def test_middleware_run_without_sync_to_async(self):
+        handler = AsyncClientHandler()
+        handler.load_middleware(is_async=True)
+
+        chain = list(middleware_chain(handler))
+
+        assert [type(middleware).__name__ for middleware in chain] == [
+            "MetricsMiddleware", "QueryInspectorMiddleware", "SecurityMiddleware", "CommonMiddleware",
+            "ReplicaPinningMiddleware", "SiteMiddleware",
+        ]
+        assert all(iscoroutinefunction(middleware) for middleware in chain)
+        assert iscoroutinefunction(chain[-1].process_view)
+
+    def test_async_leads_through_every_middleware(self, create_organizer_user, leads_factory, caplog):
+        organizer = OrganizerUser.objects.get(user=create_organizer_user[0])
+        leads_factory.create_batch(organizer=organizer, size=2)
+        token = TokenObtainPairSerializer.get_token(organizer.user).access_token
+        queries = sample("simplecrm_db_queries_per_request", "async-leads", suffix="_sum")
+        caplog.set_level(logging.WARNING, logger="simplecrm.queries")
+
+        response = get("/api/async/leads/", authorization=f"JWT {token}")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.json()["results"]) == 2
+        assert "X-Frame-Options" not in response
+        assert response["X-Content-Type-Options"] == "nosniff"
+        # the queries run in the threads of sync_to_async still reach the metrics and the inspector
+        assert sample("simplecrm_db_queries_per_request", "async-leads", suffix="_sum") > queries
+        assert any('FROM "leads_lead"' in finding["fingerprint"] for finding in findings(caplog))
+
+    def test_site_requests_run_the_site_middleware(self):
+        response = get("/admin/login/")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["X-Frame-Options"] == "DENY"
+        assert "csrftoken" in response.cookies
+
+
+def test_benchmark_startup_measures_both_stacks():
+    out = io.StringIO()
+
+    call_command(
+        "benchmark_startup", settings_modules="simplecrm.settings.production", imports=1, requests=100, json=True,
+        stdout=out,
+    )
+
+    results = json.loads(out.getvalue())
+    assert list(results["import_ms"]) == ["simplecrm.settings.production"]
+    assert set(results["middleware_us"]) == {
+        "routed /api/leads/", "routed /admin/login/", "flat /api/leads/", "flat /admin/login/",
+    }
@@ -0,0 +1,117 @@
+"""
+    Query budgets of the djoser user routes (api/auth/users/...), see leads/tests/budgets.py.
+    user-list scales with the number of users it returns.
+"""
+from types import SimpleNamespace
+
+import djoser.urls
+import pytest
+from django.contrib.auth import get_user_model
+from rest_framework import status
+
+from leads.tests.budgets import Budget, check_budget, route_names
+
+User = get_user_model()
+PASSWORD = "a.123456"
+
+
+def other_user(context):
+    return {"id": context.other.pk}
+
+
+def invalid_confirmation(**fields):
+    return lambda context, size: {"uid": "x", "token": "x", **fields}
+
+
+BUDGETS = [
+    Budget("user-list", "GET", 2, status.HTTP_200_OK, user="admin", scales=True),
+    Budget(
+        "user-list", "POST", 13, status.HTTP_201_CREATED, user="admin",
+        data=lambda context, size: {
+            "username": "new", "email": "new@example.org", "password": "Very.Secret.123",
+            "is_organizer": True, "is_agent": False,
+        },
+    ),
+    Budget("user-me", "GET", 1, status.HTTP_200_OK),
+    Budget(
+        "user-me", "PUT", 3, status.HTTP_200_OK,
+        data=lambda context, size: {"email": "me@example.org", "is_organizer": True, "is_agent": False},
+    ),
+    # UserSerializer.validate needs both role flags, also on PATCH
+    Budget(
+        "user-me", "PATCH", 2, status.HTTP_200_OK,
+        data=lambda context, size: {"first_name": "Me", "is_organizer": True, "is_agent": False},
+    ),
+    Budget(
+        "user-me", "DELETE", 12, status.HTTP_204_NO_CONTENT,
+        data=lambda context, size: {"current_password": PASSWORD},
+    ),
+    Budget("user-detail", "GET", 2, status.HTTP_200_OK, user="admin", kwargs=other_user),
+    Budget(
+        "user-detail", "PUT", 4, status.HTTP_200_OK, user="admin", kwargs=other_user,
+        data=lambda context, size: {"email": "other@example.org", "is_organizer": False, "is_agent": True},
+    ),
+    Budget(
+        "user-detail", "PATCH", 3, status.HTTP_200_OK, user="admin", kwargs=other_user,
+        data=lambda context, size: {"last_name": "Other", "is_organizer": False, "is_agent": True},
+    ),
+    Budget(
+        "user-detail", "DELETE", 15, status.HTTP_204_NO_CONTENT, user="admin", kwargs=other_user,
+        data=lambda context, size: {"current_password": PASSWORD},
+    ),
+    Budget("user-activation", "POST", 0, status.HTTP_400_BAD_REQUEST, user=None, data=invalid_confirmation()),
+    Budget(
+        "user-resend-activation", "POST", 1, status.HTTP_400_BAD_REQUEST, user=None,
+        data=lambda context, size: {"email": context.user.email},
+    ),
+    Budget(
+        "user-set-password", "POST", 2, status.HTTP_204_NO_CONTENT,
+        data=lambda context, size: {"current_password": PASSWORD, "new_password": "Very.Secret.123"},
+    ),
+    Budget(
+        "user-reset-password", "POST", 1, status.HTTP_204_NO_CONTENT, user=None,
+        data=lambda context, size: {"email": context.user.email},
+    ),
+    Budget(
+        "user-reset-password-confirm", "POST", 0, status.HTTP_400_BAD_REQUEST, user=None,
+        data=invalid_confirmation(new_password="Very.Secret.123"),
+    ),
+    Budget(
+        "user-set-username", "POST", 3, status.HTTP_204_NO_CONTENT,
+        data=lambda context, size: {"current_password": PASSWORD, "new_username": "renamed"},
+    ),
+    Budget(
+        "user-reset-username", "POST", 1, status.HTTP_204_NO_CONTENT, user=None,
+        data=lambda context, size: {"email": context.user.email},
+    ),
+    Budget(
+        "user-reset-username-confirm", "POST", 1, status.HTTP_400_BAD_REQUEST, user=None,
+        data=invalid_confirmation(new_username="renamed"),
+    ),
+]
+
+
+@pytest.fixture()
+def make_users(user_factory):
+    def make(size):
+        admin = User.objects.create_superuser(f"admin{size}", f"admin{size}@example.org", PASSWORD)
+        user = user_factory.create(is_organizer=True)
+        user.set_password(PASSWORD)
+        user.save()
+        other = user_factory.create(is_agent=True)
+        User.objects.bulk_create(
+            User(username=f"user{size}-{i}", email=f"user{size}-{i}@example.org") for i in range(size)
+        )
+        return SimpleNamespace(admin=admin, user=user, other=other)
+
+    return make
+
+
+def test_every_user_route_has_a_budget():
+    assert set(route_names(djoser.urls.urlpatterns)) - {"api-root"} - {budget.name for budget in BUDGETS} == set()
+
+
+@pytest.mark.django_db()
+@pytest.mark.parametrize("budget", BUDGETS, ids=str)
+def test_query_budget(budget, make_users, query_budget):
+    check_budget(budget, make_users, query_budget)
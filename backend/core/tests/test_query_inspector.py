@@ -0,0 +1,86 @@
+import json
+
+import pytest
+from django.test import Client, override_settings
+
+from leads.admin import LeadAdmin
+from simplecrm.query_inspector import fingerprint
+
+INSPECTOR = {"ENABLED": True, "PATH_PREFIX": "/api/", "REPEAT_THRESHOLD": 3, "SLOW_QUERY_MS": 10000}
+
+
+def findings(caplog):
+    return [json.loads(record.getMessage()) for record in caplog.records if record.name == "simplecrm.queries"]
+
+
+def test_fingerprint_replaces_values():
+    assert fingerprint("SELECT * FROM t1 WHERE id = 12 AND name = 'it''s'") == (
+        "SELECT * FROM t1 WHERE id = ? AND name = ?"
+    )
+    assert fingerprint('SELECT "a"\n  FROM "b" WHERE "id" IN (%s, %s, %s)') == (
+        'SELECT "a" FROM "b" WHERE "id" IN (...)'
+    )
+    assert fingerprint("INSERT INTO b (x, y) VALUES (%s, %s), (%s, %s), (%s, %s)") == (
+        "INSERT INTO b (x, y) VALUES (...), ..."
+    )
+
+
+@pytest.mark.django_db()
+class TestQueryInspectorMiddleware:
+    @pytest.fixture()
+    def admin_client(self, user_factory):
+        client = Client()
+        client.force_login(user_factory.create(is_superuser=True, is_staff=True))
+        return client
+
+    @override_settings(QUERY_INSPECTOR={**INSPECTOR, "PATH_PREFIX": "/admin/"})
+    def test_repeated_statement_is_logged_with_its_frame(self, admin_client, leads_factory, caplog, monkeypatch):
+        leads_factory.create_batch(size=5)
+        # without the joins every row loads the user of its organizer in __str__
+        monkeypatch.setattr(LeadAdmin, "list_select_related", ["organizer", "agent"])
+
+        response = admin_client.get("/admin/leads/lead/")
+
+        assert response.status_code == 200
+        [finding] = [finding for finding in findings(caplog) if finding["event"] == "n_plus_one"]
+        assert finding["view"] == "admin:leads_lead_changelist"
+        # the user of the session, then the users of the organizer and the agent of every lead
+        assert finding["count"] == 11
+        assert finding["fingerprint"].startswith('SELECT "core_user"."id"')
+        assert finding["frame"].startswith("leads/models.py:")
+        assert finding["frame"].endswith(" in __str__")
+
+    @override_settings(QUERY_INSPECTOR={**INSPECTOR, "PATH_PREFIX": "/admin/"})
+    def test_lead_admin_has_no_n_plus_one(self, admin_client, leads_factory, caplog):
+        leads_factory.create_batch(size=5)
+
+        assert admin_client.get("/admin/leads/lead/").status_code == 200
+        assert findings(caplog) == []
+
+    @override_settings(QUERY_INSPECTOR={**INSPECTOR, "SLOW_QUERY_MS": 0})
+    def test_slow_statements_are_logged(self, api_client, create_organizer_user, caplog):
+        api_client.force_authenticate(user=create_organizer_user[0])
+
+        response = api_client.get("/api/leads/")
+
+        assert response.status_code == 200
+        [finding] = findings(caplog)
+        assert finding["event"] == "slow_query"
+        assert finding["view"] == "leads"
+        assert finding["method"] == "GET"
+        assert finding["queries"] == 1
+        assert 'FROM "leads_lead" WHERE "leads_lead"."organizer_id" = ?' in finding["fingerprint"]
+        assert finding["frame"].startswith("leads/")
+
+    @override_settings(QUERY_INSPECTOR={**INSPECTOR, "SLOW_QUERY_MS": 0})
+    def test_only_api_requests_are_inspected(self, admin_client, caplog):
+        assert admin_client.get("/admin/").status_code == 200
+        assert findings(caplog) == []
+
+    def test_disabled_by_default(self, api_client, create_organizer_user, caplog):
+        api_client.force_authenticate(user=create_organizer_user[0])
+
+        with override_settings(QUERY_INSPECTOR={**INSPECTOR, "ENABLED": False, "SLOW_QUERY_MS": 0}):
+            api_client.get("/api/leads/")
+
+        assert findings(caplog) == []
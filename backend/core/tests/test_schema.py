@@ -0,0 +1,101 @@
+import io
+import json
+
+import pytest
+from django.core.management import call_command
+from django.test import override_settings
+from rest_framework import status
+
+from simplecrm import schema
+
+
+@pytest.fixture()
+def schema_dir(tmp_path):
+    with override_settings(OPENAPI_SCHEMA_DIR=str(tmp_path), CODE_VERSION="v1"):
+        schema.get_code_version.cache_clear()
+        schema._schemas.clear()
+        yield tmp_path
+    schema.get_code_version.cache_clear()
+    schema._schemas.clear()
+
+
+def test_command_renders_every_format_and_removes_old_versions(schema_dir):
+    (schema_dir / "openapi-v0.json").write_text("{}")
+
+    call_command("generate_openapi_schema", stdout=io.StringIO())
+
+    assert sorted(path.name for path in schema_dir.iterdir()) == ["openapi-v1.json", "openapi-v1.yaml"]
+    document = json.loads((schema_dir / "openapi-v1.json").read_bytes())
+    assert document["info"]["title"] == "SimpleCRM"
+    assert document["basePath"] == "/api"
+    assert "/leads/" in document["paths"]
+
+
+def test_command_keeps_the_files_of_the_version(schema_dir, monkeypatch):
+    call_command("generate_openapi_schema", stdout=io.StringIO())
+    monkeypatch.setattr(schema, "render_schema", pytest.fail)
+
+    out = io.StringIO()
+    call_command("generate_openapi_schema", stdout=out)
+
+    assert "up to date" in out.getvalue()
+
+
+def test_code_version_defaults_to_a_hash_of_the_sources(schema_dir):
+    with override_settings(CODE_VERSION=None):
+        schema.get_code_version.cache_clear()
+        version = schema.get_code_version()
+
+    assert len(version) == 12
+
+
+class TestSchemaFileView:
+    def test_serves_the_pre_rendered_file(self, client, schema_dir, monkeypatch):
+        call_command("generate_openapi_schema", stdout=io.StringIO())
+        monkeypatch.setattr(schema, "render_schema", pytest.fail)
+
+        response = client.get("/openapi.json")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Content-Type"] == "application/json"
+        assert response.content == (schema_dir / "openapi-v1.json").read_bytes()
+        assert response["ETag"].startswith('"')
+        assert "no-cache" in response["Cache-Control"]
+
+    def test_renders_a_missing_version_once(self, client, schema_dir, monkeypatch):
+        response = client.get("/openapi.yaml")
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Content-Type"] == "application/yaml"
+        assert (schema_dir / "openapi-v1.yaml").read_bytes() == response.content
+
+        monkeypatch.setattr(schema, "render_schema", pytest.fail)
+        assert client.get("/openapi.yaml").content == response.content
+
+    def test_matching_etag_returns_304(self, client, schema_dir):
+        etag = client.get("/openapi.json")["ETag"]
+
+        response = client.get("/openapi.json", HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response["ETag"] == etag
+        assert response.content == b""
+
+    def test_new_code_version_changes_the_etag(self, client, schema_dir):
+        etag = client.get("/openapi.json")["ETag"]
+        (schema_dir / "openapi-v2.json").write_bytes(b'{"changed": true}')
+
+        with override_settings(CODE_VERSION="v2"):
+            schema.get_code_version.cache_clear()
+            response = client.get("/openapi.json", HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.content == b'{"changed": true}'
+
+    def test_unknown_format_return_404(self, client, schema_dir):
+        assert client.get("/openapi.xml").status_code == status.HTTP_404_NOT_FOUND
+
+    def test_swagger_page_loads_the_pre_rendered_schema(self, client, schema_dir):
+        response = client.get("/")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert b"/openapi.json" in response.content
@@ -1,6 +1,10 @@
 import pytest
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import update_last_login
 from django.core.exceptions import ValidationError
+from rest_framework import status
+
+from leads.models import Agent, OrganizerUser
 
 User = get_user_model()
 
@@ -16,3 +20,45 @@ def test_user_cant_be_organizer_and_agent_at_the_same_time():
             is_organizer=True,
         )
         user.clean()
+
+
+@pytest.mark.django_db()
+class TestUserRoles:
+    def test_role_instances_follow_role_flags(self, user_factory):
+        user = user_factory.create(is_organizer=True)
+        assert OrganizerUser.objects.filter(user=user).exists()
+
+        user = User.objects.get(pk=user.pk)
+        user.is_organizer, user.is_agent = False, True
+        user.save()
+
+        assert not OrganizerUser.objects.filter(user=user).exists()
+        assert Agent.objects.filter(user=user).exists()
+
+    def test_login_costs_no_role_queries(self, api_client, user_factory, django_assert_num_queries):
+        user = user_factory.create(is_organizer=True)
+        user.set_password("a.123456")
+        user.save()
+
+        # login selects the user and its role row for the token claims, then select and update last_login
+        with django_assert_num_queries(4):
+            response = api_client.post(
+                "/api/auth/jwt/create/", {"username": user.username, "password": "a.123456"}
+            )
+            update_last_login(None, User.objects.get(pk=user.pk))
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_profile_update_costs_no_role_queries(
+        self, api_client, user_factory, django_assert_num_queries
+    ):
+        user = user_factory.create(is_agent=True)
+        api_client.force_authenticate(user=user)
+
+        # only the UPDATE of the user
+        with django_assert_num_queries(1):
+            response = api_client.patch(
+                "/api/auth/users/me/", {"first_name": "a", "is_organizer": False, "is_agent": True}
+            )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert Agent.objects.filter(user=user).count() == 1
@@ -0,0 +1,23 @@
+"""
+    Loaded by gunicorn from the working directory.
+
+    With PROMETHEUS_MULTIPROC_DIR set, each worker writes its metrics to files of that directory and
+    /metrics adds them up (see simplecrm/metrics.py). Files of a previous run are removed on start,
+    gauges of exited workers are dropped.
+"""
+import os
+import shutil
+
+from prometheus_client import multiprocess
+
+
+def on_starting(server):
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path)
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(worker.pid)
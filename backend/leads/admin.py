@@ -1,13 +1,16 @@
 from django.contrib import admin
 
-from .models import Agent, Lead, OrganizerUser
+from .models import Agent, Lead, LeadImport, OrganizerUser
 
 
 @admin.register(Lead)
 class LeadAdmin(admin.ModelAdmin):
     list_display = ["first_name", "last_name", "organizer", "agent"]
+    # __str__ of the organizer and the agent is the username
+    list_select_related = ["organizer__user", "agent__user"]
 
 
 admin.site.register(OrganizerUser)
 admin.site.register(Agent)
+admin.site.register(LeadImport)
 
@@ -0,0 +1,12 @@
+from django.urls import path
+
+from .async_views import (AsyncCategoryDetailView, AsyncCategoryListView,
+                          AsyncLeadDetailView, AsyncLeadsListView)
+
+# async variants of the read endpoints in leads/urls.py, for ASGI servers
+urlpatterns = [
+    path("leads/", AsyncLeadsListView.as_view(), name="async-leads"),
+    path("leads/<int:pk>/", AsyncLeadDetailView.as_view(), name="async-lead-detail"),
+    path("categories/", AsyncCategoryListView.as_view(), name="async-categories"),
+    path("categories/<int:pk>/", AsyncCategoryDetailView.as_view(), name="async-category-detail"),
+]
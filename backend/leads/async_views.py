@@ -0,0 +1,261 @@
+"""
+    Async variants of the read endpoints of leads/views.py, served under /api/async/.
+
+    Under an ASGI server (simplecrm/asgi.py) a request waiting on PostgreSQL doesn't hold a worker
+    thread: leads and categories are read with the async ORM (aiterator, aget). Authentication and
+    the cached categories run in the thread pool (run_in_thread), in one hop per request: thread
+    sensitive calls, e.g. the async cache methods, would all wait for the one thread they share.
+    The responses are the same as the ones of the DRF views.
+
+    They are not a faster replacement of the DRF views. Django's ASGI handler and the thread hop
+    of every request cost more CPU than a sync WSGI worker: with a nearby database, and for cached
+    categories whatever the database, the WSGI service serves more requests per CPU. The leads
+    endpoints pay off when requests mostly wait on the database, e.g. a distant or busy
+    PostgreSQL, where one ASGI worker overlaps the waits of many requests. Measure both services
+    with benchmark_api before routing clients to /api/async/.
+"""
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.http import Http404, HttpResponse
+from django.views import View
+from rest_framework import exceptions
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from core.authentication import ROLE_AUTHENTICATION_CLASSES
+
+from .cache import CATEGORIES_TIMEOUT, categories_key
+from .conditional import ConditionalGetMixin, make_etag
+from .models import Category, Lead
+from .pagination import LeadCursorPagination
+from .permissions import IsAdminOrOrganizer, IsAgent, get_lead_scope
+from .serializers import CategorySerializer, LeadAdminSerializer, LeadSerializer, get_values_representation
+
+
+async def run_in_thread(function, *args, **kwargs):
+    """
+        Call a sync function in a thread of the pool, concurrently with the other requests.
+        The thread has its own database connection, closed or kept for CONN_MAX_AGE as the
+        connection of a request is.
+    """
+    def call():
+        close_old_connections()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return await sync_to_async(call, thread_sensitive=False)()
+
+
+class AsyncAPIView(ConditionalGetMixin, View):
+    """
+        Minimal async APIView for read-only JSON endpoints.
+
+        Authentication classes run in the thread pool, they may read the cache or the database.
+        Permission classes run inline: the leads API only compares the role and ids of the
+        request user (see leads.permissions), which never queries.
+        Errors are rendered like DRF's exception handler does.
+    """
+
+    authentication_classes = ROLE_AUTHENTICATION_CLASSES
+    permission_classes = [IsAuthenticated]
+    renderer_class = JSONRenderer
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            if request.method not in ("GET", "HEAD"):
+                raise exceptions.MethodNotAllowed(request.method)
+            await run_in_thread(self.initial, request, *args, **kwargs)
+            response = await self.get(request, *args, **kwargs)
+        except (exceptions.APIException, Http404) as exc:
+            response = self.handle_exception(request, exc)
+        return self.add_validators(response)
+
+    def initial(self, request, *args, **kwargs):
+        """The sync work before get(), in one thread hop"""
+        self.authenticate(request)
+        self.check_permissions(request)
+        self.prepare(request, *args, **kwargs)
+
+    def authenticate(self, request):
+        request.user, request.auth = AnonymousUser(), None
+        for authentication_class in self.authentication_classes:
+            result = authentication_class().authenticate(request)
+            if result is not None:
+                request.user, request.auth = result
+                return
+
+    def prepare(self, request, *args, **kwargs):
+        """Sync reads of the view that don't need their own hop, e.g. the cache"""
+
+    def check_permissions(self, request):
+        for permission in self.get_permissions():
+            if not permission.has_permission(request, self):
+                self.permission_denied(request, permission)
+
+    def check_object_permissions(self, request, obj):
+        for permission in self.get_permissions():
+            if not permission.has_object_permission(request, self, obj):
+                self.permission_denied(request, permission)
+
+    def get_permissions(self):
+        return [permission() for permission in self.permission_classes]
+
+    @staticmethod
+    def permission_denied(request, permission):
+        if not request.user.is_authenticated:
+            raise exceptions.NotAuthenticated()
+        raise exceptions.PermissionDenied(getattr(permission, "message", None))
+
+    def handle_exception(self, request, exc):
+        if isinstance(exc, Http404):
+            exc = exceptions.NotFound()
+
+        headers = {}
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            header = self.authentication_classes[0]().authenticate_header(request)
+            if header:
+                headers["WWW-Authenticate"] = header
+            else:
+                exc.status_code = 403
+
+        if isinstance(exc.detail, (list, dict)):
+            data = exc.detail
+        else:
+            data = {"detail": exc.detail}
+        response = self.render(data, status=exc.status_code)
+        for name, value in headers.items():
+            response[name] = value
+        return response
+
+    def render(self, data, status=200):
+        renderer = self.renderer_class()
+        content_type = f"{renderer.media_type}; charset={renderer.charset}" if renderer.charset else renderer.media_type
+        return HttpResponse(renderer.render(data), status=status, content_type=content_type)
+
+
+class AsyncLeadsListView(AsyncAPIView):
+    """
+        GET /api/leads/ for ASGI: the same pages and ETag, read as values() rows like the DRF view.
+        Supports page_size and cursor and the category, agent and organizer filters (ids).
+        Searching and ordering are only served by the DRF view.
+    """
+
+    permission_classes = [IsAuthenticated, IsAdminOrOrganizer]
+    pagination_class = LeadCursorPagination
+    filter_fields = ["category", "agent", "organizer"]
+
+    async def get(self, request, *args, **kwargs):
+        scope = get_lead_scope(request.user)
+        if scope is None:
+            raise exceptions.ValidationError({"error": "Your are not an agent or an organizer "})
+        queryset = Lead.objects.filter(**scope, **self.get_filters(request))
+
+        serializer_class = LeadAdminSerializer if request.user.is_superuser else LeadSerializer
+        representation = get_values_representation(serializer_class)
+        paginator = self.pagination_class()
+        # the paginator only reads query_params and build_absolute_uri() of the request
+        leads = await paginator.apaginate_queryset(
+            queryset, Request(request), self, names=[*representation.names, "updated_at"]
+        )
+
+        etag = make_etag(
+            request.get_full_path(),
+            "json",
+            serializer_class.__name__,
+            paginator.has_next,
+            *[f"{lead['id']}@{lead['updated_at'].isoformat()}" for lead in leads],
+        )
+        response = self.not_modified(request, etag)
+        if response is not None:
+            return response
+
+        data = representation.to_representation(leads)
+        return self.render(paginator.get_paginated_response(data).data)
+
+    def get_filters(self, request):
+        filters = {}
+        for name in self.filter_fields:
+            value = request.GET.get(name)
+            if value in (None, ""):
+                continue
+            try:
+                filters[f"{name}_id"] = int(value)
+            except ValueError:
+                raise exceptions.ValidationError({name: ["Enter a whole number."]})
+        return filters
+
+
+class AsyncLeadDetailView(AsyncAPIView):
+    """GET /api/leads/<pk>/ for ASGI: one lookup within the caller's scope, like LeadDetailApiView"""
+
+    permission_classes = [IsAuthenticated, IsAgent]
+
+    async def get(self, request, pk, *args, **kwargs):
+        try:
+            lead = await Lead.objects.filter(**get_lead_scope(request.user)).aget(pk=pk)
+        except Lead.DoesNotExist:
+            raise Http404
+        self.check_object_permissions(request, lead)
+
+        etag = make_etag(lead.pk, "json", lead.updated_at.isoformat())
+        response = self.not_modified(request, etag, lead.updated_at)
+        if response is not None:
+            return response
+        return self.render(LeadSerializer(lead).data)
+
+
+class CategoryScopeMixin:
+    """A cache hit is read with the authentication, in the same thread hop"""
+
+    permission_classes = [IsAuthenticated, IsAdminOrOrganizer]
+
+    def check_permissions(self, request):
+        super().check_permissions(request)
+        user = request.user
+        if not (user.is_superuser or user.is_organizer or user.is_agent):
+            raise exceptions.ValidationError({"error": "Your are not an agent or an organizer "})
+
+    def prepare(self, request, *args, **kwargs):
+        self.cache_key = categories_key(self.get_cache_name(*args, **kwargs))
+        self.cached = cache.get(self.cache_key)
+
+    async def cache_data(self, data):
+        await run_in_thread(cache.set, self.cache_key, data, CATEGORIES_TIMEOUT)
+
+
+class AsyncCategoryListView(CategoryScopeMixin, AsyncAPIView):
+    """GET /api/categories/ for ASGI, cached like CategoryViewSet"""
+
+    @staticmethod
+    def get_cache_name(*args, **kwargs):
+        return "list"
+
+    async def get(self, request, *args, **kwargs):
+        if self.cached is not None:
+            return self.render(self.cached)
+        categories = [category async for category in Category.objects.order_by("pk").aiterator()]
+        data = list(CategorySerializer(categories, many=True).data)
+        await self.cache_data(data)
+        return self.render(data)
+
+
+class AsyncCategoryDetailView(CategoryScopeMixin, AsyncAPIView):
+    @staticmethod
+    def get_cache_name(pk, *args, **kwargs):
+        return f"detail:{pk}"
+
+    async def get(self, request, pk, *args, **kwargs):
+        if self.cached is not None:
+            return self.render(self.cached)
+        try:
+            category = await Category.objects.aget(pk=pk)
+        except Category.DoesNotExist:
+            raise Http404
+        data = dict(CategorySerializer(category).data)
+        await self.cache_data(data)
+        return self.render(data)
@@ -0,0 +1,153 @@
+"""
+    Endpoint benchmarks, run by `manage.py benchmark_endpoints`.
+
+    Every scenario is a request of the leads API made with the test client as superuser, organizer or
+    agent (the biggest tenant created by seed_crm). For each one the report holds the p50/p95/p99
+    latency, the number of queries per request and the peak memory allocated while serving it.
+    compare() lists the regressions of a report against a baseline report.
+"""
+import math
+import time
+import tracemalloc
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from core.serializers import TokenObtainPairSerializer
+
+from .models import Category, Lead
+
+ROLES = ["superuser", "organizer", "agent"]
+SEED_PREFIX = "bench"
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(p / 100 * len(ordered)) - 1, 0)]
+
+
+def get_users():
+    """The users of each role, the organizer and agent of the biggest tenant of seed_crm"""
+    User = get_user_model()
+    superuser = User.objects.filter(username=f"{SEED_PREFIX}-admin").first()
+    if superuser is None:
+        superuser = User.objects.create_superuser(f"{SEED_PREFIX}-admin", "admin@example.com", "bench")
+    return {
+        "superuser": superuser,
+        "organizer": User.objects.get(username=f"{SEED_PREFIX}-org0"),
+        "agent": User.objects.get(username=f"{SEED_PREFIX}-org0-agent0"),
+    }
+
+
+def get_scenarios(role, user):
+    """[(name, method, url, data)] the role is allowed to run"""
+    if role == "agent":
+        lead = Lead.objects.filter(agent=user.agent).order_by("-date_added").first()
+    elif role == "organizer":
+        lead = Lead.objects.filter(organizer=user.organizeruser).order_by("-date_added").first()
+    else:
+        lead = Lead.objects.order_by("-date_added").first()
+    category = Category.objects.order_by("pk").first()
+
+    scenarios = [
+        ("category list", "get", "/api/categories/", None),
+        ("category detail", "get", f"/api/categories/{category.pk}/", None),
+        ("lead detail", "get", f"/api/leads/{lead.pk}/", None),
+    ]
+    if role == "agent":
+        return scenarios
+
+    lead_data = {
+        "first_name": "Bench",
+        "last_name": "Mark",
+        "age": 30,
+        "agent": lead.agent_id,
+        "category": category.pk,
+        "description": "benchmark lead",
+        "phone_number": "555-000-0000",
+        "email": "bench@example.com",
+    }
+    if role == "superuser":
+        lead_data["organizer"] = lead.organizer_id
+    return scenarios + [
+        ("lead list", "get", "/api/leads/", None),
+        ("lead list filtered", "get", f"/api/leads/?category={category.pk}", None),
+        ("lead list searched", "get", "/api/leads/?search=premium%20plan", None),
+        ("lead list ordered", "get", "/api/leads/?ordering=category", None),
+        ("lead create", "post", "/api/leads/", lead_data),
+        ("lead update", "put", f"/api/leads/{lead.pk}/", lead_data),
+    ]
+
+
+def measure(client, method, url, data, iterations, warmup):
+    request = getattr(client, method)
+    kwargs = {"format": "json"} if data is not None else {}
+
+    for _ in range(warmup):
+        check(request(url, data, **kwargs), method, url)
+
+    latencies, queries = [], []
+    for _ in range(iterations):
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            response = request(url, data, **kwargs)
+            latencies.append(time.perf_counter() - started)
+        check(response, method, url)
+        queries.append(len(context.captured_queries))
+
+    # tracemalloc slows everything down, memory is measured on a request of its own
+    tracemalloc.start()
+    try:
+        check(request(url, data, **kwargs), method, url)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "queries": max(queries),
+        "peak_memory_kb": round(peak / 1024, 1),
+    }
+
+
+def check(response, method, url):
+    if response.status_code >= 400:
+        raise AssertionError(f"{method.upper()} {url} returned {response.status_code}: {response.content[:200]}")
+
+
+def run(size, iterations=30, warmup=3, log=None):
+    """{"<size>/<role>/<scenario>": results} for the data in the database"""
+    results = {}
+    for role, user in get_users().items():
+        client = APIClient()
+        token = TokenObtainPairSerializer.get_token(user).access_token
+        client.credentials(HTTP_AUTHORIZATION=f"JWT {token}")
+        for name, method, url, data in get_scenarios(role, user):
+            key = f"{size}/{role}/{name}"
+            results[key] = measure(client, method, url, data, iterations, warmup)
+            if log:
+                log(key, results[key])
+    return results
+
+
+def compare(report, baseline, threshold):
+    """
+        Regressions of report against baseline: latency (p95) and peak memory more than `threshold`
+        (0.2 = 20%) higher, any additional query. Scenarios missing in one of them are ignored.
+    """
+    regressions = []
+    for key, result in report["results"].items():
+        previous = baseline["results"].get(key)
+        if previous is None:
+            continue
+        if result["queries"] > previous["queries"]:
+            regressions.append(f"{key}: {result['queries']} queries, baseline {previous['queries']}")
+        for metric in ("p95_ms", "peak_memory_kb"):
+            if result[metric] > previous[metric] * (1 + threshold):
+                regressions.append(f"{key}: {metric} {result[metric]}, baseline {previous[metric]}")
+    return regressions
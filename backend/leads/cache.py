@@ -0,0 +1,27 @@
+import time
+
+from django.core.cache import cache
+
+CATEGORIES_VERSION_KEY = "leads:categories:version"
+CATEGORIES_TIMEOUT = 60 * 60 * 24
+
+
+def get_categories_version():
+    version = cache.get(CATEGORIES_VERSION_KEY)
+    if version is None:
+        # a new version that can't be the one of an entry stored before the key was evicted
+        cache.add(CATEGORIES_VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(CATEGORIES_VERSION_KEY)
+    return version
+
+
+def bump_categories_version():
+    """Every cached category response becomes unreachable. called when a category changes"""
+    try:
+        cache.incr(CATEGORIES_VERSION_KEY)
+    except ValueError:
+        cache.add(CATEGORIES_VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def categories_key(name):
+    return f"leads:categories:{get_categories_version()}:{name}"
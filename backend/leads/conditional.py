@@ -0,0 +1,39 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+def make_etag(*parts):
+    """Weak ETag, the same representation can be rendered with different bytes (JSON/XML)"""
+    digest = hashlib.md5(":".join(map(str, parts)).encode("utf-8")).hexdigest()
+    return f'W/"{digest}"'
+
+
+class ConditionalGetMixin:
+    """
+        ETag and Last-Modified for GET requests.
+
+        not_modified() returns a 304 response when If-None-Match / If-Modified-Since of the request
+        match, so the view can return it before serializing anything. The validators are sent on
+        the 200 and on the 304 response.
+
+        Lists only have an ETag: the newest updated_at of a page doesn't change when a lead is
+        deleted or leaves the page, and Last-Modified has a one second precision.
+    """
+
+    def not_modified(self, request, etag, last_modified=None):
+        self.etag = etag
+        self.last_modified = int(last_modified.timestamp()) if last_modified else None
+        return get_conditional_response(request, etag=self.etag, last_modified=self.last_modified)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        return self.add_validators(response)
+
+    def add_validators(self, response):
+        if getattr(self, "etag", None) and response.status_code in (200, 304):
+            response["ETag"] = self.etag
+            if self.last_modified:
+                response["Last-Modified"] = http_date(self.last_modified)
+        return response
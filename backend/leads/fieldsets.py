@@ -0,0 +1,69 @@
+"""
+    Sparse fieldsets for the lead endpoints: ?fields=id,first_name,last_name,agent returns only
+    these fields, ?omit=description all but these. Names are validated against Meta.fields of the
+    serializer of the request (LeadSerializer / LeadAdminSerializer).
+
+    Only reads are trimmed (GET, HEAD), writes validate and return every field. The fields that
+    aren't returned aren't read either: the views select the columns of the fieldset.
+"""
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+
+
+def parse_names(value):
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+def get_fieldset(query_params, serializer_class):
+    """Requested names of Meta.fields, in the order of Meta.fields. None when all are requested"""
+    if "fields" not in query_params and "omit" not in query_params:
+        return None
+    allowed = serializer_class.Meta.fields
+    requested = {param: parse_names(query_params.get(param, "")) for param in ("fields", "omit")}
+
+    errors = {}
+    for param, names in requested.items():
+        unknown = [name for name in names if name not in allowed]
+        if unknown:
+            errors[param] = [f"Unknown fields: {', '.join(unknown)}"]
+    if errors:
+        raise ValidationError(errors)
+
+    fields = requested["fields"] or allowed
+    fieldset = [name for name in allowed if name in fields and name not in requested["omit"]]
+    if not fieldset:
+        raise ValidationError({"fields": ["At least one field must be returned"]})
+    return fieldset
+
+
+class SparseFieldsMixin:
+    """
+        get_fieldset() of the request, get_serializer() without the other fields and
+        get_queryset() with only() the columns of the fieldset and of `required_fields`
+        (what the view itself reads: scope, validators).
+    """
+
+    required_fields = []
+
+    def get_fieldset(self):
+        if self.request.method not in SAFE_METHODS:
+            return None
+        if not hasattr(self, "_fieldset"):
+            self._fieldset = get_fieldset(self.request.query_params, self.get_serializer_class())
+        return self._fieldset
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        fieldset = self.get_fieldset()
+        if fieldset is not None:
+            fields = getattr(serializer, "child", serializer).fields
+            for name in [name for name in fields if name not in fieldset]:
+                fields.pop(name)
+        return serializer
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fieldset = self.get_fieldset()
+        if fieldset is not None:
+            queryset = queryset.only(*fieldset, *self.required_fields)
+        return queryset
@@ -0,0 +1,36 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVectorField
+from django.db.models import FloatField
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast
+from rest_framework.filters import SearchFilter
+
+SEARCH_CONFIG = "english"
+
+
+class LeadSearchFilter(SearchFilter):
+    """
+        Full-text search over the leads_lead.search_vector column.
+
+        search_vector is a stored generated tsvector (first_name, last_name and email weighted A/B,
+        description weighted C) with a GIN index, see migration 0008. The column is not a model
+        field, Django would try to write it on every save.
+        ?search= is parsed with websearch_to_tsquery, so "john -smith", "open deal" and "or" work.
+        Results are ordered by rank unless an ?ordering= is given.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terms = request.query_params.get(self.search_param, "").strip()
+        if not terms:
+            return queryset
+
+        query = SearchQuery(terms, search_type="websearch", config=SEARCH_CONFIG)
+        vector = RawSQL(
+            f'"{queryset.model._meta.db_table}"."search_vector"', [], output_field=SearchVectorField()
+        )
+        queryset = queryset.annotate(
+            search_document=vector,
+            # double precision so the rank survives the round trip through the pagination cursor
+            search_rank=Cast(SearchRank(vector, query), FloatField()),
+        ).filter(search_document=query)
+
+        return queryset.order_by("-search_rank")
@@ -0,0 +1,69 @@
+import http.client
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Send GET requests to running servers with N concurrent keep-alive clients and report the "
+        "throughput and latency of each URL. e.g. compare the WSGI and ASGI services of docker-compose: "
+        "benchmark_api http://localhost/api/leads/ http://localhost/api/async/leads/ --token ..."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("urls", nargs="+")
+        parser.add_argument("--token", help="Access token, sent as 'Authorization: JWT <token>'")
+        parser.add_argument("--concurrency", type=int, default=50)
+        parser.add_argument("--requests", type=int, default=2000, help="Requests per URL")
+
+    def handle(self, *args, **options):
+        headers = {"Authorization": f"JWT {options['token']}"} if options["token"] else {}
+        for url in options["urls"]:
+            latencies, errors, elapsed = self.run(url, headers, options["concurrency"], options["requests"])
+            if not latencies:
+                raise CommandError(f"{url}: every request failed")
+            quantiles = statistics.quantiles(latencies, n=100)
+            self.stdout.write(
+                f"{url}: {len(latencies) / elapsed:.0f} req/s, "
+                f"p50 {quantiles[49] * 1000:.1f}ms p95 {quantiles[94] * 1000:.1f}ms "
+                f"p99 {quantiles[98] * 1000:.1f}ms, {errors} errors"
+            )
+
+    @staticmethod
+    def run(url, headers, concurrency, requests):
+        parts = urlsplit(url)
+        path = parts.path + (f"?{parts.query}" if parts.query else "")
+        connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        local = threading.local()
+        lock = threading.Lock()
+        latencies, errors = [], 0
+
+        def request(_):
+            nonlocal errors
+            if not hasattr(local, "connection"):
+                local.connection = connection_class(parts.netloc, timeout=30)
+            started = time.perf_counter()
+            try:
+                local.connection.request("GET", path, headers=headers)
+                response = local.connection.getresponse()
+                response.read()
+                ok = response.status < 400
+            except (OSError, http.client.HTTPException):
+                local.connection.close()
+                ok = False
+            latency = time.perf_counter() - started
+            with lock:
+                if ok:
+                    latencies.append(latency)
+                else:
+                    errors += 1
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(request, range(requests)))
+        return latencies, errors, time.perf_counter() - started
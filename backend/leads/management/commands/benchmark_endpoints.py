@@ -0,0 +1,108 @@
+import json
+import platform
+from contextlib import nullcontext
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from leads import benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the API endpoints with the test client on datasets of several sizes. Every size gets "
+        "its own test database seeded by seed_crm (kept with --keepdb, seeding 1M leads takes minutes). "
+        "Writes p50/p95/p99 latency, queries per request and peak memory of every scenario to a JSON "
+        "report and fails if it regressed against --baseline. Run with --query-inspector against a "
+        "baseline without it to measure the overhead of the slow-query/N+1 detector."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="1000,100000,1000000", help="Comma separated numbers of leads")
+        parser.add_argument("--iterations", type=int, default=30, help="Measured requests per scenario")
+        parser.add_argument("--warmup", type=int, default=3)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--report", default="benchmark-report.json")
+        parser.add_argument("--baseline", help="Report of a previous run to compare with")
+        parser.add_argument(
+            "--threshold", type=float, default=0.2, help="Allowed latency/memory increase (0.2 = 20%%)"
+        )
+        parser.add_argument("--keepdb", action="store_true", help="Keep (and reuse) the seeded databases")
+        parser.add_argument(
+            "--query-inspector", action="store_true", help="Enable simplecrm.query_inspector for the requests"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options["sizes"].split(",")]
+        except ValueError:
+            raise CommandError("--sizes must be numbers, e.g. 1000,100000")
+        baseline = None
+        if options["baseline"]:
+            with open(options["baseline"]) as file:
+                baseline = json.load(file)
+
+        report = {
+            "meta": {
+                "created": datetime.now(timezone.utc).isoformat(),
+                "sizes": sizes,
+                "iterations": options["iterations"],
+                "database": connection.vendor,
+                "python": platform.python_version(),
+                "query_inspector": options["query_inspector"],
+            },
+            "results": {},
+        }
+
+        # the middleware is loaded by the first request of each test client, after the override
+        inspector = override_settings(QUERY_INSPECTOR={**settings.QUERY_INSPECTOR, "ENABLED": True})
+        setup_test_environment(debug=False)
+        try:
+            with inspector if options["query_inspector"] else nullcontext():
+                for size in sizes:
+                    report["results"].update(self.run_size(size, options))
+        finally:
+            teardown_test_environment()
+
+        with open(options["report"], "w") as file:
+            json.dump(report, file, indent=2, sort_keys=True)
+        self.stdout.write(f"Report written to {options['report']}")
+
+        if baseline is not None:
+            regressions = benchmarks.compare(report, baseline, options["threshold"])
+            if regressions:
+                raise CommandError("Regressions against the baseline:\n" + "\n".join(regressions))
+            self.stdout.write(self.style.SUCCESS("No regression against the baseline"))
+
+    def run_size(self, size, options):
+        old_name = connection.settings_dict["NAME"]
+        connection.settings_dict["TEST"] = {
+            **connection.settings_dict.get("TEST", {}),
+            "NAME": f"benchmark_{old_name}_{size}",
+        }
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, keepdb=options["keepdb"], serialize=False
+        )
+        try:
+            if not get_user_model().objects.filter(username=f"{benchmarks.SEED_PREFIX}-org0").exists():
+                self.stdout.write(f"Seeding {size} leads")
+                call_command(
+                    "seed_crm", leads=size, seed=options["seed"], prefix=benchmarks.SEED_PREFIX,
+                    stdout=self.stdout,
+                )
+            return benchmarks.run(
+                size, options["iterations"], options["warmup"], log=self.log
+            )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options["keepdb"])
+
+    def log(self, key, result):
+        self.stdout.write(
+            f"{key}: p50 {result['p50_ms']}ms p95 {result['p95_ms']}ms p99 {result['p99_ms']}ms, "
+            f"{result['queries']} queries, {result['peak_memory_kb']}KB"
+        )
@@ -0,0 +1,115 @@
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.handlers.base import BaseHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.test.utils import override_settings
+
+# a fresh interpreter, so nothing is imported yet
+IMPORT_WSGI = (
+    "import os, sys, time; os.environ['DJANGO_SETTINGS_MODULE'] = sys.argv[1]; "
+    "started = time.perf_counter(); import simplecrm.wsgi; print(time.perf_counter() - started)"
+)
+PATHS = ["/api/leads/", "/admin/login/"]
+
+
+def empty_view(request):
+    return HttpResponse()
+
+
+class MiddlewareHandler(BaseHandler):
+    """The middleware of the settings (process_view included) around a view returning an empty response"""
+
+    def __init__(self):
+        super().__init__()
+        self.load_middleware()
+
+    def _get_response(self, request):
+        for process_view in self._view_middleware:
+            response = process_view(request, empty_view, (), {})
+            if response is not None:
+                return response
+        return empty_view(request)
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the cold import time of simplecrm.wsgi (django.setup(), apps and settings) in new "
+        "processes for each settings module, and the time the middleware add to a request, with "
+        "SITE_MIDDLEWARE nested under SiteMiddleware (routed) and listed in MIDDLEWARE (flat). "
+        "The middleware come from the settings the command runs with, "
+        "e.g. --settings simplecrm.settings.production."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--settings-modules", default="simplecrm.settings.development,simplecrm.settings.production",
+            help="Comma separated settings modules to import simplecrm.wsgi with",
+        )
+        parser.add_argument("--imports", type=int, default=5, help="Processes per settings module")
+        parser.add_argument("--requests", type=int, default=2000, help="Requests per middleware stack and path")
+        parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+
+    def handle(self, *args, **options):
+        results = {"import_ms": {}, "middleware_us": {}}
+        for module in options["settings_modules"].split(","):
+            times = self.import_times(module, options["imports"])
+            results["import_ms"][module] = round(statistics.median(times), 1)
+
+        for stack, middleware in self.stacks().items():
+            with override_settings(MIDDLEWARE=middleware):
+                handler = MiddlewareHandler()
+            for path in PATHS:
+                duration = self.request_time(handler, path, options["requests"])
+                results["middleware_us"][f"{stack} {path}"] = round(duration, 1)
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for module, duration in results["import_ms"].items():
+            self.stdout.write(f"import simplecrm.wsgi with {module}: {duration}ms")
+        for key, duration in results["middleware_us"].items():
+            self.stdout.write(f"middleware {key}: {duration}us per request")
+
+    @staticmethod
+    def import_times(module, count):
+        times = []
+        for _ in range(count):
+            result = subprocess.run(
+                [sys.executable, "-c", IMPORT_WSGI, module],
+                cwd=settings.BASE_DIR, capture_output=True, text=True,
+            )
+            if result.returncode:
+                raise CommandError(f"Importing simplecrm.wsgi with {module} failed:\n{result.stderr}")
+            times.append(float(result.stdout) * 1000)
+        return times
+
+    @staticmethod
+    def stacks():
+        routed = list(settings.MIDDLEWARE)
+        flat = []
+        for middleware in routed:
+            if middleware == "simplecrm.middleware.SiteMiddleware":
+                flat.extend(settings.SITE_MIDDLEWARE)
+            else:
+                flat.append(middleware)
+        return {"routed": routed, "flat": flat}
+
+    @staticmethod
+    def request_time(handler, path, count):
+        """Median of batches of 100 requests, in microseconds per request"""
+        factory = RequestFactory()
+        batches = []
+        for _ in range(max(count // 100, 1)):
+            requests = [factory.get(path) for _ in range(100)]
+            started = time.perf_counter()
+            for request in requests:
+                handler.get_response(request)
+            batches.append((time.perf_counter() - started) / len(requests) * 1_000_000)
+        return statistics.median(batches)
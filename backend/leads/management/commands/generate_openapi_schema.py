@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from simplecrm.schema import CODECS, get_code_version, schema_path, write_schema
+
+
+class Command(BaseCommand):
+    help = (
+        "Render the OpenAPI schema of the current code version to OPENAPI_SCHEMA_DIR, served by "
+        "/openapi.json and /openapi.yaml (and the Swagger and ReDoc pages). Run it on deploy, "
+        "files of the version are reused, older versions are removed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="Render even if the files of the version exist")
+
+    def handle(self, *args, **options):
+        version = get_code_version()
+        for schema_format in CODECS:
+            path = schema_path(version, schema_format)
+            if path.exists() and not options["force"]:
+                self.stdout.write(f"{path} is up to date")
+                continue
+            path, content = write_schema(version, schema_format)
+            self.stdout.write(f"Wrote {path} ({len(content)} bytes)")
+
+            for stale in path.parent.glob(f"openapi-*.{schema_format}"):
+                if stale != path:
+                    stale.unlink()
+                    self.stdout.write(f"Removed {stale}")
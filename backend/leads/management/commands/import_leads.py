@@ -0,0 +1,309 @@
+import csv
+import hashlib
+import io
+import time
+from datetime import datetime
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.validators import validate_email
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from leads.cache import bump_categories_version
+from leads.models import Agent, Category, Lead, LeadImport, OrganizerUser
+from leads.stats import record_staged
+
+COLUMNS = [
+    "first_name",
+    "last_name",
+    "age",
+    "agent_id",
+    "category_id",
+    "description",
+    "date_added",
+    "phone_number",
+    "email",
+    "converted_date",
+]
+# NOT NULL columns that may be empty
+TEXT_COLUMNS = ["first_name", "last_name", "description", "phone_number", "email"]
+
+
+def value(row, name):
+    """Stripped value of a column. missing columns are empty"""
+    return (row.get(name) or "").strip()
+
+
+def copy_value(item):
+    if item is None:
+        return ""
+    if isinstance(item, datetime):
+        return item.isoformat()
+    return item
+
+
+class RowNormalizer:
+    """
+        Validates and cleans CSV rows.
+
+        agent is an agent's username and category a category title. Both are resolved to ids with one
+        query per chunk and cached for the rest of the import. Missing categories are created.
+    """
+
+    def __init__(self):
+        self.agents = {}
+        self.categories = {}
+        self.max_length = {
+            field.name: field.max_length for field in Lead._meta.fields if field.max_length
+        }
+        self.category_length = Category._meta.get_field("title").max_length
+
+    def load(self, rows):
+        usernames = {value(row, "agent") for row in rows} - set(self.agents) - {""}
+        if usernames:
+            found = dict(
+                Agent.objects.filter(user__username__in=usernames).values_list("user__username", "id")
+            )
+            self.agents.update({username: found.get(username) for username in usernames})
+
+        titles = {value(row, "category") for row in rows} - set(self.categories) - {""}
+        titles = {title for title in titles if len(title) <= self.category_length}
+        if titles:
+            found = dict(Category.objects.filter(title__in=titles).values_list("title", "id"))
+            missing = [Category(title=title) for title in titles if title not in found]
+            for category in Category.objects.bulk_create(missing):
+                found[category.title] = category.id
+            if missing:
+                # bulk_create doesn't send post_save
+                bump_categories_version()
+            self.categories.update(found)
+
+    def normalize(self, row):
+        """Returns the values for COLUMNS or raises ValueError"""
+        first_name = self.text(row, "first_name", required=True)
+        last_name = self.text(row, "last_name", required=True)
+        age = value(row, "age") or 0
+        try:
+            age = int(age)
+        except ValueError:
+            raise ValueError(f"age: {age!r} is not a number")
+        if age < 0:
+            raise ValueError("age: must be positive")
+
+        agent = value(row, "agent")
+        agent_id = self.agents.get(agent) if agent else None
+        if agent and agent_id is None:
+            raise ValueError(f"agent: {agent!r} does not exist")
+        category = value(row, "category")
+        if len(category) > self.category_length:
+            raise ValueError(f"category: longer than {self.category_length} characters")
+        category_id = self.categories.get(category) if category else None
+
+        email = self.text(row, "email", required=True).lower()
+        try:
+            validate_email(email)
+        except ValidationError:
+            raise ValueError(f"email: {email!r} is not valid")
+
+        return [
+            first_name,
+            last_name,
+            age,
+            agent_id,
+            category_id,
+            value(row, "description"),
+            self.date(row, "date_added") or timezone.now(),
+            self.text(row, "phone_number"),
+            email,
+            self.date(row, "converted_date"),
+        ]
+
+    def text(self, row, name, required=False):
+        text = " ".join(value(row, name).split())
+        if required and not text:
+            raise ValueError(f"{name}: this field is required")
+        if len(text) > self.max_length[name]:
+            raise ValueError(f"{name}: longer than {self.max_length[name]} characters")
+        return text
+
+    @staticmethod
+    def date(row, name):
+        text = value(row, name)
+        if not text:
+            return None
+        try:
+            parsed = parse_datetime(text)
+            if parsed is None and parse_date(text):
+                parsed = datetime.combine(parse_date(text), datetime.min.time())
+        except ValueError:
+            parsed = None
+        if parsed is None:
+            raise ValueError(f"{name}: {text!r} is not a date")
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
+
+
+class Command(BaseCommand):
+    help = (
+        "Import leads of an organizer from a CSV file. Columns: first_name, last_name, age, agent (username), "
+        "category (title), description, date_added, phone_number, email, converted_date. "
+        "Rows are copied to a staging table in chunks and merged into leads_lead in one statement. "
+        "Running the same command again after a crash continues where it stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV file with a header row")
+        parser.add_argument("--organizer", required=True, help="Username of the organizer")
+        parser.add_argument("--chunk-size", type=int, default=10000)
+        parser.add_argument("--delimiter", default=",")
+        parser.add_argument("--rejects", help="Append rejected rows and their errors to this CSV file")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("import_leads needs PostgreSQL (COPY FROM STDIN)")
+
+        try:
+            organizer = OrganizerUser.objects.get(user__username=options["organizer"])
+        except OrganizerUser.DoesNotExist:
+            raise CommandError(f"Organizer {options['organizer']!r} does not exist")
+
+        checksum = self.checksum(options["path"])
+        lead_import = (
+            LeadImport.objects.filter(organizer=organizer, checksum=checksum)
+            .order_by("-started_at")
+            .first()
+        )
+        if lead_import and lead_import.finished_at:
+            raise CommandError(f"This file was already imported at {lead_import.finished_at}")
+        if lead_import:
+            self.stdout.write(f"Resuming import from row {lead_import.rows_read}")
+        else:
+            with transaction.atomic():
+                lead_import = LeadImport.objects.create(
+                    organizer=organizer, source=str(options["path"])[-255:], checksum=checksum
+                )
+                self.create_staging_table(lead_import.staging_table)
+
+        started = time.monotonic()
+        resumed_at = lead_import.rows_read
+        normalizer = RowNormalizer()
+
+        with open(options["path"], newline="", encoding="utf-8-sig") as file:
+            reader = csv.DictReader(file, delimiter=options["delimiter"])
+            for _ in range(lead_import.rows_read):
+                next(reader, None)
+
+            rejects = open(options["rejects"], "a", newline="") if options["rejects"] else None
+            try:
+                for chunk in self.chunks(reader, options["chunk_size"]):
+                    self.stage(lead_import, chunk, normalizer, rejects)
+                    rate = (lead_import.rows_read - resumed_at) / max(time.monotonic() - started, 1e-9)
+                    self.stdout.write(
+                        f"{lead_import.rows_read} rows read, {lead_import.rows_rejected} rejected "
+                        f"({rate:.0f} rows/s)"
+                    )
+            finally:
+                if rejects:
+                    rejects.close()
+
+        merged = self.merge(lead_import)
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {merged} leads, {lead_import.rows_rejected} rows rejected, "
+                f"in {elapsed:.1f}s ({(lead_import.rows_read - resumed_at) / max(elapsed, 1e-9):.0f} rows/s)"
+            )
+        )
+
+    @staticmethod
+    def checksum(path):
+        sha = hashlib.sha256()
+        with open(path, "rb") as file:
+            for block in iter(lambda: file.read(1 << 20), b""):
+                sha.update(block)
+        return sha.hexdigest()
+
+    @staticmethod
+    def chunks(reader, size):
+        chunk = []
+        for row in reader:
+            chunk.append(row)
+            if len(chunk) == size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    @staticmethod
+    def create_staging_table(table):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    line bigint PRIMARY KEY,
+                    first_name varchar(40) NOT NULL,
+                    last_name varchar(40) NOT NULL,
+                    age integer NOT NULL,
+                    agent_id bigint,
+                    category_id bigint,
+                    description text NOT NULL,
+                    date_added timestamptz NOT NULL,
+                    phone_number varchar(20) NOT NULL,
+                    email varchar(254) NOT NULL,
+                    converted_date timestamptz
+                )
+                """
+            )
+
+    def stage(self, lead_import, chunk, normalizer, rejects):
+        """COPY a chunk into the staging table and move the checkpoint in the same transaction"""
+        normalizer.load(chunk)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        rejected = 0
+
+        for offset, row in enumerate(chunk):
+            line = lead_import.rows_read + offset + 1
+            try:
+                values = normalizer.normalize(row)
+            except ValueError as exc:
+                rejected += 1
+                if rejects:
+                    csv.writer(rejects).writerow([line, str(exc), *row.values()])
+                continue
+            writer.writerow([line, *map(copy_value, values)])
+
+        buffer.seek(0)
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                # an empty field is NULL in csv COPY, the text columns are empty strings instead
+                cursor.copy_expert(
+                    f"COPY {lead_import.staging_table} (line, {', '.join(COLUMNS)}) "
+                    f"FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL ({', '.join(TEXT_COLUMNS)}))",
+                    buffer,
+                )
+            lead_import.rows_read += len(chunk)
+            lead_import.rows_rejected += rejected
+            lead_import.save(update_fields=["rows_read", "rows_rejected"])
+
+    @staticmethod
+    def merge(lead_import):
+        """Move all the staged rows to leads_lead with one INSERT ... SELECT"""
+        columns = ", ".join(COLUMNS)
+        with transaction.atomic():
+            # the INSERT doesn't send post_save, count the rows for LeadStats here
+            record_staged(lead_import.staging_table, lead_import.organizer_id)
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"INSERT INTO {Lead._meta.db_table} ({columns}, organizer_id, updated_at) "
+                    f"SELECT {columns}, %s, now() FROM {lead_import.staging_table} ORDER BY line",
+                    [lead_import.organizer_id],
+                )
+                merged = cursor.rowcount
+                cursor.execute(f"DROP TABLE {lead_import.staging_table}")
+            lead_import.finished_at = timezone.now()
+            lead_import.save(update_fields=["finished_at"])
+        return merged
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from leads.models import OrganizerUser
+from leads.stats import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the lead statistics (LeadStats) from the leads. They are kept up to date when leads "
+        "are written, use this to repair them e.g. after a QuerySet.update() or a raw SQL change."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--organizer", action="append", help="Username of an organizer, can be repeated. Default: all"
+        )
+
+    def handle(self, *args, **options):
+        organizer_ids = None
+        if options["organizer"]:
+            found = dict(
+                OrganizerUser.objects.filter(user__username__in=options["organizer"]).values_list(
+                    "user__username", "id"
+                )
+            )
+            missing = set(options["organizer"]) - set(found)
+            if missing:
+                raise CommandError(f"Organizers {', '.join(sorted(missing))} do not exist")
+            organizer_ids = list(found.values())
+
+        rows = rebuild(organizer_ids)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} lead stats rows"))
@@ -0,0 +1,220 @@
+import csv
+import io
+import random
+import time
+from bisect import bisect
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from leads.cache import bump_categories_version
+from leads.models import Agent, Category, Lead, OrganizerUser
+from leads.stats import rebuild
+
+FIRST_NAMES = [
+    "James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda", "David", "Elizabeth",
+    "William", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah", "Ali", "Sara",
+    "Reza", "Maryam", "Hossein", "Zahra", "Wei", "Mei", "Carlos", "Lucia", "Ahmed", "Fatima",
+]
+LAST_NAMES = [
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez",
+    "Hernandez", "Lopez", "Wilson", "Anderson", "Taylor", "Moore", "Jackson", "Martin", "Lee", "Thompson",
+    "Ahmadi", "Hosseini", "Karimi", "Rezaei", "Wang", "Li", "Zhang", "Silva", "Khan", "Nguyen",
+]
+WORDS = [
+    "interested", "in", "the", "premium", "basic", "plan", "call", "back", "next", "week", "asked", "for",
+    "a", "demo", "pricing", "budget", "approved", "waiting", "on", "manager", "trial", "renewal", "upgrade",
+    "discount", "contract", "meeting", "email", "follow", "up", "not", "now",
+]
+CATEGORIES = [
+    "New", "Contacted", "Qualified", "Proposal", "Negotiation", "Won", "Lost", "Cold",
+    "Referral", "Website", "Event", "Partner", "Ads", "Newsletter", "Webinar", "Trade show",
+]
+COLUMNS = [
+    "first_name",
+    "last_name",
+    "age",
+    "organizer_id",
+    "agent_id",
+    "category_id",
+    "description",
+    "date_added",
+    "phone_number",
+    "email",
+    "converted_date",
+    "updated_at",
+]
+
+
+def zipf_weights(size, exponent):
+    """Cumulative weights of 1/rank^exponent: a few organizers/agents/categories hold most of the leads"""
+    return list(accumulate(1 / (rank ** exponent) for rank in range(1, size + 1)))
+
+
+class Command(BaseCommand):
+    help = (
+        "Create a synthetic tenant for load and performance tests: organizers with their agents, "
+        "categories and a skewed distribution of leads over a date range. The data only depends "
+        "on the options, the same --seed creates the same leads. Leads are written with COPY "
+        "(bulk_create on other databases) in batches. Users get the password given with --password."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--organizers", type=int, default=10)
+        parser.add_argument("--agents", type=int, default=5, help="Agents per organizer")
+        parser.add_argument("--categories", type=int, default=8)
+        parser.add_argument("--leads", type=int, default=100000, help="Total number of leads")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--prefix", default="seed", help="Prefix of the usernames, must not be in use")
+        parser.add_argument("--password", default="seed-password")
+        parser.add_argument("--end", default="2022-12-31", help="Last day of date_added (YYYY-MM-DD)")
+        parser.add_argument("--days", type=int, default=730, help="Days of date_added before --end")
+        parser.add_argument("--conversion-rate", type=float, default=0.15)
+        parser.add_argument("--unassigned-rate", type=float, default=0.1, help="Leads without an agent")
+        parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of the lead distribution")
+        parser.add_argument("--batch-size", type=int, default=20000)
+
+    def handle(self, *args, **options):
+        if options["categories"] > len(CATEGORIES):
+            raise CommandError(f"At most {len(CATEGORIES)} categories")
+        for name in ("organizers", "agents", "categories", "leads", "days"):
+            if options[name] < 0:
+                raise CommandError(f"--{name} must not be negative")
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1")
+        if options["leads"] and not (options["organizers"] and options["categories"]):
+            raise CommandError("--leads needs at least one organizer and one category")
+        try:
+            end = datetime.strptime(options["end"], "%Y-%m-%d").replace(tzinfo=dt_timezone.utc)
+        except ValueError:
+            raise CommandError("--end must be YYYY-MM-DD")
+        User = get_user_model()
+        if User.objects.filter(username__startswith=f"{options['prefix']}-").exists():
+            raise CommandError(f"Users with prefix {options['prefix']!r} exist, use another --prefix")
+
+        started = time.monotonic()
+        rng = random.Random(options["seed"])
+        with transaction.atomic():
+            tenants = self.create_users(options)
+            categories = self.create_categories(options)
+        self.stdout.write(
+            f"{len(tenants)} organizers, {len(tenants) * options['agents']} agents, "
+            f"{len(categories)} categories"
+        )
+
+        write = self.copy if connection.vendor == "postgresql" else self.bulk_create
+        rows = self.leads(rng, tenants, categories, end, options)
+        written = 0
+        while written < options["leads"]:
+            batch = [next(rows) for _ in range(min(options["batch_size"], options["leads"] - written))]
+            with transaction.atomic():
+                write(batch)
+            written += len(batch)
+            self.stdout.write(f"{written} leads ({written / (time.monotonic() - started):.0f} leads/s)")
+
+        # COPY and bulk_create don't send the signals that maintain LeadStats
+        rebuild([organizer.pk for organizer, _ in tenants])
+        self.stdout.write(
+            self.style.SUCCESS(f"Created {written} leads in {time.monotonic() - started:.1f}s")
+        )
+
+    @staticmethod
+    def create_users(options):
+        """[(organizer, [agents])]. bulk_create doesn't send post_save, the roles are created here"""
+        User = get_user_model()
+        password = make_password(options["password"])
+        prefix = options["prefix"]
+
+        organizer_users = User.objects.bulk_create(
+            User(username=f"{prefix}-org{i}", email=f"{prefix}-org{i}@example.com", password=password,
+                 is_organizer=True)
+            for i in range(options["organizers"])
+        )
+        organizers = OrganizerUser.objects.bulk_create(OrganizerUser(user=user) for user in organizer_users)
+
+        agent_users = User.objects.bulk_create(
+            User(username=f"{prefix}-org{i}-agent{j}", email=f"{prefix}-org{i}-agent{j}@example.com",
+                 password=password, is_agent=True)
+            for i in range(options["organizers"])
+            for j in range(options["agents"])
+        )
+        agents = Agent.objects.bulk_create(
+            Agent(user=user, organizer=organizers[index // options["agents"]])
+            for index, user in enumerate(agent_users)
+        )
+        return [
+            (organizer, agents[i * options["agents"]:(i + 1) * options["agents"]])
+            for i, organizer in enumerate(organizers)
+        ]
+
+    @staticmethod
+    def create_categories(options):
+        titles = CATEGORIES[: options["categories"]]
+        found = dict(Category.objects.filter(title__in=titles).values_list("title", "id"))
+        missing = Category.objects.bulk_create(Category(title=title) for title in titles if title not in found)
+        if missing:
+            # bulk_create doesn't send post_save
+            bump_categories_version()
+        found.update((category.title, category.id) for category in missing)
+        return [found[title] for title in titles]
+
+    @staticmethod
+    def leads(rng, tenants, categories, end, options):
+        """Endless rows of COLUMNS values, only depends on the state of rng"""
+        organizer_weights = zipf_weights(len(tenants), options["skew"])
+        agent_weights = zipf_weights(options["agents"], options["skew"]) if options["agents"] else []
+        category_weights = zipf_weights(len(categories), options["skew"])
+        seconds = options["days"] * 24 * 3600
+        now = datetime.now(dt_timezone.utc)
+        number = 0
+
+        while True:
+            number += 1
+            organizer, agents = tenants[bisect(organizer_weights, rng.random() * organizer_weights[-1])]
+            agent = None
+            if agents and rng.random() >= options["unassigned_rate"]:
+                agent = agents[bisect(agent_weights, rng.random() * agent_weights[-1])]
+            category = categories[bisect(category_weights, rng.random() * category_weights[-1])]
+
+            # more leads in recent months
+            date_added = end - timedelta(seconds=int(seconds * rng.random() ** 1.5))
+            converted_date = None
+            if rng.random() < options["conversion_rate"]:
+                converted_date = date_added + timedelta(days=rng.randint(1, 60), seconds=rng.randint(0, 86399))
+
+            first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            yield [
+                first_name,
+                last_name,
+                rng.randint(18, 80),
+                organizer.pk,
+                agent and agent.pk,
+                category,
+                " ".join(rng.choices(WORDS, k=rng.randint(3, 12))),
+                date_added,
+                f"555-{rng.randint(0, 999):03d}-{rng.randint(0, 9999):04d}",
+                f"{first_name}.{last_name}{number}@example.com".lower(),
+                converted_date,
+                now,
+            ]
+
+    @staticmethod
+    def copy(rows):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow(["" if value is None else value for value in row])
+        buffer.seek(0)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {Lead._meta.db_table} ({', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer
+            )
+
+    @staticmethod
+    def bulk_create(rows):
+        Lead.objects.bulk_create(Lead(**dict(zip(COLUMNS, row))) for row in rows)
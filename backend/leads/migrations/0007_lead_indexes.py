@@ -0,0 +1,54 @@
+# Generated by Django 4.1 on 2026-10-18 14:14
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("leads", "0006_alter_lead_category"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="lead",
+            name="agent",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                to="leads.agent",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="lead",
+            name="organizer",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="leads.organizeruser",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="lead",
+            index=models.Index(
+                fields=["organizer", "-date_added", "-id"],
+                name="lead_organizer_date_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="lead",
+            index=models.Index(
+                fields=["agent", "-date_added", "-id"], name="lead_agent_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="lead",
+            index=models.Index(
+                fields=["organizer", "category", "date_added"],
+                name="lead_org_category_date_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.1 on 2026-10-18 14:40
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("leads", "0007_lead_indexes"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="""
+                ALTER TABLE leads_lead ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+                    setweight(to_tsvector('english', coalesce(first_name, '')), 'A') ||
+                    setweight(to_tsvector('english', coalesce(last_name, '')), 'A') ||
+                    setweight(to_tsvector('english', coalesce(email, '')), 'B') ||
+                    setweight(to_tsvector('english', coalesce(description, '')), 'C')
+                ) STORED;
+                CREATE INDEX lead_search_vector_idx ON leads_lead USING GIN (search_vector);
+            """,
+            reverse_sql="""
+                DROP INDEX lead_search_vector_idx;
+                ALTER TABLE leads_lead DROP COLUMN search_vector;
+            """,
+        ),
+    ]
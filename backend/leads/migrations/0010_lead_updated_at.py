@@ -0,0 +1,22 @@
+# Generated by Django 4.1 on 2026-10-18 14:30
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("leads", "0009_leadimport"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="lead",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+    ]
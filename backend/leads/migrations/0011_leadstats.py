@@ -0,0 +1,87 @@
+# Generated by Django 4.1 on 2026-10-18 14:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.db.models.functions.comparison
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("leads", "0010_lead_updated_at"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LeadStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("month", models.DateField()),
+                ("total", models.IntegerField(default=0)),
+                ("converted", models.IntegerField(default=0)),
+                (
+                    "agent",
+                    models.ForeignKey(
+                        db_constraint=False,
+                        db_index=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="+",
+                        to="leads.agent",
+                    ),
+                ),
+                (
+                    "category",
+                    models.ForeignKey(
+                        db_constraint=False,
+                        db_index=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="+",
+                        to="leads.category",
+                    ),
+                ),
+                (
+                    "organizer",
+                    models.ForeignKey(
+                        db_constraint=False,
+                        db_index=False,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="+",
+                        to="leads.organizeruser",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "Lead stats",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="leadstats",
+            index=models.Index(
+                fields=["agent", "month"], name="lead_stats_agent_month_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="leadstats",
+            constraint=models.UniqueConstraint(
+                models.F("organizer"),
+                django.db.models.functions.comparison.Coalesce(
+                    "agent", models.Value(0)
+                ),
+                django.db.models.functions.comparison.Coalesce(
+                    "category", models.Value(0)
+                ),
+                models.F("month"),
+                name="lead_stats_key",
+            ),
+        ),
+    ]
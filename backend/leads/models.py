@@ -1,7 +1,13 @@
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
+# fields of a lead that decide where it is counted in LeadStats
+STATS_FIELDS = ("organizer_id", "agent_id", "category_id", "date_added", "converted_date")
+# the same fields as save(update_fields=) may name them, e.g. "agent" or "agent_id"
+STATS_UPDATE_FIELDS = {*STATS_FIELDS, "organizer", "agent", "category"}
+
 
 class UsersManager(models.Manager):
     """
@@ -55,12 +61,29 @@ class Category(models.Model):
         verbose_name_plural = "Categories"
 
 
+class LeadQuerySet(models.QuerySet):
+    def delete(self):
+        # LeadStats is kept here rather than by a delete signal: one would turn off the fast delete of
+        # the leads of a deleted organizer, whose LeadStats rows are deleted at once (leads.signals)
+        from . import stats  # leads.stats imports the models
+
+        with transaction.atomic(using=self.db, savepoint=False):
+            stats.record_deleted_queryset(self)
+            return super().delete()
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+
 class Lead(models.Model):
     first_name = models.CharField(max_length=40)
     last_name = models.CharField(max_length=40)
     age = models.IntegerField(default=0)
-    organizer = models.ForeignKey(OrganizerUser, on_delete=models.CASCADE)
-    agent = models.ForeignKey(Agent, null=True, blank=True, on_delete=models.SET_NULL)
+    # organizer and agent lookups are served by the composite indexes in Meta
+    organizer = models.ForeignKey(OrganizerUser, on_delete=models.CASCADE, db_index=False)
+    agent = models.ForeignKey(
+        Agent, null=True, blank=True, on_delete=models.SET_NULL, db_index=False
+    )
     category = models.ForeignKey(
         Category,
         null=True,
@@ -72,6 +95,125 @@ class Lead(models.Model):
     phone_number = models.CharField(max_length=20)
     email = models.EmailField()
     converted_date = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = LeadQuerySet.as_manager()
 
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        lead = super().from_db(db, field_names, values)
+        # what LeadStats counts for this lead, leads.stats moves it when these change
+        if all(name in lead.__dict__ for name in STATS_FIELDS):
+            lead._loaded_stats = {name: lead.__dict__[name] for name in STATS_FIELDS}
+        return lead
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if (
+            self.pk is None
+            or hasattr(self, "_loaded_stats")
+            or (update_fields is not None and not STATS_UPDATE_FIELDS & set(update_fields))
+            # loaded with only() / defer(), these fields aren't written
+            or set(STATS_FIELDS) <= self.get_deferred_fields()
+        ):
+            super().save(*args, **kwargs)
+            return
+        # saved without being loaded, e.g. Lead(pk=1, ...).save(): LeadStats moves the lead from its
+        # stored values. The row stays locked until the stats are updated by leads.signals
+        using = kwargs.get("using")
+        with transaction.atomic(using=using):
+            self._loaded_stats = (
+                Lead._base_manager.db_manager(using).select_for_update()
+                .filter(pk=self.pk)
+                .values(*STATS_FIELDS)
+                .first()
+            )
+            super().save(*args, **kwargs)
+
+    def delete(self, using=None, keep_parents=False):
+        from . import stats  # leads.stats imports the models
+
+        with transaction.atomic(using=using, savepoint=False):
+            deleted = super().delete(using=using, keep_parents=keep_parents)
+            stats.record_deleted([self])
+        return deleted
+
+    class Meta:
+        """
+            Leads are always filtered by organizer or agent and ordered by date_added (newest first),
+            so these indexes serve both the filter and the ORDER BY ... LIMIT of a page.
+        """
+
+        indexes = [
+            models.Index(fields=["organizer", "-date_added", "-id"], name="lead_organizer_date_idx"),
+            models.Index(fields=["agent", "-date_added", "-id"], name="lead_agent_date_idx"),
+            models.Index(fields=["organizer", "category", "date_added"], name="lead_org_category_date_idx"),
+        ]
+
+
+class LeadImport(models.Model):
+    """
+        Progress of an import_leads run. Rows are copied to a staging table in chunks and this row
+        is updated in the same transaction, so a crashed import continues from the last chunk.
+    """
+
+    organizer = models.ForeignKey(OrganizerUser, on_delete=models.CASCADE)
+    source = models.CharField(max_length=255)
+    checksum = models.CharField(max_length=64)
+    rows_read = models.PositiveBigIntegerField(default=0)
+    rows_rejected = models.PositiveBigIntegerField(default=0)
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.source} ({self.rows_read} rows)"
+
+    @property
+    def staging_table(self):
+        return f"leads_import_{self.pk}"
+
+
+class LeadStats(models.Model):
+    """
+        Number of leads and converted leads per organizer, agent, category and month (of date_added, UTC).
+        Rows are updated in place by leads.stats whenever leads are created, changed or deleted,
+        so the stats API reads a few rows instead of grouping leads_lead.
+        `manage.py rebuild_lead_stats` recomputes them from the leads.
+        No foreign key constraints: leads.signals folds the rows of deleted agents and categories
+        into the NULL rows, like Lead's SET_NULL does.
+    """
+
+    organizer = models.ForeignKey(
+        OrganizerUser, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, related_name="+"
+    )
+    agent = models.ForeignKey(
+        Agent, null=True, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, related_name="+"
+    )
+    category = models.ForeignKey(
+        Category, null=True, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, related_name="+"
+    )
+    month = models.DateField()
+    total = models.IntegerField(default=0)
+    converted = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.month:%Y-%m}: {self.converted}/{self.total}"
+
+    class Meta:
+        verbose_name_plural = "Lead stats"
+        constraints = [
+            # NULL agent/category are one key, leads.stats upserts with ON CONFLICT on this index
+            models.UniqueConstraint(
+                models.F("organizer"),
+                Coalesce("agent", models.Value(0)),
+                Coalesce("category", models.Value(0)),
+                models.F("month"),
+                name="lead_stats_key",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["agent", "month"], name="lead_stats_agent_month_idx"),
+        ]
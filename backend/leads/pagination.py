@@ -0,0 +1,195 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from copy import copy
+from datetime import datetime
+
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.utils.urls import replace_query_param
+
+
+class LeadCursorPagination(CursorPagination):
+    """
+        Keyset pagination for leads.
+
+        The cursor holds the values of the last row of a page for every ordering key, so the
+        next page is fetched with a WHERE (date_added, id) < (...) condition instead of OFFSET.
+        The ordering from the filter backends (?ordering=category, search rank, ...) is honored and
+        date_added and id are always appended as tie-breakers, so every row has a unique position.
+        There is no COUNT(*) query. deep pages cost the same as the first one.
+    """
+
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+    ordering = "-date_added"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None, names=None):
+        """
+            paginate_queryset for async views, the page is read with the async ORM.
+            With `names` the page holds values() rows of these fields and of the ordering keys.
+        """
+        queryset = self.page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        if names is not None:
+            queryset = queryset.values(*names, *(field.attname for field in self.fields))
+        return self.set_page([lead async for lead in queryset.aiterator()])
+
+    def page_queryset(self, queryset, request, view=None):
+        """The ordered and filtered queryset of the requested page, not evaluated"""
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.keys = self.get_ordering(request, queryset, view)
+        self.fields = [self._get_field(queryset, key.lstrip("-")) for key in self.keys]
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            values, self.reverse = None, False
+        else:
+            values, self.reverse = self.cursor
+
+        ordering = self.keys
+        if self.reverse:
+            ordering = [self._flip(key) for key in ordering]
+
+        queryset = queryset.order_by(
+            *[self._order_expression(key, field) for key, field in zip(ordering, self.fields)]
+        )
+        if values is not None:
+            queryset = queryset.filter(self._after(ordering, values))
+
+        # fetch one extra row to know if there is another page after this one
+        return queryset[: self.page_size + 1]
+
+    def set_page(self, results):
+        has_more = len(results) > self.page_size
+        self.page = results[: self.page_size]
+
+        if self.reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+
+        return self.page
+
+    def get_ordering(self, request, queryset, view):
+        """
+            Ordering applied by the filter backends (OrderingFilter validates it against ordering_fields,
+            LeadSearchFilter orders by rank) plus date_added and id tie-breakers.
+        """
+        ordering = [key for key in queryset.query.order_by if isinstance(key, str)]
+
+        ordering = ordering or [self.ordering]
+        if not any(key.lstrip("-") == "date_added" for key in ordering):
+            ordering.append("-date_added")
+        if not any(key.lstrip("-") == "id" for key in ordering):
+            ordering.append("-id" if ordering[-1].startswith("-") else "id")
+        return ordering
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self._link(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self._link(self.page[0], reverse=True)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            data = json.loads(urlsafe_b64decode(encoded.encode("ascii")).decode("utf-8"))
+            raw_values, reverse = data["v"], bool(data["r"])
+            if len(raw_values) != len(self.fields):
+                raise ValueError
+            values = [
+                None if value is None else field.to_python(value)
+                for field, value in zip(self.fields, raw_values)
+            ]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+        return values, reverse
+
+    def encode_cursor(self, values, reverse):
+        data = json.dumps({"v": values, "r": int(reverse)}, separators=(",", ":"))
+        encoded = urlsafe_b64encode(data.encode("utf-8")).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def _link(self, instance, reverse):
+        values = []
+        for field in self.fields:
+            # model instance or a row of values() that has the attnames of the ordering keys
+            value = instance[field.attname] if isinstance(instance, dict) else getattr(instance, field.attname)
+            if isinstance(value, datetime):
+                value = value.isoformat()
+            values.append(value)
+        return self.encode_cursor(values, reverse)
+
+    @staticmethod
+    def _get_field(queryset, name):
+        """
+            Model field or, for annotations such as search_rank, the annotation's output field
+        """
+        if name in queryset.query.annotations:
+            field = copy(queryset.query.annotations[name].output_field)
+            field.set_attributes_from_name(name)
+            return field
+        return queryset.model._meta.get_field(name)
+
+    @staticmethod
+    def _order_expression(key, field):
+        """
+            NULLs are sorted last on ascending and first on descending keys (PostgreSQL default),
+            so flipping the direction of every key gives exactly the reversed order.
+        """
+        if key.startswith("-"):
+            return F(field.attname).desc(nulls_first=True)
+        return F(field.attname).asc(nulls_last=True)
+
+    def _after(self, ordering, values):
+        """
+            Rows strictly after `values` for the given ordering:
+            (k1 > v1) OR (k1 = v1 AND k2 > v2) OR ...
+        """
+        condition = Q(pk__in=[])
+        equal = Q()
+        for key, field, value in zip(ordering, self.fields, values):
+            name = field.attname
+            descending = key.startswith("-")
+            if value is None:
+                greater = Q(**{f"{name}__isnull": False}) if descending else Q(pk__in=[])
+                same = Q(**{f"{name}__isnull": True})
+            elif descending:
+                greater = Q(**{f"{name}__lt": value})
+                same = Q(**{name: value})
+            else:
+                greater = Q(**{f"{name}__gt": value})
+                if field.null:
+                    greater |= Q(**{f"{name}__isnull": True})
+                same = Q(**{name: value})
+            condition |= equal & greater
+            equal &= same
+        return condition
+
+    @staticmethod
+    def _flip(key):
+        return key[1:] if key.startswith("-") else f"-{key}"
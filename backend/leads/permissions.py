@@ -1,6 +1,29 @@
 from rest_framework import permissions
 
 
+def get_lead_scope(user):
+    """
+        Filter kwargs of the leads the user can see: {} for superuser, the organizer_id or agent_id
+        of the caller, None if the user is not an agent or an organizer.
+        Only ids are compared, user.organizeruser / user.agent come from the token claims or the
+        cached user (core.authentication), so there is no query here.
+    """
+    if user.is_superuser:
+        return {}
+    elif user.is_organizer:
+        return {"organizer_id": user.organizeruser.pk}
+    elif user.is_agent:
+        return {"agent_id": user.agent.pk}
+    return None
+
+
+def in_lead_scope(user, obj):
+    scope = get_lead_scope(user)
+    if scope is None:
+        return False
+    return all(getattr(obj, name) == value for name, value in scope.items())
+
+
 class IsAdminOrOrganizer(permissions.BasePermission):
     def has_permission(self, request, view):
         """
@@ -16,22 +39,19 @@ class IsAdminOrOrganizer(permissions.BasePermission):
 
 
 class IsOrganizer(permissions.BasePermission):
+    def has_permission(self, request, view):
+        return bool(request.user and (request.user.is_superuser or request.user.is_organizer))
+
     def has_object_permission(self, request, view, obj):
-        if request.user:
-            if request.user.is_superuser:
-                return True
-            elif request.user.is_organizer:
-                return obj.organizer == request.user.organizeruser
-            elif request.user.is_agent:
-                return False
+        return in_lead_scope(request.user, obj)
 
 
 class IsAgent(permissions.BasePermission):
+    def has_permission(self, request, view):
+        return bool(
+            request.user
+            and (request.user.is_superuser or request.user.is_organizer or request.user.is_agent)
+        )
+
     def has_object_permission(self, request, view, obj):
-        if request.user:
-            if request.user.is_superuser:
-                return True
-            elif request.user.is_organizer:
-                return obj.organizer == request.user.organizeruser
-            elif request.user.is_agent:
-                return obj.agent == request.user.agent
\ No newline at end of file
+        return in_lead_scope(request.user, obj)
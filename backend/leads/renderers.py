@@ -0,0 +1,124 @@
+import abc
+import csv
+import json
+import re
+from xml.sax.saxutils import escape
+
+from django.utils.encoding import force_str
+from rest_framework.renderers import BaseRenderer
+from rest_framework_xml.renderers import XMLRenderer
+
+# characters XML 1.0 doesn't allow, even escaped
+ILLEGAL_XML_CHARACTERS = re.compile(r"[\x00-\x08\x0B\x0C\x0E-\x1F\uD800-\uDFFF\uFFFE\uFFFF]")
+
+
+def buffered(chunks, size=64 * 1024):
+    """Join small chunks so the response is written in blocks of about `size` bytes"""
+    buffer, length = [], 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield b"".join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+class Echo:
+    """
+        File-like object for csv.writer. write() returns the line instead of buffering it
+    """
+
+    def write(self, value):
+        return value
+
+
+class StreamingRenderer(BaseRenderer, metaclass=abc.ABCMeta):
+    """
+        Renderer that can also produce its output row by row.
+        stream() takes the column names and an iterable of row tuples and yields bytes, so a
+        StreamingHttpResponse can send rows while they are read from the database cursor.
+    """
+
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if not data:
+            return b""
+        if isinstance(data, dict):
+            # error responses e.g. {"detail": "..."}
+            data = [data]
+        fields = list(data[0].keys())
+        return b"".join(self.stream(fields, (row.values() for row in data)))
+
+    @abc.abstractmethod
+    def stream(self, fields, rows):
+        """Yield the encoded output of the column names `fields` and the row tuples `rows`"""
+
+
+class CSVRenderer(StreamingRenderer):
+    media_type = "text/csv"
+    format = "csv"
+
+    def stream(self, fields, rows):
+        writer = csv.writer(Echo())
+        yield writer.writerow(fields).encode(self.charset)
+        for row in rows:
+            yield writer.writerow(row).encode(self.charset)
+
+
+class NDJSONRenderer(StreamingRenderer):
+    """One JSON object per line"""
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+
+    def stream(self, fields, rows):
+        for row in rows:
+            line = json.dumps(dict(zip(fields, row)), ensure_ascii=False)
+            yield f"{line}\n".encode(self.charset)
+
+
+class StreamingXMLRenderer(StreamingRenderer):
+    """
+        Same document as rest_framework_xml's XMLRenderer for a list of objects:
+        <root><list-item><id>1</id>...</list-item>...</root>
+        but every row is written as soon as it is read, instead of building the whole document in memory.
+        Characters XML 1.0 doesn't allow (control characters) are left out of the values.
+
+        Used by the export (/api/leads/export/?format=xml). The list keeps XMLRenderer: a page is
+        read whole for its ETag and has at most max_page_size leads.
+    """
+
+    media_type = XMLRenderer.media_type
+    format = XMLRenderer.format
+    item_tag_name = XMLRenderer.item_tag_name
+    root_tag_name = XMLRenderer.root_tag_name
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return XMLRenderer().render(data, accepted_media_type, renderer_context)
+
+    def stream(self, fields, rows):
+        yield (
+            f'<?xml version="1.0" encoding="{self.charset}"?>\n<{self.root_tag_name}>'
+        ).encode(self.charset)
+
+        item_start, item_end = f"<{self.item_tag_name}>", f"</{self.item_tag_name}>"
+        tags = [(f"<{field}>", f"</{field}>") for field in fields]
+        for row in rows:
+            parts = [item_start]
+            for (start, end), value in zip(tags, row):
+                parts.append(start)
+                if value is not None:
+                    parts.append(self.characters(value))
+                parts.append(end)
+            parts.append(item_end)
+            yield "".join(parts).encode(self.charset)
+
+        yield f"</{self.root_tag_name}>".encode(self.charset)
+
+    @staticmethod
+    def characters(value):
+        # dropped: raising would cut the body after the 200 status was sent
+        return escape(ILLEGAL_XML_CHARACTERS.sub("", force_str(value)))
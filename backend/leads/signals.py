@@ -1,65 +1,91 @@
 from django.conf import settings
-from django.db.models.signals import post_delete, post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
 from django.dispatch import receiver
+from django.utils import timezone
 
-from .models import Agent, OrganizerUser
+from core.authentication import invalidate_cached_user
 
-
-@receiver(post_save, sender=settings.AUTH_USER_MODEL)
-def create_organizer_user(sender, instance, created, **kwargs):
-    if created and instance.is_organizer:
-        OrganizerUser.objects.create(user=instance)
+from . import stats
+from .cache import bump_categories_version
+from .models import STATS_UPDATE_FIELDS, Agent, Category, Lead, LeadStats, OrganizerUser
 
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
-def update_organizer_user(sender, instance, **kwargs):
-    agent = Agent.objects.filter(user__username=instance.username)
+def sync_user_role(sender, instance, created, update_fields=None, **kwargs):
     """
-        User can't be organizer and agent at the same time. if user is an agent first delete the agent instance
-        and then make it an organizer
+        User can't be organizer and agent at the same time. When a role flag changes the other role's
+        instance is deleted and the new one is created, in one transaction.
+        Nothing happens when the flags didn't change (e.g. last_login updates), so a user save
+        costs no extra query. User.from_db remembers the flags the user was loaded with.
     """
-    try:
-        if instance.is_organizer:
-            agent.delete()
-            instance.organizeruser.save()
+    if update_fields is not None and not {"is_organizer", "is_agent"} & set(update_fields):
+        return
+
+    roles = (instance.is_organizer, instance.is_agent)
+    loaded = None if created else getattr(instance, "_loaded_flags", None)
+    previous = (loaded["is_organizer"], loaded["is_agent"]) if loaded else None
+    if roles == previous or not any(roles):
+        return
 
-    except OrganizerUser.DoesNotExist:
-        OrganizerUser.objects.create(user=instance)
+    with transaction.atomic():
+        if instance.is_agent:
+            OrganizerUser.objects.filter(user=instance).delete()
+            Agent.objects.get_or_create(user=instance)
+        elif instance.is_organizer:
+            Agent.objects.filter(user=instance).delete()
+            OrganizerUser.objects.get_or_create(user=instance)
 
 
-@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
-def delete_organizer_user(sender, instance, **kwargs):
-    try:
-        instance.organizeruser.delete()
-    except OrganizerUser.DoesNotExist:
-        pass
+@receiver(post_save, sender=OrganizerUser)
+@receiver(post_delete, sender=OrganizerUser)
+@receiver(post_save, sender=Agent)
+@receiver(post_delete, sender=Agent)
+def invalidate_user_role_cache(sender, instance, **kwargs):
+    """The cached request user holds the ids of its organizer/agent, see core.authentication"""
+    invalidate_cached_user(instance.user_id)
 
 
-@receiver(post_save, sender=settings.AUTH_USER_MODEL)
-def create_agent_user(sender, instance, created, **kwargs):
-    if created and instance.is_agent:
-        Agent.objects.create(user=instance)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_categories_cache(sender, **kwargs):
+    # after the commit: a request between the bump and the commit would cache the old rows
+    # under the new version
+    transaction.on_commit(bump_categories_version)
 
 
-@receiver(post_save, sender=settings.AUTH_USER_MODEL)
-def update_agent_user(sender, instance, **kwargs):
-    organizer = OrganizerUser.objects.filter(user__username=instance.username)
+@receiver(post_save, sender=Lead)
+def count_saved_lead(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    """Keep LeadStats up to date, see leads.stats. Costs one query when the lead moves, none otherwise"""
+    if raw:
+        return
+    if update_fields is not None and not STATS_UPDATE_FIELDS & set(update_fields):
+        return
+    # a lead saved without being loaded got its stored values in Lead.save()
+    stats.record_saved([instance])
+
+
+@receiver(pre_delete, sender=Agent)
+@receiver(pre_delete, sender=Category)
+def touch_unassigned_leads(sender, instance, **kwargs):
     """
-        User can't be organizer and agent at the same time. if user is an organizer first delete the organizer instance
-        and then make it an agent
+        on_delete=SET_NULL clears the agent / category of the leads with an UPDATE that leaves
+        updated_at alone, the ETags of the leads (leads.conditional) wouldn't change
     """
-    try:
-        if instance.is_agent:
-            organizer.delete()
-            instance.agent.save()
+    field = "agent" if sender is Agent else "category"
+    Lead._base_manager.filter(**{field: instance}).update(updated_at=timezone.now())
+
+
+@receiver(post_delete, sender=Agent)
+def forget_agent_stats(sender, instance, **kwargs):
+    stats.forget("agent", instance.pk)
+
 
-    except Agent.DoesNotExist:
-        Agent.objects.create(user=instance)
+@receiver(post_delete, sender=Category)
+def forget_category_stats(sender, instance, **kwargs):
+    stats.forget("category", instance.pk)
 
 
-@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
-def delete_agent_user(sender, instance, **kwargs):
-    try:
-        instance.agent.delete()
-    except Agent.DoesNotExist:
-        pass
+@receiver(post_delete, sender=OrganizerUser)
+def delete_organizer_stats(sender, instance, **kwargs):
+    LeadStats.objects.filter(organizer_id=instance.pk).delete()
@@ -0,0 +1,160 @@
+"""
+    Incremental maintenance of LeadStats.
+
+    Every write of leads turns into a few (key, total, converted) deltas that are added to the summary
+    rows with one INSERT ... ON CONFLICT DO UPDATE, so concurrent writers never lose a count.
+    Paths that don't send signals call these functions themselves: LeadsBulkApiView (bulk_create,
+    bulk_update), import_leads (INSERT ... SELECT) and the deletes (Lead.delete(),
+    LeadQuerySet.delete()). The leads of a deleted organizer are left to the database cascade, their
+    summary rows are deleted with the organizer. QuerySet.update() of the STATS_FIELDS is not
+    tracked, run rebuild_lead_stats after one.
+"""
+from datetime import timezone as dt_timezone
+
+from django.db import connection, transaction
+from django.db.models import Count, DateField
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import STATS_FIELDS, Lead, LeadStats
+
+COLUMNS = "organizer_id, agent_id, category_id, month, total, converted"
+# must match the expressions of the lead_stats_key unique index
+CONFLICT = "(organizer_id, COALESCE(agent_id, 0), COALESCE(category_id, 0), month)"
+MONTH = "date_trunc('month', date_added AT TIME ZONE 'UTC')::date"
+BATCH_SIZE = 1000
+
+
+def stats_key(values):
+    """(organizer_id, agent_id, category_id, month) and whether it is converted, from STATS_FIELDS values"""
+    # unsaved leads can hold a string, e.g. Lead(date_added="2021-09-04T22:14:18Z")
+    date_added = Lead._meta.get_field("date_added").to_python(values["date_added"])
+    if timezone.is_naive(date_added):
+        date_added = timezone.make_aware(date_added)
+    month = date_added.astimezone(dt_timezone.utc).date().replace(day=1)
+    key = (values["organizer_id"], values["agent_id"], values["category_id"], month)
+    return key, values["converted_date"] is not None
+
+
+def current_stats(lead):
+    return {name: getattr(lead, name) for name in STATS_FIELDS}
+
+
+def add(counts, values, sign):
+    key, converted = stats_key(values)
+    total, converted_total = counts.get(key, (0, 0))
+    counts[key] = (total + sign, converted_total + sign * converted)
+
+
+def upsert_sql(select):
+    return (
+        f"INSERT INTO {LeadStats._meta.db_table} ({COLUMNS}) {select} "
+        f"ON CONFLICT {CONFLICT} DO UPDATE SET "
+        f"total = {LeadStats._meta.db_table}.total + EXCLUDED.total, "
+        f"converted = {LeadStats._meta.db_table}.converted + EXCLUDED.converted"
+    )
+
+
+def apply_counts(counts):
+    """Add {key: (total, converted)} to the summary rows"""
+    rows = [(*key, total, converted) for key, (total, converted) in counts.items() if total or converted]
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), BATCH_SIZE):
+            batch = rows[start:start + BATCH_SIZE]
+            values = ", ".join(["(%s, %s, %s, %s, %s, %s)"] * len(batch))
+            cursor.execute(upsert_sql(f"VALUES {values}"), [value for row in batch for value in row])
+
+
+def record_saved(leads):
+    """
+        Count created or changed leads. A lead moves from what it was loaded with (Lead.from_db) to
+        its current values; leads that weren't loaded are new.
+    """
+    counts = {}
+    for lead in leads:
+        previous = getattr(lead, "_loaded_stats", None)
+        current = current_stats(lead)
+        if previous == current:
+            continue
+        if previous is not None:
+            add(counts, previous, -1)
+        add(counts, current, 1)
+        lead._loaded_stats = current
+    apply_counts(counts)
+
+
+def record_deleted(leads):
+    counts = {}
+    for lead in leads:
+        add(counts, getattr(lead, "_loaded_stats", None) or current_stats(lead), -1)
+    apply_counts(counts)
+
+
+def record_deleted_queryset(leads):
+    """Uncount the leads of a queryset that is about to be deleted, grouped by the database"""
+    counts = {}
+    for group in group_counts(leads).iterator(chunk_size=BATCH_SIZE):
+        key = (group["organizer_id"], group["agent_id"], group["category_id"], group["month"])
+        counts[key] = (-group["total"], -group["converted"])
+    apply_counts(counts)
+
+
+def record_staged(table, organizer_id):
+    """Count the rows of an import_leads staging table before they are merged into leads_lead"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            upsert_sql(
+                f"SELECT %s, agent_id, category_id, {MONTH}, count(*), count(converted_date) "
+                f"FROM {table} GROUP BY agent_id, category_id, {MONTH}"
+            ),
+            [organizer_id],
+        )
+
+
+def forget(field, pk):
+    """
+        An agent or a category was deleted and its leads were set to NULL (on_delete=SET_NULL).
+        Fold its rows into the NULL rows the same way.
+    """
+    column = LeadStats._meta.get_field(field).column
+    key = ", ".join(
+        "NULL::bigint" if name == column else name for name in ("organizer_id", "agent_id", "category_id")
+    )
+    group = ", ".join(name for name in ("organizer_id", "agent_id", "category_id") if name != column)
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                upsert_sql(
+                    f"SELECT {key}, month, sum(total), sum(converted) "
+                    f"FROM {LeadStats._meta.db_table} WHERE {column} = %s GROUP BY {group}, month"
+                ),
+                [pk],
+            )
+        LeadStats.objects.filter(**{field: pk}).delete()
+
+
+def group_counts(leads):
+    """The summary rows of the leads, as dicts"""
+    return (
+        leads.annotate(month=TruncMonth("date_added", output_field=DateField(), tzinfo=dt_timezone.utc))
+        .values("organizer_id", "agent_id", "category_id", "month")
+        .annotate(total=Count("id"), converted=Count("converted_date"))
+        .order_by()
+    )
+
+
+def rebuild(organizer_ids=None):
+    """Recompute the summary rows (of some organizers) from leads_lead. Returns the number of rows"""
+    leads = Lead.objects.all()
+    rows = LeadStats.objects.all()
+    if organizer_ids is not None:
+        leads = leads.filter(organizer_id__in=organizer_ids)
+        rows = rows.filter(organizer_id__in=organizer_ids)
+
+    with transaction.atomic():
+        rows.delete()
+        created = LeadStats.objects.bulk_create(
+            (LeadStats(**group) for group in group_counts(leads).iterator(chunk_size=BATCH_SIZE)),
+            batch_size=BATCH_SIZE,
+        )
+    return len(created)
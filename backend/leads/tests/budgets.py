@@ -0,0 +1,75 @@
+"""
+    Registry entries and runner of the query budget tests (leads/tests/test_query_budgets.py,
+    core/tests/test_query_budgets.py). The counting itself is the query_budget fixture in conftest.py.
+"""
+from django.core.cache import cache
+from django.urls import URLResolver, reverse
+from rest_framework.test import APIClient
+
+from core.serializers import TokenObtainPairSerializer
+
+# rows returned by the requests with scales=True, their number of queries must not change
+SIZES = (1, 500)
+
+
+class Budget:
+    """
+        At most `queries` queries for `method` on the route `name`, authenticated as context.<user>.
+        kwargs(context) gives the URL kwargs and data(context, size) the JSON body; without data
+        `query` is sent as the query string.
+    """
+
+    def __init__(
+            self, name, method, queries, status_code, kwargs=None, query=None, data=None, scales=False,
+            user="user",
+    ):
+        self.name = name
+        self.method = method
+        self.queries = queries
+        self.status_code = status_code
+        self.kwargs = kwargs
+        self.query = query or {}
+        self.data = data
+        self.scales = scales
+        self.user = user
+
+    def __str__(self):
+        return f"{self.method} {self.name}"
+
+    def request(self, client, context, size):
+        url = reverse(self.name, kwargs=self.kwargs(context) if self.kwargs else None)
+        data = self.data(context, size) if self.data else self.query
+        return getattr(client, self.method.lower())(url, data, format="json" if self.data else None)
+
+
+def route_names(patterns):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from route_names(pattern.url_patterns)
+        elif pattern.name:
+            yield pattern.name
+
+
+def check_budget(budget, make_context, query_budget):
+    """
+        Run the request of a budget with a cold cache on a context made by make_context(size),
+        for every size of SIZES if it scales. Returns the number of queries of each size.
+    """
+    counts = []
+    for size in SIZES if budget.scales else SIZES[:1]:
+        context = make_context(size)
+        client = APIClient()
+        if budget.user:
+            token = TokenObtainPairSerializer.get_token(getattr(context, budget.user)).access_token
+            client.credentials(HTTP_AUTHORIZATION=f"JWT {token}")
+        cache.clear()
+
+        response, count = query_budget(
+            budget.queries, lambda: budget.request(client, context, size), label=f"{budget} with {size} rows"
+        )
+
+        assert response.status_code == budget.status_code, response.content[:300]
+        counts.append(count)
+
+    assert len(set(counts)) == 1, f"{budget}: {counts} queries for {SIZES} rows"
+    return counts
@@ -0,0 +1,146 @@
+import threading
+
+import pytest
+from django.test import Client
+from rest_framework import status
+from rest_framework.reverse import reverse
+
+from core.authentication import TokenClaimsAuthentication
+from core.serializers import TokenObtainPairSerializer
+from leads import async_views
+from leads.async_views import run_in_thread
+from leads.models import OrganizerUser
+
+
+@pytest.fixture()
+def client():
+    return Client()
+
+
+def token(user):
+    return {"HTTP_AUTHORIZATION": f"JWT {TokenObtainPairSerializer.get_token(user).access_token}"}
+
+
+@pytest.fixture()
+def organizer(create_organizer_user):
+    return OrganizerUser.objects.get(user=create_organizer_user[0])
+
+
+@pytest.mark.django_db(transaction=True)
+class TestAsyncLeads:
+    def test_anonymous_user_return_401(self, client):
+        response = client.get(reverse("async-leads"))
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert response["WWW-Authenticate"] == 'JWT realm="api"'
+
+    def test_list_match_the_drf_view(self, client, api_client, leads_factory, organizer):
+        leads_factory.create_batch(organizer=organizer, size=3)
+        leads_factory.create()
+        headers = token(organizer.user)
+
+        response = client.get(reverse("async-leads"), {"page_size": 2}, **headers)
+        expected = api_client.get(reverse("leads"), {"page_size": 2}, **headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.json()["results"]) == 2
+        assert response.content == expected.content.replace(b"/api/leads/", b"/api/async/leads/")
+
+    def test_list_return_304_when_etag_match(self, client, leads_factory, organizer):
+        leads_factory.create(organizer=organizer)
+        headers = token(organizer.user)
+        etag = client.get(reverse("async-leads"), **headers)["ETag"]
+
+        response = client.get(reverse("async-leads"), HTTP_IF_NONE_MATCH=etag, **headers)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_list_filters(self, client, leads_factory, organizer):
+        lead = leads_factory.create(organizer=organizer)
+        leads_factory.create(organizer=organizer)
+
+        response = client.get(reverse("async-leads"), {"category": lead.category_id}, **token(organizer.user))
+
+        assert [item["id"] for item in response.json()["results"]] == [lead.id]
+        assert client.get(reverse("async-leads"), {"agent": "x"}, **token(organizer.user)).status_code == 400
+
+    def test_detail_match_the_drf_view(
+            self, client, api_client, leads_factory, organizer, django_assert_num_queries
+    ):
+        lead = leads_factory.create(organizer=organizer)
+        headers = token(organizer.user)
+        url = reverse("async-lead-detail", kwargs={"pk": lead.pk})
+        client.get(url, **headers)
+
+        # role_version is cached, only the lead is read
+        with django_assert_num_queries(1):
+            response = client.get(url, **headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["id"] == lead.pk
+        assert response.content == api_client.get(f"/api/leads/{lead.pk}/", **headers).content
+
+    def test_other_organizer_lead_return_404(self, client, leads_factory, organizer):
+        lead = leads_factory.create()
+
+        response = client.get(reverse("async-lead-detail", kwargs={"pk": lead.pk}), **token(organizer.user))
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_authentication_does_not_wait_for_the_shared_thread(self, client, organizer, monkeypatch):
+        authenticate = TokenClaimsAuthentication.authenticate
+        threads = []
+
+        def recording_authenticate(self, request):
+            threads.append(threading.get_ident())
+            return authenticate(self, request)
+
+        monkeypatch.setattr(TokenClaimsAuthentication, "authenticate", recording_authenticate)
+        response = client.get(reverse("async-leads"), **token(organizer.user))
+
+        assert response.status_code == status.HTTP_200_OK
+        # thread sensitive code of the test client runs in the main thread
+        assert threads and threading.get_ident() not in threads
+
+    def test_write_return_405(self, client, leads_factory, organizer):
+        lead = leads_factory.create(organizer=organizer)
+
+        response = client.delete(reverse("async-lead-detail", kwargs={"pk": lead.pk}), **token(organizer.user))
+
+        assert response.status_code == status.HTTP_405_METHOD_NOT_ALLOWED
+
+
+@pytest.mark.django_db(transaction=True)
+class TestAsyncCategories:
+    def test_list_and_detail_match_the_drf_view(self, client, api_client, category_factory, organizer):
+        category = category_factory.create()
+        headers = token(organizer.user)
+
+        assert client.get(reverse("async-categories"), **headers).content == api_client.get(
+            "/api/categories/", **headers
+        ).content
+        assert client.get(reverse("async-category-detail", kwargs={"pk": category.pk}), **headers).json() == {
+            "id": category.pk,
+            "title": category.title,
+        }
+
+    def test_cache_hit_costs_one_thread_hop(self, client, category_factory, organizer, monkeypatch):
+        category_factory.create()
+        headers = token(organizer.user)
+        expected = client.get(reverse("async-categories"), **headers).content
+        hops = []
+
+        async def recording_run_in_thread(function, *args, **kwargs):
+            hops.append(function.__name__)
+            return await run_in_thread(function, *args, **kwargs)
+
+        monkeypatch.setattr(async_views, "run_in_thread", recording_run_in_thread)
+        response = client.get(reverse("async-categories"), **headers)
+
+        assert response.content == expected
+        assert hops == ["initial"]
+
+    def test_normal_user_return_400(self, client, user_factory):
+        response = client.get(reverse("async-categories"), **token(user_factory.create()))
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,36 @@
+import io
+
+import pytest
+from django.core.management import call_command
+
+from leads import benchmarks
+
+
+@pytest.mark.django_db()
+def test_run_measures_every_scenario():
+    call_command("seed_crm", leads=50, organizers=2, agents=2, prefix=benchmarks.SEED_PREFIX, stdout=io.StringIO())
+
+    results = benchmarks.run(50, iterations=2, warmup=0)
+
+    assert "50/organizer/lead list searched" in results
+    assert "50/agent/lead detail" in results
+    assert "50/agent/lead create" not in results
+    assert set(results["50/superuser/lead update"]) == {"p50_ms", "p95_ms", "p99_ms", "queries", "peak_memory_kb"}
+    assert results["50/organizer/lead list"]["queries"] == 1
+
+
+def test_compare_reports_regressions():
+    baseline = {"results": {
+        "1/organizer/lead list": {"p95_ms": 10, "queries": 1, "peak_memory_kb": 100},
+        "1/organizer/lead detail": {"p95_ms": 10, "queries": 1, "peak_memory_kb": 100},
+    }}
+    report = {"results": {
+        "1/organizer/lead list": {"p95_ms": 11, "queries": 2, "peak_memory_kb": 100},
+        "1/organizer/lead detail": {"p95_ms": 13, "queries": 1, "peak_memory_kb": 119},
+        "1/agent/lead detail": {"p95_ms": 100, "queries": 9, "peak_memory_kb": 900},
+    }}
+
+    assert benchmarks.compare(report, baseline, threshold=0.2) == [
+        "1/organizer/lead list: 2 queries, baseline 1",
+        "1/organizer/lead detail: p95_ms 13, baseline 10",
+    ]
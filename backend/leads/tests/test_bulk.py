@@ -0,0 +1,113 @@
+import pytest
+from rest_framework import status
+from rest_framework.reverse import reverse
+
+from leads.models import Agent, Lead, OrganizerUser
+
+
+@pytest.fixture()
+def organizer(api_client, create_organizer_user):
+    user = create_organizer_user[0]
+    api_client.force_authenticate(user=user)
+    return OrganizerUser.objects.get(user=user)
+
+
+@pytest.fixture()
+def rows(create_agent_user, category_factory):
+    agents = list(Agent.objects.all())
+    categories = category_factory.create_batch(size=3)
+    return [
+        {
+            "first_name": f"a{i}",
+            "last_name": "b",
+            "age": 20,
+            "agent": agents[i % len(agents)].pk,
+            "category": categories[i % len(categories)].pk,
+            "description": "abc",
+            "phone_number": "123",
+            "email": f"email{i}@email.com",
+        }
+        for i in range(50)
+    ]
+
+
+@pytest.mark.django_db()
+class TestBulkCreateLeads:
+    url = reverse("leads-bulk")
+
+    def test_agent_can_not_create_leads_return_403(self, api_client, agent_user, rows):
+        response = api_client.post(self.url, rows, format="json")
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_organizer_can_create_leads_return_201(
+            self, api_client, organizer, rows, django_assert_max_num_queries
+    ):
+        # related objects are validated with one query per model, whatever the number of rows,
+        # and LeadStats is updated with one statement
+        with django_assert_max_num_queries(6):
+            response = api_client.post(self.url, rows, format="json")
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data["errors"] == []
+        assert [item["index"] for item in response.data["results"]] == list(range(50))
+        assert Lead.objects.filter(organizer=organizer).count() == 50
+
+    def test_invalid_rows_do_not_abort_valid_rows(self, api_client, organizer, rows):
+        rows[1]["agent"] = 0
+        rows[3]["email"] = "not an email"
+
+        response = api_client.post(self.url, rows[:5], format="json")
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert [item["index"] for item in response.data["results"]] == [0, 2, 4]
+        assert [error["index"] for error in response.data["errors"]] == [1, 3]
+        assert "agent" in response.data["errors"][0]["errors"]
+        assert Lead.objects.filter(organizer=organizer).count() == 3
+
+    def test_body_must_be_a_list_return_400(self, api_client, organizer, rows):
+        response = api_client.post(self.url, rows[0], format="json")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db()
+class TestBulkUpdateLeads:
+    url = reverse("leads-bulk")
+
+    def test_organizer_can_update_own_leads_return_200(
+            self, api_client, organizer, leads_factory, category_factory
+    ):
+        leads = leads_factory.create_batch(organizer=organizer, size=3)
+        other = leads_factory.create()
+        category = category_factory.create()
+
+        response = api_client.patch(
+            self.url,
+            [{"id": lead.id, "category": category.pk, "age": 30} for lead in leads + [other]],
+            format="json",
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [item["id"] for item in response.data["results"]] == [lead.id for lead in leads]
+        assert response.data["errors"] == [{"index": 3, "errors": {"id": ["Not found."]}}]
+        assert Lead.objects.filter(category=category, age=30).count() == 3
+        other.refresh_from_db()
+        assert other.category != category
+
+    def test_string_ids_are_converted_and_invalid_ids_reported(self, api_client, organizer, leads_factory):
+        lead = leads_factory.create(organizer=organizer)
+
+        response = api_client.patch(
+            self.url,
+            [{"id": str(lead.id), "age": 30}, {"id": "abc", "age": 30}, {"id": "999999", "age": 30}],
+            format="json",
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["results"] == [{"index": 0, "id": lead.id}]
+        assert [error["index"] for error in response.data["errors"]] == [1, 2]
+        assert "must be an integer" in response.data["errors"][0]["errors"]["id"][0]
+        assert response.data["errors"][1] == {"index": 2, "errors": {"id": ["Not found."]}}
+        lead.refresh_from_db()
+        assert lead.age == 30
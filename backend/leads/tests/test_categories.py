@@ -1,5 +1,8 @@
+import threading
+
 import pytest
 from django.contrib.auth import get_user_model
+from django.db import connection, transaction
 from rest_framework import status
 from rest_framework.reverse import reverse
 
@@ -156,3 +159,69 @@ class TestDeleteCategories:
         response = api_client.delete(f"/api/categories/{create_category.id}/")
 
         assert response.status_code == status.HTTP_204_NO_CONTENT
+
+
+@pytest.mark.django_db(transaction=True)
+class TestCategoriesCache:
+    """Transactional: the cache version is bumped when the change commits"""
+
+    url = reverse("categories-list")
+
+    def test_categories_are_served_from_cache(
+        self, api_client, organizer_user, create_category, django_assert_num_queries
+    ):
+        first = api_client.get(self.url)
+        api_client.get(f"/api/categories/{create_category.id}/")
+
+        with django_assert_num_queries(0):
+            second = api_client.get(self.url)
+            detail = api_client.get(f"/api/categories/{create_category.id}/")
+
+        assert second.data == first.data
+        assert detail.data == {"id": create_category.id, "title": create_category.title}
+
+    def test_update_invalidates_cached_categories(
+        self, api_client, organizer_user, create_category
+    ):
+        api_client.get(self.url)
+        api_client.get(f"/api/categories/{create_category.id}/")
+
+        api_client.put(f"/api/categories/{create_category.id}/", {"title": "b"})
+
+        assert api_client.get(self.url).data == [{"id": create_category.id, "title": "b"}]
+        detail = api_client.get(f"/api/categories/{create_category.id}/")
+        assert detail.data["title"] == "b"
+
+    def test_delete_invalidates_cached_categories(
+        self, api_client, organizer_user, create_category, category_factory
+    ):
+        api_client.get(self.url)
+
+        category_factory.create()
+        create_category.delete()
+
+        response = api_client.get(self.url)
+        assert create_category.id not in [category["id"] for category in response.data]
+        assert len(response.data) == 1
+
+    def test_request_during_the_change_does_not_cache_the_old_rows(
+        self, api_client, organizer_user, create_category
+    ):
+        def concurrent_request():
+            # another connection, it doesn't see the uncommitted title
+            try:
+                responses.append(api_client.get(self.url))
+            finally:
+                connection.close()
+
+        responses = []
+        title = create_category.title
+        with transaction.atomic():
+            create_category.title = "b"
+            create_category.save()
+            thread = threading.Thread(target=concurrent_request)
+            thread.start()
+            thread.join()
+
+        assert responses[0].data == [{"id": create_category.id, "title": title}]
+        assert api_client.get(self.url).data == [{"id": create_category.id, "title": "b"}]
@@ -0,0 +1,99 @@
+import pytest
+from rest_framework import status
+from rest_framework.reverse import reverse
+
+
+@pytest.mark.django_db()
+class TestConditionalGet:
+    url = reverse("leads")
+
+    def test_detail_return_304_when_etag_match(self, api_client, admin_user, create_lead):
+        url = f"/api/leads/{create_lead.id}/"
+        response = api_client.get(url)
+
+        not_modified = api_client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+
+        assert response["ETag"].startswith('W/"')
+        assert not_modified.status_code == status.HTTP_304_NOT_MODIFIED
+        assert not_modified["ETag"] == response["ETag"]
+        assert not_modified["Last-Modified"] == response["Last-Modified"]
+
+    def test_detail_return_304_when_not_modified_since(self, api_client, admin_user, create_lead):
+        url = f"/api/leads/{create_lead.id}/"
+        response = api_client.get(url)
+
+        not_modified = api_client.get(url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+
+        assert not_modified.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_detail_return_200_after_update(self, api_client, admin_user, create_lead):
+        url = f"/api/leads/{create_lead.id}/"
+        response = api_client.get(url)
+
+        create_lead.first_name = "changed"
+        create_lead.save()
+        modified = api_client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+
+        assert modified.status_code == status.HTTP_200_OK
+        assert modified.data["first_name"] == "changed"
+
+    def test_list_return_304_until_a_lead_changes(self, api_client, admin_user, create_leads):
+        response = api_client.get(self.url)
+
+        not_modified = api_client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"])
+        create_leads[0].save()
+        modified = api_client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"])
+        create_leads[0].delete()
+        deleted = api_client.get(self.url, HTTP_IF_NONE_MATCH=modified["ETag"])
+
+        assert not_modified.status_code == status.HTTP_304_NOT_MODIFIED
+        assert modified.status_code == status.HTTP_200_OK
+        assert deleted.status_code == status.HTTP_200_OK
+        assert len(deleted.data["results"]) == 1
+
+    def test_list_etag_depends_on_query_params(self, api_client, admin_user, create_leads):
+        response = api_client.get(self.url)
+
+        filtered = api_client.get(
+            self.url, {"category": create_leads[0].category_id}, HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+
+        assert filtered.status_code == status.HTTP_200_OK
+
+    def test_list_has_no_last_modified(self, api_client, admin_user, create_leads):
+        response = api_client.get(self.url)
+        create_leads[0].delete()
+
+        # the newest updated_at of the page is the same, If-Modified-Since is ignored
+        modified = api_client.get(self.url, HTTP_IF_MODIFIED_SINCE="Fri, 31 Dec 2100 00:00:00 GMT")
+
+        assert "Last-Modified" not in response
+        assert modified.status_code == status.HTTP_200_OK
+        assert modified["ETag"] != response["ETag"]
+
+    def test_list_304_carries_the_etag(self, api_client, admin_user, create_leads):
+        response = api_client.get(self.url)
+
+        not_modified = api_client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"])
+
+        assert not_modified.status_code == status.HTTP_304_NOT_MODIFIED
+        assert not_modified["ETag"] == response["ETag"]
+
+    def test_detail_return_200_after_its_category_is_deleted(self, api_client, admin_user, create_lead):
+        url = f"/api/leads/{create_lead.id}/"
+        response = api_client.get(url)
+
+        create_lead.category.delete()
+        modified = api_client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+
+        assert modified.status_code == status.HTTP_200_OK
+        assert modified.data["category"] is None
+
+    def test_list_return_200_after_an_agent_is_deleted(self, api_client, admin_user, create_leads):
+        response = api_client.get(self.url)
+
+        create_leads[0].agent.delete()
+        modified = api_client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"])
+
+        assert modified.status_code == status.HTTP_200_OK
+        assert None in [lead["agent"] for lead in modified.data["results"]]
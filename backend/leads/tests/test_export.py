@@ -0,0 +1,81 @@
+import csv
+import io
+import json
+from xml.etree import ElementTree
+
+import pytest
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework_xml.renderers import XMLRenderer
+
+from leads.models import Lead, OrganizerUser
+from leads.serializers import LeadAdminSerializer
+
+
+def content(response):
+    return b"".join(response.streaming_content).decode("utf-8")
+
+
+@pytest.mark.django_db()
+class TestExportLeads:
+    url = reverse("leads-export")
+
+    def test_anonymous_user_can_not_export_leads_return_401(self, api_client):
+        response = api_client.get(self.url)
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_export_csv_return_only_organizer_leads(
+            self, api_client, leads_factory, create_organizer_user
+    ):
+        user = create_organizer_user[0]
+        organizer = OrganizerUser.objects.get(user=user)
+        leads = leads_factory.create_batch(organizer=organizer, size=3)
+        leads_factory.create()
+        api_client.force_authenticate(user=user)
+
+        response = api_client.get(self.url, {"format": "csv"})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Content-Type"] == "text/csv; charset=utf-8"
+        rows = list(csv.DictReader(io.StringIO(content(response))))
+        assert [int(row["id"]) for row in rows] == [lead.id for lead in leads]
+        assert rows[0]["organizer"] == str(organizer.id)
+        assert rows[0]["date_added"] == "2021-09-04T22:14:18Z"
+        assert rows[0]["converted_date"] == ""
+
+    def test_export_ndjson_match_the_api_output(self, api_client, admin_user, create_lead):
+        detail = api_client.get(f"/api/leads/{create_lead.id}/")
+
+        response = api_client.get(self.url, {"format": "ndjson"})
+
+        assert response.status_code == status.HTTP_200_OK
+        lines = content(response).splitlines()
+        assert [json.loads(line) for line in lines] == [json.loads(detail.content)]
+
+    def test_export_applies_filters(self, api_client, admin_user, leads_factory):
+        lead = leads_factory.create()
+        leads_factory.create()
+
+        response = api_client.get(self.url, {"format": "ndjson", "category": lead.category_id})
+
+        assert [json.loads(line)["id"] for line in content(response).splitlines()] == [lead.id]
+
+    def test_export_xml_match_the_xml_renderer(self, api_client, admin_user, create_leads):
+        leads = LeadAdminSerializer(Lead.objects.order_by("id"), many=True).data
+
+        response = api_client.get(self.url, {"format": "xml"})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Content-Type"] == "application/xml; charset=utf-8"
+        assert content(response) == XMLRenderer().render(leads)
+
+    def test_export_xml_leaves_out_illegal_characters(self, api_client, admin_user, create_lead):
+        create_lead.description = "a\x01b\x1bc\td"
+        create_lead.save()
+
+        response = api_client.get(self.url, {"format": "xml"})
+
+        assert response.status_code == status.HTTP_200_OK
+        document = ElementTree.fromstring(content(response))
+        assert document.find("list-item/description").text == "abc\td"
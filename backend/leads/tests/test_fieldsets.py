@@ -0,0 +1,83 @@
+import csv
+import io
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.reverse import reverse
+
+from leads.serializers import LeadAdminSerializer
+
+
+def lead_sql(context):
+    """The queries that read leads_lead"""
+    return [query["sql"] for query in context.captured_queries if 'FROM "leads_lead"' in query["sql"]]
+
+
+@pytest.mark.django_db()
+class TestSparseFieldsets:
+    url = reverse("leads")
+
+    def test_list_returns_and_reads_only_the_fields(self, api_client, admin_user, create_leads):
+        with CaptureQueriesContext(connection) as context:
+            response = api_client.get(self.url, {"fields": "id,first_name,last_name,agent"})
+
+        assert response.status_code == status.HTTP_200_OK
+        fields = [set(lead) for lead in response.data["results"]]
+        assert fields == [{"id", "first_name", "last_name", "agent"}] * 2
+        [sql] = lead_sql(context)
+        assert '"leads_lead"."description"' not in sql
+        assert '"leads_lead"."email"' not in sql
+
+    def test_omit_leaves_out_the_fields(self, api_client, admin_user, create_leads):
+        with CaptureQueriesContext(connection) as context:
+            response = api_client.get(self.url, {"omit": "description,email"})
+
+        assert response.status_code == status.HTTP_200_OK
+        expected = set(LeadAdminSerializer.Meta.fields) - {"description", "email"}
+        assert set(response.data["results"][0]) == expected
+        [sql] = lead_sql(context)
+        assert '"leads_lead"."description"' not in sql
+
+    def test_unknown_fields_return_400(self, api_client, admin_user):
+        response = api_client.get(self.url, {"fields": "id,updated_at", "omit": "password"})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data == {
+            "fields": ["Unknown fields: updated_at"],
+            "omit": ["Unknown fields: password"],
+        }
+
+    def test_omitting_every_field_return_400(self, api_client, admin_user):
+        response = api_client.get(self.url, {"fields": "id", "omit": "id"})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_detail_returns_and_reads_only_the_fields(self, api_client, admin_user, create_lead):
+        url = f"/api/leads/{create_lead.id}/"
+        full = api_client.get(url)
+
+        with CaptureQueriesContext(connection) as context:
+            response = api_client.get(url, {"fields": "first_name,agent"})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {"first_name": create_lead.first_name, "agent": create_lead.agent_id}
+        [sql] = lead_sql(context)
+        assert '"leads_lead"."description"' not in sql
+        assert response["ETag"] != full["ETag"]
+
+    def test_writes_return_every_field(self, api_client, admin_user, create_lead):
+        response = api_client.patch(f"/api/leads/{create_lead.id}/?fields=id", {"age": 40})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["age"] == 40
+        assert "description" in response.data
+
+    def test_export_columns(self, api_client, admin_user, create_leads):
+        response = api_client.get(reverse("leads-export"), {"format": "csv", "fields": "id,email"})
+
+        assert response.status_code == status.HTTP_200_OK
+        rows = list(csv.reader(io.StringIO(b"".join(response.streaming_content).decode())))
+        assert rows[0] == ["id", "email"]
+        assert len(rows) == 3
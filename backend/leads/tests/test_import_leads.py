@@ -0,0 +1,103 @@
+import csv
+import io
+from datetime import date
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from leads.management.commands import import_leads
+from leads.models import Agent, Category, Lead, LeadImport, LeadStats, OrganizerUser
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+@pytest.fixture()
+def organizer(user_factory):
+    return OrganizerUser.objects.get(user=user_factory.create(is_organizer=True))
+
+
+@pytest.fixture()
+def agent(user_factory):
+    return Agent.objects.get(user=user_factory.create(is_agent=True))
+
+
+@pytest.fixture()
+def csv_file(tmp_path, agent):
+    path = tmp_path / "leads.csv"
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["first_name", "last_name", "age", "agent", "category", "description",
+                         "date_added", "phone_number", "email", "converted_date"])
+        for i in range(10):
+            writer.writerow([f"a{i}", "b", i, agent.user.username, f"c{i % 2}", "abc",
+                             "2022-01-01 10:00", "123", f"Email{i}@Email.com", ""])
+        writer.writerow(["", "b", 1, "", "", "", "", "", "email@email.com", ""])
+        writer.writerow(["c", "d", 1, "nobody", "", "", "", "", "email@email.com", ""])
+    return path
+
+
+def test_import_leads(organizer, agent, csv_file, tmp_path):
+    rejects = tmp_path / "rejects.csv"
+
+    call_command("import_leads", csv_file, organizer=organizer.user.username, chunk_size=3,
+                 rejects=rejects, stdout=io.StringIO())
+
+    leads = Lead.objects.filter(organizer=organizer).order_by("id")
+    assert leads.count() == 10
+    assert [lead.first_name for lead in leads] == [f"a{i}" for i in range(10)]
+    assert leads[0].agent == agent
+    assert leads[0].email == "email0@email.com"
+    assert set(Category.objects.values_list("title", flat=True)) == {"c0", "c1"}
+    assert LeadImport.objects.get().rows_rejected == 2
+    assert len(rejects.read_text().splitlines()) == 2
+
+
+def test_import_resumes_after_a_crash(organizer, csv_file, monkeypatch):
+    stage = import_leads.Command.stage
+    calls = []
+
+    def crashing_stage(self, *args):
+        calls.append(1)
+        if len(calls) == 3:
+            raise RuntimeError("crash")
+        return stage(self, *args)
+
+    monkeypatch.setattr(import_leads.Command, "stage", crashing_stage)
+    with pytest.raises(RuntimeError):
+        call_command("import_leads", csv_file, organizer=organizer.user.username, chunk_size=3,
+                     stdout=io.StringIO())
+    assert LeadImport.objects.get().rows_read == 6
+    assert not Lead.objects.exists()
+
+    monkeypatch.setattr(import_leads.Command, "stage", stage)
+    call_command("import_leads", csv_file, organizer=organizer.user.username, chunk_size=3,
+                 stdout=io.StringIO())
+
+    assert Lead.objects.filter(organizer=organizer).count() == 10
+    with pytest.raises(CommandError):
+        call_command("import_leads", csv_file, organizer=organizer.user.username)
+
+
+def test_import_leads_is_counted_in_stats(organizer, agent, csv_file):
+    call_command("import_leads", csv_file, organizer=organizer.user.username, stdout=io.StringIO())
+
+    rows = LeadStats.objects.filter(organizer=organizer)
+    assert sorted(rows.values_list("agent_id", "month", "total")) == [
+        (agent.pk, date(2022, 1, 1), 5),
+        (agent.pk, date(2022, 1, 1), 5),
+    ]
+
+
+def test_import_leads_without_description_and_phone_number(organizer, tmp_path):
+    path = tmp_path / "leads.csv"
+    path.write_text(
+        "first_name,last_name,age,description,phone_number,email\n"
+        "a,b,1,,,a@email.com\n"
+        "c,d,2,abc,,c@email.com\n"
+    )
+
+    call_command("import_leads", path, organizer=organizer.user.username, stdout=io.StringIO())
+
+    leads = Lead.objects.filter(organizer=organizer).order_by("id")
+    assert list(leads.values_list("description", "phone_number")) == [("", ""), ("abc", "")]
+    assert LeadImport.objects.get().rows_rejected == 0
@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from django.db import connection
+
+from leads.models import Agent, Lead, OrganizerUser
+from leads.views import LeadsListApiView
+
+pytestmark = pytest.mark.skipif(
+    connection.vendor != "postgresql", reason="query plans are checked on PostgreSQL"
+)
+
+
+@pytest.fixture()
+def seeded_leads(db, user_factory, category_factory):
+    """8000 leads spread over 2 organizers, 2 agents and 5 categories"""
+    user_factory.create_batch(is_organizer=True, size=2)
+    user_factory.create_batch(is_agent=True, size=2)
+    organizers = list(OrganizerUser.objects.all())
+    agents = list(Agent.objects.all())
+    categories = category_factory.create_batch(size=5)
+    start = datetime(2022, 1, 1, tzinfo=timezone.utc)
+
+    Lead.objects.bulk_create(
+        [
+            Lead(
+                first_name="a",
+                last_name="b",
+                organizer=organizers[i % len(organizers)],
+                agent=agents[i % len(agents)],
+                category=categories[i % len(categories)],
+                description="abc",
+                date_added=start + timedelta(minutes=i),
+                phone_number="123",
+                email="email@email.com",
+            )
+            for i in range(8000)
+        ],
+        batch_size=2000,
+    )
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE leads_lead")
+
+    return SimpleNamespace(organizer=organizers[0], agent=agents[0], category=categories[0])
+
+
+def view_queryset(user):
+    """The queryset LeadsListApiView.get_queryset builds for this user"""
+    view = LeadsListApiView()
+    view.request = SimpleNamespace(user=user, method="GET", query_params={})
+    return view.get_queryset()
+
+
+def plan(queryset):
+    plan = queryset.explain()
+    assert "Seq Scan" not in plan
+    return plan
+
+
+class TestLeadIndexes:
+    def test_organizer_leads_page_uses_index(self, seeded_leads):
+        queryset = view_queryset(seeded_leads.organizer.user)
+
+        assert "lead_organizer_date_idx" in plan(queryset.order_by("-date_added", "-id")[:101])
+
+    def test_agent_leads_page_uses_index(self, seeded_leads):
+        queryset = view_queryset(seeded_leads.agent.user)
+
+        assert "lead_agent_date_idx" in plan(queryset.order_by("-date_added", "-id")[:101])
+
+    def test_organizer_leads_filtered_by_category_uses_index(self, seeded_leads):
+        queryset = view_queryset(seeded_leads.organizer.user).filter(
+            category=seeded_leads.category
+        )
+
+        assert "lead_org_category_date_idx" in plan(queryset.order_by("date_added")[:101])
@@ -1,9 +1,14 @@
+from datetime import datetime, timezone
+
 import pytest
 from django.contrib.auth import get_user_model
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.reverse import reverse
+from rest_framework_xml.renderers import XMLRenderer
 
-from leads.models import Agent, OrganizerUser
+from leads.models import Agent, Lead, OrganizerUser
+from leads.serializers import LeadAdminSerializer, LeadSerializer
 
 User = get_user_model()
 
@@ -87,6 +92,33 @@ class TestRetrieveLeads():
 
         assert response.status_code == status.HTTP_200_OK
 
+    @pytest.mark.parametrize("role", ["organizer", "admin"])
+    @pytest.mark.parametrize("renderer", [JSONRenderer, XMLRenderer])
+    def test_list_output_is_the_serializer_output(
+            self, api_client, leads_factory, create_organizer_user, role, renderer
+    ):
+        organizer = OrganizerUser.objects.get(user=create_organizer_user[0])
+        leads_factory.create_batch(organizer=organizer, size=3)
+        leads_factory.create(organizer=organizer, agent=None, category=None, description="<&>",
+                             converted_date=datetime(2022, 2, 3, 4, 5, 6, 789, tzinfo=timezone.utc))
+        if role == "admin":
+            api_client.force_authenticate(user=User.objects.create_superuser("admin", "a@a.com", "pass"))
+            serializer_class, leads = LeadAdminSerializer, Lead.objects.all()
+        else:
+            api_client.force_authenticate(user=organizer.user)
+            serializer_class, leads = LeadSerializer, Lead.objects.filter(organizer=organizer)
+        leads = leads.order_by("-date_added", "-id")
+
+        response = api_client.get(self.url, {"format": renderer.format, "page_size": 2})
+
+        expected = {
+            "next": response.data["next"],
+            "previous": None,
+            "results": serializer_class(leads[:2], many=True).data,
+        }
+        content = renderer().render(expected, renderer.media_type)
+        assert response.content == (content.encode("utf-8") if isinstance(content, str) else content)
+
     def test_if_lead_exist_return_200(
             self,
             api_client,
@@ -145,7 +177,7 @@ class TestRetrieveLeads():
             "converted_date": lead.converted_date,
         }
 
-    def test_agent_can_not_see_others_lead_return_403(
+    def test_agent_can_not_see_others_lead_return_404(
             self, api_client, leads_factory, create_agent_user
     ):
         user = create_agent_user[0]
@@ -160,9 +192,9 @@ class TestRetrieveLeads():
             f"/api/leads/{lead.id}/",
         )
 
-        assert response.status_code == status.HTTP_403_FORBIDDEN
+        assert response.status_code == status.HTTP_404_NOT_FOUND
 
-    def test_organizer_can_not_see_others_lead_return_403(
+    def test_organizer_can_not_see_others_lead_return_404(
             self, api_client, leads_factory, create_organizer_user
     ):
         user = create_organizer_user[0]
@@ -177,7 +209,7 @@ class TestRetrieveLeads():
             f"/api/leads/{lead.id}/",
         )
 
-        assert response.status_code == status.HTTP_403_FORBIDDEN
+        assert response.status_code == status.HTTP_404_NOT_FOUND
 
     def test_admin_can_see_all_leads_return_200(
             self, api_client, admin_user, leads_factory,
@@ -216,7 +248,7 @@ class TestUpdateLeads:
 
         assert response.status_code == status.HTTP_403_FORBIDDEN
 
-    def test_organizer_can_not_update_other_organizer_leads_return_403(
+    def test_organizer_can_not_update_other_organizer_leads_return_404(
             self, api_client, create_organizer_user, leads_factory, payload
     ):
         user1 = create_organizer_user[0]
@@ -227,7 +259,7 @@ class TestUpdateLeads:
 
         response = api_client.put(f"/api/leads/{lead.id}/", payload)
 
-        assert response.status_code == status.HTTP_403_FORBIDDEN
+        assert response.status_code == status.HTTP_404_NOT_FOUND
 
     def test_admin_can_update_leads_return_200(
             self, api_client, admin_user, create_lead, payload
@@ -310,7 +342,7 @@ class TestDeleteLeads:
 
         assert response.status_code == status.HTTP_204_NO_CONTENT
 
-    def test_organizer_can_not_delete_other_organizers_leads_return_403(
+    def test_organizer_can_not_delete_other_organizers_leads_return_404(
             self, api_client, create_organizer_user, leads_factory, payload
     ):
         user = create_organizer_user[0]
@@ -320,7 +352,7 @@ class TestDeleteLeads:
         api_client.force_authenticate(user2)
         response = api_client.delete(f"/api/leads/{lead.id}/")
 
-        assert response.status_code == status.HTTP_403_FORBIDDEN
+        assert response.status_code == status.HTTP_404_NOT_FOUND
 
     def test_admin_can_delete_leads_return_204(
             self, api_client, admin_user, create_lead, payload
@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.reverse import reverse
+
+from leads.models import Lead, OrganizerUser
+
+
+@pytest.fixture()
+def organizer_leads(api_client, user_factory, leads_factory, category_factory):
+    """25 leads of one organizer. some of them share the same date_added and some have no category"""
+    user = user_factory.create(is_organizer=True)
+    organizer = OrganizerUser.objects.get(user=user)
+    categories = category_factory.create_batch(size=3)
+    start = datetime(2022, 1, 1, tzinfo=timezone.utc)
+
+    for i in range(25):
+        leads_factory.create(
+            organizer=organizer,
+            agent=None,
+            category=None if i % 4 == 0 else categories[i % 3],
+            date_added=start + timedelta(days=i // 3),
+        )
+    api_client.force_authenticate(user=user)
+    return Lead.objects.filter(organizer=organizer)
+
+
+def walk(api_client, url):
+    """Follow the next links and return the ids of every page"""
+    pages = []
+    while url:
+        response = api_client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        pages.append([lead["id"] for lead in response.data["results"]])
+        url = response.data["next"]
+    return pages, response
+
+
+@pytest.mark.django_db()
+class TestLeadsPagination:
+    url = reverse("leads")
+
+    def test_default_ordering_is_newest_first(self, api_client, organizer_leads):
+        pages, _ = walk(api_client, f"{self.url}?page_size=7")
+
+        expected = list(organizer_leads.order_by("-date_added", "-id").values_list("id", flat=True))
+        assert [len(page) for page in pages] == [7, 7, 7, 4]
+        assert sum(pages, []) == expected
+
+    def test_ordering_by_nullable_category(self, api_client, organizer_leads):
+        pages, _ = walk(api_client, f"{self.url}?page_size=4&ordering=category")
+
+        leads = sorted(
+            organizer_leads,
+            key=lambda lead: (lead.category_id is None, lead.category_id or 0, -lead.date_added.timestamp(), -lead.id),
+        )
+        assert sum(pages, []) == [lead.id for lead in leads]
+
+    def test_previous_link_returns_the_previous_page(self, api_client, organizer_leads):
+        first = api_client.get(f"{self.url}?page_size=5&ordering=-category")
+        second = api_client.get(first.data["next"])
+        back = api_client.get(second.data["previous"])
+
+        assert first.data["previous"] is None
+        assert back.data["results"] == first.data["results"]
+        assert back.data["previous"] is None
+
+    def test_no_offset_or_count_queries(self, api_client, organizer_leads):
+        first = api_client.get(f"{self.url}?page_size=5")
+
+        with CaptureQueriesContext(connection) as context:
+            api_client.get(first.data["next"])
+
+        sql = " ".join(query["sql"] for query in context.captured_queries).upper()
+        assert "OFFSET" not in sql
+        assert "COUNT(" not in sql
+
+    def test_invalid_cursor_return_404(self, api_client, organizer_leads):
+        response = api_client.get(f"{self.url}?cursor=abc")
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
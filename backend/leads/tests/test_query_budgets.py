@@ -0,0 +1,124 @@
+"""
+    Query budgets of the routes in leads/urls.py.
+
+    Every request runs with a cold cache, as an organizer with a claims token. Requests with
+    scales=True run on a tenant with 1 and with 500 leads and must make the same number of queries.
+    See leads/tests/budgets.py
+"""
+from types import SimpleNamespace
+
+import pytest
+from rest_framework import status
+
+from leads import stats, urls
+from leads.models import Agent, Category, Lead
+from leads.tests.budgets import Budget, check_budget, route_names
+
+
+def lead_kwargs(tenant):
+    return {"pk": tenant.leads[0].pk}
+
+
+def category_kwargs(tenant):
+    return {"pk": tenant.categories[0].pk}
+
+
+def lead_data(tenant, size=None, index=0):
+    return {
+        "first_name": "a",
+        "last_name": "b",
+        "age": 20,
+        "agent": tenant.agents[index % len(tenant.agents)].pk,
+        "category": tenant.categories[index % len(tenant.categories)].pk,
+        "description": "abc",
+        "phone_number": "123",
+        "email": f"email{index}@email.com",
+    }
+
+
+def bulk_create_data(tenant, size):
+    return [lead_data(tenant, index=index) for index in range(size)]
+
+
+def bulk_update_data(tenant, size):
+    return [
+        {"id": lead.pk, "agent": tenant.agents[(index + 1) % len(tenant.agents)].pk}
+        for index, lead in enumerate(tenant.leads[:size])
+    ]
+
+
+BUDGETS = [
+    Budget("api-root", "GET", 1, status.HTTP_200_OK),
+    # the request user comes from the token, role_version is read when the cache is cold
+    Budget("leads", "GET", 2, status.HTTP_200_OK, query={"page_size": 500}, scales=True),
+    Budget("leads", "POST", 5, status.HTTP_201_CREATED, data=lead_data),
+    Budget("lead-detail", "GET", 2, status.HTTP_200_OK, kwargs=lead_kwargs),
+    Budget("lead-detail", "PUT", 5, status.HTTP_200_OK, kwargs=lead_kwargs, data=lead_data),
+    Budget("lead-detail", "PATCH", 5, status.HTTP_200_OK, kwargs=lead_kwargs, data=lead_data),
+    Budget("lead-detail", "DELETE", 4, status.HTTP_204_NO_CONTENT, kwargs=lead_kwargs),
+    Budget("leads-export", "GET", 2, status.HTTP_200_OK, query={"format": "csv"}, scales=True),
+    Budget("leads-bulk", "POST", 7, status.HTTP_201_CREATED, data=bulk_create_data, scales=True),
+    Budget("leads-bulk", "PATCH", 7, status.HTTP_200_OK, data=bulk_update_data, scales=True),
+    Budget("leads-stats", "GET", 2, status.HTTP_200_OK, scales=True),
+    Budget("categories-list", "GET", 2, status.HTTP_200_OK),
+    Budget("categories-list", "POST", 2, status.HTTP_201_CREATED, data=lambda tenant, size: {"title": "new"}),
+    Budget("categories-detail", "GET", 2, status.HTTP_200_OK, kwargs=category_kwargs),
+    Budget(
+        "categories-detail", "PUT", 3, status.HTTP_200_OK, kwargs=category_kwargs,
+        data=lambda tenant, size: {"title": "renamed"},
+    ),
+    Budget(
+        "categories-detail", "PATCH", 3, status.HTTP_200_OK, kwargs=category_kwargs,
+        data=lambda tenant, size: {"title": "renamed"},
+    ),
+    # leads are touched and set to NULL, their LeadStats rows folded, in savepoints
+    Budget("categories-detail", "DELETE", 10, status.HTTP_204_NO_CONTENT, kwargs=category_kwargs),
+]
+
+
+@pytest.fixture()
+def make_tenant(user_factory):
+    def make(size):
+        user = user_factory.create(is_organizer=True)
+        organizer = user.organizeruser
+        agents = [Agent.objects.get(user=user_factory.create(is_agent=True)) for _ in range(5)]
+        Agent.objects.filter(pk__in=[agent.pk for agent in agents]).update(organizer=organizer)
+        categories = Category.objects.bulk_create(Category(title=f"c{i}") for i in range(5))
+        leads = Lead.objects.bulk_create(
+            Lead(
+                first_name=f"a{i}",
+                last_name="b",
+                organizer=organizer,
+                agent=agents[i % len(agents)],
+                category=categories[i % len(categories)],
+                description="abc",
+                phone_number="123",
+                email=f"email{i}@email.com",
+            )
+            for i in range(size)
+        )
+        stats.record_saved(leads)
+        return SimpleNamespace(user=user, agents=agents, categories=categories, leads=leads)
+
+    return make
+
+
+def test_every_route_has_a_budget():
+    assert set(route_names(urls.urlpatterns)) - {budget.name for budget in BUDGETS} == set()
+
+
+@pytest.mark.django_db()
+@pytest.mark.parametrize("budget", BUDGETS, ids=str)
+def test_query_budget(budget, make_tenant, query_budget):
+    check_budget(budget, make_tenant, query_budget)
+
+
+@pytest.mark.django_db()
+def test_exceeded_budget_reports_repeated_queries(query_budget, category_factory):
+    categories = category_factory.create_batch(size=3)
+
+    with pytest.raises(pytest.fail.Exception) as failed:
+        query_budget(1, lambda: [Category.objects.get(pk=category.pk) for category in categories], label="n+1")
+
+    assert "n+1: 3 queries, budget 1" in str(failed.value)
+    assert '3x SELECT "leads_category"."id", "leads_category"."title" FROM "leads_category" WHERE' in str(failed.value)
@@ -0,0 +1,60 @@
+import pytest
+from rest_framework import status
+from rest_framework.reverse import reverse
+
+from leads.models import OrganizerUser
+
+
+@pytest.fixture()
+def organizers(db, create_organizer_user):
+    return [OrganizerUser.objects.get(user=user) for user in create_organizer_user[:2]]
+
+
+@pytest.mark.django_db()
+class TestLeadsSearch:
+    url = reverse("leads")
+
+    def search(self, api_client, query):
+        response = api_client.get(self.url, {"search": query})
+        assert response.status_code == status.HTTP_200_OK
+        return [lead["id"] for lead in response.data["results"]]
+
+    def test_search_matches_name_email_and_description(
+            self, api_client, leads_factory, organizers
+    ):
+        by_name = leads_factory.create(organizer=organizers[0], first_name="Morgan", description="x")
+        by_email = leads_factory.create(organizer=organizers[0], email="morgan@example.org", description="x")
+        by_description = leads_factory.create(organizer=organizers[0], description="call morgan tomorrow")
+        leads_factory.create(organizer=organizers[0], description="nothing here")
+        api_client.force_authenticate(user=organizers[0].user)
+
+        # name matches are weighted above description matches
+        assert self.search(api_client, "morgan") == [by_name.id, by_description.id]
+        assert self.search(api_client, "morgan@example.org") == [by_email.id]
+
+    def test_search_uses_websearch_syntax(self, api_client, leads_factory, organizers):
+        lead = leads_factory.create(organizer=organizers[0], description="interested in the premium plan")
+        leads_factory.create(organizer=organizers[0], description="interested in the basic plan")
+        api_client.force_authenticate(user=organizers[0].user)
+
+        assert self.search(api_client, "interested -basic") == [lead.id]
+        assert self.search(api_client, '"premium plan"') == [lead.id]
+
+    def test_search_is_scoped_to_the_organizer(self, api_client, leads_factory, organizers):
+        lead = leads_factory.create(organizer=organizers[0], description="budget approved")
+        leads_factory.create(organizer=organizers[1], description="budget approved")
+        api_client.force_authenticate(user=organizers[0].user)
+
+        assert self.search(api_client, "budget") == [lead.id]
+
+    def test_search_results_can_be_paginated(self, api_client, leads_factory, organizers):
+        for i in range(5):
+            leads_factory.create(organizer=organizers[0], description="demo " * (i + 1))
+        api_client.force_authenticate(user=organizers[0].user)
+
+        first = api_client.get(self.url, {"search": "demo", "page_size": 3})
+        second = api_client.get(first.data["next"])
+
+        ids = [lead["id"] for lead in first.data["results"] + second.data["results"]]
+        assert ids == self.search(api_client, "demo")
+        assert len(set(ids)) == 5
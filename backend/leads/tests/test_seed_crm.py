@@ -0,0 +1,68 @@
+import io
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.db.models import Count
+
+from leads.models import Agent, Lead, LeadStats, OrganizerUser
+
+
+def seed(**options):
+    options = {"organizers": 3, "agents": 2, "categories": 4, "leads": 500, "batch_size": 200, **options}
+    call_command("seed_crm", stdout=io.StringIO(), **options)
+
+
+def shape(prefix):
+    leads = Lead.objects.filter(organizer__user__username__startswith=f"{prefix}-")
+    return list(
+        leads.order_by("organizer__user__username", "date_added", "email").values_list(
+            "organizer__user__username", "agent__user__username", "category__title", "date_added",
+            "converted_date", "email", "description",
+        )
+    )
+
+
+@pytest.mark.django_db()
+class TestSeedCrm:
+    def test_seed_creates_the_tenants_and_leads(self):
+        seed()
+
+        assert OrganizerUser.objects.filter(user__is_organizer=True).count() == 3
+        assert Agent.objects.filter(user__is_agent=True, organizer__isnull=False).count() == 6
+        assert Lead.objects.count() == 500
+        # skewed: the first organizer has the most leads
+        counts = list(
+            Lead.objects.values("organizer__user__username").annotate(n=Count("id")).order_by("-n")
+        )
+        assert counts[0]["organizer__user__username"] == "seed-org0"
+        assert sum(LeadStats.objects.values_list("total", flat=True)) == 500
+        assert 0 < Lead.objects.filter(converted_date__isnull=False).count() < 500
+
+    def test_same_seed_creates_the_same_leads(self):
+        seed(prefix="a", seed=7)
+        seed(prefix="b", seed=7)
+        seed(prefix="c", seed=8)
+
+        a, b, c = shape("a"), shape("b"), shape("c")
+        assert [row[2:] for row in a] == [row[2:] for row in b]
+        assert [row[2:] for row in a] != [row[2:] for row in c]
+
+    def test_used_prefix_is_refused(self):
+        seed(leads=1)
+
+        with pytest.raises(CommandError):
+            seed(leads=1)
+
+    @pytest.mark.parametrize(
+        "options", [{"organizers": 0}, {"categories": 0}, {"leads": -1}, {"agents": -1}, {"batch_size": 0}]
+    )
+    def test_invalid_options_are_refused(self, options):
+        with pytest.raises(CommandError):
+            seed(**options)
+
+        assert not OrganizerUser.objects.exists()
+
+    def test_no_organizers_and_no_leads(self):
+        seed(organizers=0, leads=0)
+
+        assert not Lead.objects.exists()
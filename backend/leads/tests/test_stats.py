@@ -0,0 +1,191 @@
+import io
+from datetime import datetime, timezone
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.reverse import reverse
+
+from leads.models import Agent, Lead, LeadStats, OrganizerUser
+from leads.stats import rebuild
+
+
+def stats():
+    return sorted(
+        LeadStats.objects.filter(total__gt=0).values_list(
+            "organizer_id", "agent_id", "category_id", "month", "total", "converted"
+        ),
+        key=str,
+    )
+
+
+def assert_stats_match_leads():
+    """The incrementally maintained rows are what a rebuild computes"""
+    maintained = stats()
+    rebuild()
+    assert maintained == stats()
+
+
+@pytest.fixture()
+def organizer(create_organizer_user):
+    return OrganizerUser.objects.get(user=create_organizer_user[0])
+
+
+@pytest.fixture()
+def agents(create_agent_user):
+    return list(Agent.objects.all())
+
+
+@pytest.mark.django_db()
+class TestLeadStatsMaintenance:
+    def test_create_reassign_convert_and_delete(self, leads_factory, category_factory, organizer, agents):
+        category = category_factory.create()
+        leads = leads_factory.create_batch(organizer=organizer, agent=agents[0], size=3)
+        assert_stats_match_leads()
+
+        lead = Lead.objects.get(pk=leads[0].pk)
+        lead.agent = agents[1]
+        lead.category = category
+        lead.save()
+        assert_stats_match_leads()
+
+        lead = Lead.objects.get(pk=leads[1].pk)
+        lead.converted_date = datetime(2022, 3, 1, tzinfo=timezone.utc)
+        lead.save(update_fields=["converted_date"])
+        assert_stats_match_leads()
+
+        lead = Lead.objects.get(pk=leads[2].pk)
+        lead.date_added = datetime(2020, 1, 31, 23, 59, tzinfo=timezone.utc)
+        lead.save()
+        assert_stats_match_leads()
+
+        Lead.objects.get(pk=leads[0].pk).delete()
+        assert_stats_match_leads()
+
+    def test_lead_saved_without_being_loaded(self, leads_factory, organizer, agents):
+        leads_factory.create_batch(organizer=organizer, agent=agents[0], size=2)
+        lead = leads_factory.create(organizer=organizer, agent=agents[0])
+        lead = Lead(**{field.attname: getattr(lead, field.attname) for field in Lead._meta.concrete_fields})
+        lead.agent = agents[1]
+
+        with CaptureQueriesContext(connection) as context:
+            lead.save()
+
+        # the stored values of the lead (locked), the update and the stats. no recount
+        sqls = [query["sql"] for query in context.captured_queries if "SAVEPOINT" not in query["sql"]]
+        assert len(sqls) == 3
+        assert sqls[0].endswith("FOR UPDATE")
+        assert_stats_match_leads()
+
+    def test_unchanged_save_costs_no_query(self, leads_factory, django_assert_num_queries):
+        lead = Lead.objects.get(pk=leads_factory.create().pk)
+        lead.description = "called back"
+
+        with django_assert_num_queries(1):
+            lead.save()
+
+    def test_deleted_agent_and_category_are_folded(self, leads_factory, organizer, agents):
+        leads_factory.create_batch(organizer=organizer, agent=agents[0], size=2)
+        leads_factory.create(organizer=organizer, agent=agents[1])
+
+        agents[0].delete()
+        assert_stats_match_leads()
+
+        Lead.objects.first().category.delete()
+        assert_stats_match_leads()
+
+    def test_deleted_organizer_has_no_stats(self, leads_factory, organizer):
+        leads_factory.create_batch(organizer=organizer, size=2)
+
+        with CaptureQueriesContext(connection) as context:
+            organizer.user.delete()
+
+        assert not LeadStats.objects.filter(organizer_id=organizer.pk).exists()
+        # the leads are deleted by one statement, without being loaded
+        lead_sqls = [query["sql"] for query in context.captured_queries if '"leads_lead"' in query["sql"]]
+        assert not [sql for sql in lead_sqls if sql.startswith("SELECT")]
+        assert len([sql for sql in lead_sqls if sql.startswith('DELETE FROM "leads_lead"')]) == 1
+
+    def test_queryset_delete_is_counted(self, leads_factory, organizer, agents):
+        leads_factory.create_batch(organizer=organizer, agent=agents[0], size=2)
+        leads_factory.create(organizer=organizer, agent=agents[1])
+
+        Lead.objects.filter(agent=agents[0]).delete()
+
+        assert Lead.objects.count() == 1
+        assert_stats_match_leads()
+
+    def test_bulk_api_is_counted(self, api_client, organizer, agents, leads_factory):
+        lead = leads_factory.create(organizer=organizer)
+        api_client.force_authenticate(user=organizer.user)
+        rows = [
+            {"first_name": f"a{i}", "last_name": "b", "description": "abc", "phone_number": "123",
+             "email": f"email{i}@email.com", "agent": agents[i % 2].pk}
+            for i in range(5)
+        ]
+
+        api_client.post(reverse("leads-bulk"), rows, format="json")
+        api_client.patch(reverse("leads-bulk"), [{"id": lead.id, "agent": agents[0].pk}], format="json")
+
+        assert_stats_match_leads()
+
+    def test_rebuild_command(self, leads_factory, organizer):
+        leads_factory.create_batch(organizer=organizer, size=2)
+        expected = stats()
+        LeadStats.objects.update(total=0)
+
+        call_command("rebuild_lead_stats", organizer=[organizer.user.username], stdout=io.StringIO())
+
+        assert stats() == expected
+
+
+@pytest.mark.django_db()
+class TestLeadStatsApi:
+    url = reverse("leads-stats")
+
+    def test_normal_user_can_not_see_stats_return_403(self, api_client, normal_user):
+        response = api_client.get(self.url)
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_organizer_see_own_stats(self, api_client, leads_factory, organizer, agents):
+        converted = datetime(2021, 10, 1, tzinfo=timezone.utc)
+        leads_factory.create_batch(organizer=organizer, agent=agents[0], category=None, size=2)
+        leads_factory.create(organizer=organizer, agent=agents[0], category=None, converted_date=converted)
+        leads_factory.create()
+        api_client.force_authenticate(user=organizer.user)
+
+        response = api_client.get(self.url, {"by": "agent,month"})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == [
+            {"agent": agents[0].pk, "month": "2021-09-01", "total": 3, "converted": 1, "open": 2}
+        ]
+
+    def test_agent_see_only_own_leads(self, api_client, leads_factory, organizer, agents):
+        leads_factory.create_batch(organizer=organizer, agent=agents[0], size=2)
+        leads_factory.create(organizer=organizer, agent=agents[1])
+        api_client.force_authenticate(user=agents[0].user)
+
+        response = api_client.get(self.url, {"by": "agent"})
+
+        assert response.json() == [{"agent": agents[0].pk, "total": 2, "converted": 0, "open": 2}]
+
+    def test_stats_can_be_filtered(self, api_client, admin_user, leads_factory):
+        lead = leads_factory.create()
+        leads_factory.create()
+
+        response = api_client.get(self.url, {"category": lead.category_id, "month__gte": "2021-09-01"})
+
+        assert [row["category"] for row in response.json()] == [lead.category_id]
+
+    def test_unknown_dimension_return_400(self, api_client, admin_user):
+        response = api_client.get(self.url, {"by": "email"})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_stats_cost_one_query(self, api_client, admin_user, create_leads, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            api_client.get(self.url)
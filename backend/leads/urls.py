@@ -2,8 +2,8 @@ from django.urls import path, include
 
 from rest_framework.routers import DefaultRouter
 
-from .views import (LeadDetailApiView,
-                    LeadsListApiView, CategoryViewSet)
+from .views import (LeadDetailApiView, LeadsBulkApiView, LeadsExportApiView,
+                    LeadsListApiView, LeadStatsApiView, CategoryViewSet)
 
 router = DefaultRouter()
 router.register('categories', CategoryViewSet, basename='categories')
@@ -11,7 +11,10 @@ router.register('categories', CategoryViewSet, basename='categories')
 urlpatterns = [
     # path("", api_root),
     path("leads/", LeadsListApiView.as_view(), name="leads"),
-    path("leads/<int:pk>/", LeadDetailApiView.as_view()),
+    path("leads/<int:pk>/", LeadDetailApiView.as_view(), name="lead-detail"),
+    path("leads/export/", LeadsExportApiView.as_view(), name="leads-export"),
+    path("leads/bulk/", LeadsBulkApiView.as_view(), name="leads-bulk"),
+    path("leads/stats/", LeadStatsApiView.as_view(), name="leads-stats"),
     path('', include(router.urls))
     # path("category/", CategoryListView.as_view(), name="categories"),
     # path("category/<int:pk>/", CategoryDetailView.as_view()),
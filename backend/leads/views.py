@@ -1,16 +1,35 @@
+from datetime import datetime
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.db.models import Sum
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import generics
+from rest_framework import generics, serializers, status
 from rest_framework.exceptions import ValidationError
-from rest_framework.filters import OrderingFilter, SearchFilter
+from rest_framework.filters import OrderingFilter
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
 from rest_framework_xml.renderers import XMLRenderer
 from rest_framework.viewsets import ModelViewSet
 
-from .models import Category, Lead
-from .permissions import IsAdminOrOrganizer, IsAgent, IsOrganizer
+from core.authentication import ROLE_AUTHENTICATION_CLASSES
+
+from . import stats
+from .cache import CATEGORIES_TIMEOUT, categories_key
+from .conditional import ConditionalGetMixin, make_etag
+from .fieldsets import SparseFieldsMixin
+from .filters import LeadSearchFilter
+from .models import Category, Lead, LeadStats
+from .pagination import LeadCursorPagination
+from .permissions import IsAdminOrOrganizer, IsAgent, IsOrganizer, get_lead_scope
+from .renderers import CSVRenderer, NDJSONRenderer, StreamingXMLRenderer, buffered
 from .serializers import (CategorySerializer, LeadAdminSerializer,
-                          LeadSerializer)
+                          LeadSerializer, get_values_representation,
+                          prefetch_related_objects)
 
 
 # @api_view(["GET"])
@@ -26,13 +45,10 @@ from .serializers import (CategorySerializer, LeadAdminSerializer,
 #     )
 
 
-class LeadsListApiView(generics.ListCreateAPIView):
-    permission_classes = [IsAuthenticated, IsAdminOrOrganizer]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
-    filterset_fields = ["category", "agent", "organizer"]
-    search_fields = ["description"]
-    ordering_fields = ["category", "date_added"]
-    renderer_classes = [JSONRenderer, XMLRenderer]
+class LeadScopeMixin:
+    """
+        Superuser sees all the leads, organizer sees own leads and agent sees the leads assigned to him/her
+    """
 
     def get_serializer_class(self):
         user = self.request.user
@@ -43,25 +59,282 @@ class LeadsListApiView(generics.ListCreateAPIView):
             return LeadSerializer
 
     def get_queryset(self):
-        user = self.request.user
-        if user.is_superuser:
-            return Lead.objects.all()
-        elif user.is_organizer:
-            return Lead.objects.filter(organizer=user.organizeruser)
-        elif user.is_agent:
-            return Lead.objects.filter(agent=user.agent)
-        else:
+        scope = get_lead_scope(self.request.user)
+        if scope is None:
             raise ValidationError({"error": "Your are not an agent or an organizer "})
+        return Lead.objects.filter(**scope)
+
+
+class LeadsListApiView(SparseFieldsMixin, LeadScopeMixin, ConditionalGetMixin, generics.ListCreateAPIView):
+    authentication_classes = ROLE_AUTHENTICATION_CLASSES
+    permission_classes = [IsAuthenticated, IsAdminOrOrganizer]
+    filter_backends = [DjangoFilterBackend, LeadSearchFilter, OrderingFilter]
+    filterset_fields = ["category", "agent", "organizer"]
+    ordering_fields = ["category", "date_added"]
+    renderer_classes = [JSONRenderer, XMLRenderer]
+    pagination_class = LeadCursorPagination
+
+    def list(self, request, *args, **kwargs):
+        """
+            ETag is made of the ids and updated_at of the leads on the page, so any create, update or
+            delete that changes the page changes it. The page is fetched anyway, the ETag costs
+            no extra query and no COUNT(*). There is no Last-Modified, see ConditionalGetMixin.
+
+            The page is read with values() and rendered by ValuesRepresentation, the same output as
+            the serializer without model instances. Only the columns of ?fields= / ?omit= are read.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        representation = get_values_representation(self.get_serializer_class(), self.get_fieldset())
+        names = {*representation.names, "updated_at"}
+
+        page_queryset = self.paginator.page_queryset(queryset, request, self)
+        if page_queryset is not None:
+            names.update(field.attname for field in self.paginator.fields)
+            page = self.paginator.set_page(list(page_queryset.values(*names)))
+        else:
+            page = list(queryset.values(*names))
+
+        etag = make_etag(
+            request.get_full_path(),
+            request.accepted_renderer.format,
+            self.get_serializer_class().__name__,
+            self.paginator.has_next if page_queryset is not None else None,
+            *[f"{lead['id']}@{lead['updated_at'].isoformat()}" for lead in page],
+        )
+        response = self.not_modified(request, etag)
+        if response is not None:
+            return response
+
+        data = representation.to_representation(page)
+        if page_queryset is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
 
     def get_serializer_context(self):
         return {"user": self.request.user}
         # to access the authenticated user in the serializer
 
 
-class LeadDetailApiView(generics.RetrieveUpdateDestroyAPIView):
+class LeadsExportApiView(SparseFieldsMixin, LeadScopeMixin, generics.GenericAPIView):
+    """
+        Export all the leads of the user as CSV (?format=csv), NDJSON (?format=ndjson) or XML (?format=xml).
+        The columns can be chosen with ?fields= / ?omit=.
+
+        Rows are read with a server-side cursor in chunks and written to a streaming response,
+        so memory stays the same no matter how many leads are exported.
+        The same filters as the leads list can be used (?category=, ?agent=, ?organizer=).
+    """
+
+    authentication_classes = ROLE_AUTHENTICATION_CLASSES
+    permission_classes = [IsAuthenticated, IsAdminOrOrganizer]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ["category", "agent", "organizer"]
+    renderer_classes = [CSVRenderer, NDJSONRenderer, StreamingXMLRenderer]
+    chunk_size = 2000
+
+    def get(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset()).order_by("id")
+        fields = self.get_fieldset() or self.get_serializer_class().Meta.fields
+        columns = [queryset.model._meta.get_field(name).attname for name in fields]
+        rows = queryset.values_list(*columns).iterator(chunk_size=self.chunk_size)
+
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            buffered(renderer.stream(fields, self.format_rows(rows))),
+            content_type=f"{renderer.media_type}; charset={renderer.charset}",
+        )
+        response["Content-Disposition"] = f'attachment; filename="leads.{renderer.format}"'
+        return response
+
+    @staticmethod
+    def format_rows(rows):
+        """Dates are formatted the same way as the API does"""
+        date_field = serializers.DateTimeField()
+        for row in rows:
+            yield [
+                date_field.to_representation(value) if isinstance(value, datetime) else value
+                for value in row
+            ]
+
+
+class LeadsBulkApiView(LeadScopeMixin, generics.GenericAPIView):
+    """
+        Create (POST) or update (PATCH, every item needs an "id") many leads with one request.
+
+        Related objects of all the items are loaded with one IN query per model before validation.
+        Valid items are written with bulk_create / bulk_update in batches inside a transaction.
+        Invalid items don't stop the valid ones, their errors are returned with the item's index.
+    """
+
+    authentication_classes = ROLE_AUTHENTICATION_CLASSES
+    permission_classes = [IsAuthenticated, IsAdminOrOrganizer]
+    batch_size = 500
+    max_items = 10000
+
+    def post(self, request, *args, **kwargs):
+        rows = self.get_rows(request)
+        serializer = self.get_serializer()
+        serializer.context["prefetched"] = prefetch_related_objects(serializer, rows)
+
+        leads, errors = [], []
+        for index, row in enumerate(rows):
+            try:
+                validated_data = serializer.run_validation(row)
+            except ValidationError as exc:
+                errors.append({"index": index, "errors": exc.detail})
+                continue
+            if not request.user.is_superuser:
+                validated_data["organizer"] = request.user.organizeruser
+            leads.append((index, Lead(**validated_data)))
+
+        with transaction.atomic():
+            Lead.objects.bulk_create([lead for _, lead in leads], batch_size=self.batch_size)
+            # bulk_create / bulk_update don't send post_save
+            stats.record_saved([lead for _, lead in leads])
+        results = [{"index": index, "id": lead.id} for index, lead in leads]
+
+        return self.bulk_response(results, errors, status.HTTP_201_CREATED)
+
+    def patch(self, request, *args, **kwargs):
+        rows = self.get_rows(request)
+        serializer = self.get_serializer(partial=True)
+        serializer.context["prefetched"] = prefetch_related_objects(serializer, rows)
+
+        pks, invalid = [], {}
+        for index, row in enumerate(rows):
+            try:
+                pks.append(Lead._meta.pk.to_python(row.get("id") if isinstance(row, dict) else None))
+            except DjangoValidationError as exc:
+                pks.append(None)
+                invalid[index] = exc.messages
+        instances = self.get_queryset().in_bulk([pk for pk in pks if pk is not None])
+
+        leads, fields, errors = [], set(), []
+        for index, (row, pk) in enumerate(zip(rows, pks)):
+            if index in invalid:
+                errors.append({"index": index, "errors": {"id": invalid[index]}})
+                continue
+            lead = instances.get(pk)
+            if lead is None:
+                errors.append({"index": index, "errors": {"id": ["Not found."]}})
+                continue
+            try:
+                validated_data = serializer.run_validation(row)
+            except ValidationError as exc:
+                errors.append({"index": index, "errors": exc.detail})
+                continue
+            for attr, value in validated_data.items():
+                setattr(lead, attr, value)
+            fields.update(validated_data)
+            # bulk_update doesn't set auto_now fields
+            lead.updated_at = timezone.now()
+            leads.append((index, lead))
+
+        if fields:
+            fields.add("updated_at")
+            with transaction.atomic():
+                Lead.objects.bulk_update(
+                    [lead for _, lead in leads], fields, batch_size=self.batch_size
+                )
+                stats.record_saved([lead for _, lead in leads])
+        results = [{"index": index, "id": lead.id} for index, lead in leads]
+
+        return self.bulk_response(results, errors, status.HTTP_200_OK)
+
+    def get_rows(self, request):
+        rows = request.data
+        if not isinstance(rows, list):
+            raise ValidationError({"error": "Expected a list of leads"})
+        if len(rows) > self.max_items:
+            raise ValidationError({"error": f"Send at most {self.max_items} leads per request"})
+        return rows
+
+    @staticmethod
+    def bulk_response(results, errors, success_status):
+        return Response(
+            {"results": results, "errors": errors},
+            status=success_status if results or not errors else status.HTTP_400_BAD_REQUEST,
+        )
+
+    def get_serializer_context(self):
+        return {"user": self.request.user}
+
+
+class LeadStatsApiView(generics.ListAPIView):
+    """
+        Number of leads, converted and open leads, grouped by the `by` dimensions
+        (organizer, agent, category, month; default: agent, category and month).
+        Read from LeadStats, so it costs the same whatever the number of leads.
+        Filter with agent, category, month, month__gte, month__lte (month is the first day, YYYY-MM-01).
+    """
+
+    authentication_classes = ROLE_AUTHENTICATION_CLASSES
+    permission_classes = [IsAuthenticated, IsAgent]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = {
+        "agent": ["exact"],
+        "category": ["exact"],
+        "month": ["exact", "gte", "lte"],
+    }
+    pagination_class = None
+    dimensions = ["organizer", "agent", "category", "month"]
+    default_dimensions = ["agent", "category", "month"]
+
+    def get_queryset(self):
+        # LeadStats has the organizer_id / agent_id of the scope
+        return LeadStats.objects.filter(**get_lead_scope(self.request.user))
+
+    def list(self, request, *args, **kwargs):
+        by = self.get_dimensions()
+        rows = (
+            self.filter_queryset(self.get_queryset())
+            .values(*by)
+            .annotate(total=Sum("total"), converted=Sum("converted"))
+            .filter(total__gt=0)
+            .order_by(*by)
+        )
+        return Response([{**row, "open": row["total"] - row["converted"]} for row in rows])
+
+    def get_dimensions(self):
+        by = self.request.query_params.get("by")
+        if not by:
+            return self.default_dimensions
+        by = [name.strip() for name in by.split(",")]
+        unknown = [name for name in by if name not in self.dimensions]
+        if unknown:
+            raise ValidationError({"by": [f"Unknown dimensions: {', '.join(unknown)}"]})
+        return list(dict.fromkeys(by))
+
+
+class LeadDetailApiView(SparseFieldsMixin, ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = LeadSerializer
+    authentication_classes = ROLE_AUTHENTICATION_CLASSES
     permission_classes = [IsAuthenticated, IsAdminOrOrganizer]
     queryset = Lead.objects.all()
+    # the object permissions compare organizer / agent, the validators use updated_at
+    required_fields = ["organizer", "agent", "updated_at"]
+
+    def get_queryset(self):
+        """
+            Leads of other organizers/agents are not found (404) with one lookup on the indexed
+            organizer_id / agent_id, the permissions only compare ids.
+        """
+        return super().get_queryset().filter(**get_lead_scope(self.request.user))
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        fieldset = self.get_fieldset()
+        etag = make_etag(
+            instance.pk,
+            request.accepted_renderer.format,
+            instance.updated_at.isoformat(),
+            *([",".join(fieldset)] if fieldset else []),
+        )
+        response = self.not_modified(request, etag, instance.updated_at)
+        if response is not None:
+            return response
+        serializer = self.get_serializer(instance)
+        return Response(serializer.data)
 
     def get_permissions(self):
 
@@ -72,10 +345,35 @@ class LeadDetailApiView(generics.RetrieveUpdateDestroyAPIView):
 
 
 class CategoryViewSet(ModelViewSet):
+    """
+        Categories rarely change, so list and retrieve responses are cached.
+        The cache keys contain a version that is bumped whenever a category is saved or deleted.
+    """
+
     serializer_class = CategorySerializer
+    authentication_classes = ROLE_AUTHENTICATION_CLASSES
     permission_classes = [IsAuthenticated, IsAdminOrOrganizer]
     queryset = Category.objects.all()
 
+    def list(self, request, *args, **kwargs):
+        self.get_queryset()
+        # get_queryset raises an error for users that are not agent or organizer
+        key = categories_key("list")
+        data = cache.get(key)
+        if data is None:
+            data = list(super().list(request, *args, **kwargs).data)
+            cache.set(key, data, CATEGORIES_TIMEOUT)
+        return Response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        self.get_queryset()
+        key = categories_key(f"detail:{kwargs[self.lookup_field]}")
+        data = cache.get(key)
+        if data is None:
+            data = dict(super().retrieve(request, *args, **kwargs).data)
+            cache.set(key, data, CATEGORIES_TIMEOUT)
+        return Response(data)
+
     def get_queryset(self):
         user = self.request.user
         if user.is_superuser or user.is_organizer or user.is_agent:
@@ -0,0 +1,217 @@
+"""
+    Read replicas (settings.DATABASE_REPLICAS).
+
+    ReplicaRouter sends the reads of the DATABASE_REPLICA_MODELS (leads and their stats) to a
+    replica, picked round-robin or by least replication lag (DATABASE_REPLICA_SELECTION). Other
+    models always use the primary: authentication has to see a role change or a new session at
+    once, and categories are cached for a day, a lagging replica would fill the cache with stale
+    rows. Writes and migrations go to the primary.
+
+    Replicas are only read within a request scope, opened by ReplicaPinningMiddleware. Management
+    commands, shells and signals outside of a request read the primary. A scope is pinned to the
+    primary, so the request reads its own writes, when:
+
+    - the method isn't safe (POST, PUT, PATCH, DELETE): reads before the write are consistent
+    - the request wrote through the ORM (db_for_write)
+    - the same client wrote less than READ_YOUR_WRITES_SECONDS ago. The client is the user id of
+      the JWT or the session cookie, remembered in the cache when its request wrote.
+"""
+import itertools
+import math
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import jwt
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from rest_framework_simplejwt.settings import api_settings
+
+# the ReplicaScope of the current request, None outside of requests
+_scope = ContextVar("replica_scope", default=None)
+_counter = itertools.count()
+
+POSTGRESQL_LAG = (
+    "SELECT CASE "
+    # a primary, or an idle replica that replayed everything it received
+    "WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+def pin_key(client):
+    return f"simplecrm:db:pinned:{client}"
+
+
+class ReplicaScope:
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+
+
+@contextmanager
+def replica_scope(pinned=False):
+    """Reads of the replica apps within the block may use a replica, unless pinned"""
+    scope = ReplicaScope(pinned)
+    token = _scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _scope.reset(token)
+
+
+def round_robin(replicas):
+    return replicas[next(_counter) % len(replicas)]
+
+
+class LagMonitor:
+    """
+        Replication lag of the replicas in seconds, measured at most every LAG_CHECK_INTERVAL
+        seconds per process. An unreachable replica has an infinite lag.
+    """
+
+    def __init__(self):
+        self.lags = {}
+        self.checked = -math.inf
+
+    def get_lags(self, replicas):
+        if time.monotonic() - self.checked >= settings.DATABASE_REPLICA_LAG_CHECK_INTERVAL:
+            self.lags = {alias: self.measure(alias) for alias in replicas}
+            self.checked = time.monotonic()
+        return self.lags
+
+    @staticmethod
+    def measure(alias):
+        connection = connections[alias]
+        if connection.vendor != "postgresql":
+            return 0.0
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(POSTGRESQL_LAG)
+                return float(cursor.fetchone()[0])
+        except DatabaseError:
+            return math.inf
+
+
+lag_monitor = LagMonitor()
+
+
+def least_lag(replicas):
+    """The replica with the smallest lag within DATABASE_REPLICA_MAX_LAG, None if there is none"""
+    lags = lag_monitor.get_lags(replicas)
+    max_lag = settings.DATABASE_REPLICA_MAX_LAG
+    candidates = [alias for alias in replicas if lags.get(alias, math.inf) <= max_lag]
+    return min(candidates, key=lags.get, default=None)
+
+
+SELECTIONS = {
+    "round_robin": round_robin,
+    "least_lag": least_lag,
+}
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        scope = _scope.get()
+        if scope is None or scope.pinned or not settings.DATABASE_REPLICAS:
+            return DEFAULT_DB_ALIAS
+        if model._meta.label_lower not in settings.DATABASE_REPLICA_MODELS:
+            return DEFAULT_DB_ALIAS
+        # reads within a transaction see its writes
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        replica = SELECTIONS[settings.DATABASE_REPLICA_SELECTION](settings.DATABASE_REPLICAS)
+        return replica or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        scope = _scope.get()
+        if scope is not None:
+            scope.pinned = scope.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # the replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
+
+
+def get_client(request):
+    """Who made the request: the (unverified) user id of the JWT, else the session cookie, else None"""
+    header = request.META.get(api_settings.AUTH_HEADER_NAME, "").split()
+    if len(header) == 2 and header[0] in api_settings.AUTH_HEADER_TYPES:
+        # only used to look up a pin, the token is verified by the authentication classes
+        try:
+            payload = jwt.decode(header[1], options={"verify_signature": False})
+        except jwt.InvalidTokenError:
+            return None
+        user_id = payload.get(api_settings.USER_ID_CLAIM)
+        return None if user_id is None else f"user:{user_id}"
+    session_key = request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    return session_key and f"session:{session_key}"
+
+
+def is_unsafe(request):
+    return request.method not in ("GET", "HEAD", "OPTIONS")
+
+
+class ReplicaPinningMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        client = get_client(request)
+        pinned = is_unsafe(request) or (client is not None and cache.get(pin_key(client)) is not None)
+
+        with replica_scope(pinned) as scope:
+            response = self.get_response(request)
+
+        if response.streaming:
+            # e.g. the export reads the leads while the response is sent
+            response.streaming_content = self.stream(response.streaming_content, scope, client)
+        else:
+            self.remember(scope, client)
+        return response
+
+    async def __acall__(self, request):
+        client = get_client(request)
+        pinned = is_unsafe(request) or (
+            client is not None and await cache.aget(pin_key(client)) is not None
+        )
+
+        with replica_scope(pinned) as scope:
+            response = await self.get_response(request)
+
+        if response.streaming:
+            response.streaming_content = self.stream(response.streaming_content, scope, client)
+        elif scope.wrote and client is not None:
+            await cache.aset(pin_key(client), 1, settings.READ_YOUR_WRITES_SECONDS)
+        return response
+
+    def stream(self, content, scope, client):
+        previous = _scope.get()
+        _scope.set(scope)
+        try:
+            yield from content
+        finally:
+            _scope.set(previous)
+        self.remember(scope, client)
+
+    @staticmethod
+    def remember(scope, client):
+        if scope.wrote and client is not None:
+            cache.set(pin_key(client), 1, settings.READ_YOUR_WRITES_SECONDS)
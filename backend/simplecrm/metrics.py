@@ -0,0 +1,163 @@
+"""
+    Per-endpoint Prometheus metrics, served by metrics_view at /metrics.
+
+    MetricsMiddleware records, for every request, its latency, the number of queries and the time
+    spent in the database, and the size of the response. Labels are the resolved URL name
+    ("leads", "categories-list", "user-me", ...) and the method, so the number of series stays
+    bounded: unresolved paths share the "<unresolved>" label.
+
+    Queries are counted by an execute wrapper of the request (simplecrm.query_wrappers) into a
+    plain per-request object, without any lock. The histograms are only touched once per request,
+    when the response is ready. The middleware runs sync under WSGI and async under ASGI.
+
+    Gunicorn runs several worker processes, each with its own counters. When
+    PROMETHEUS_MULTIPROC_DIR is set, prometheus_client keeps the values in files of that directory
+    and /metrics adds up the files of every worker (see gunicorn.conf.py, which empties the
+    directory on start and marks the files of exited workers).
+"""
+import os
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.http import HttpResponse
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram,
+                               generate_latest)
+from prometheus_client import multiprocess
+
+from .query_wrappers import request_wrapper
+
+LABELS = ["view", "method"]
+METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+UNRESOLVED = "<unresolved>"
+
+REQUESTS = Counter(
+    "simplecrm_http_requests_total",
+    "Requests by view, method and status code",
+    LABELS + ["status"],
+)
+LATENCY = Histogram(
+    "simplecrm_http_request_duration_seconds",
+    "Time to build the response (streamed content excluded)",
+    LABELS,
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1, 2.5, 5, 10),
+)
+DB_QUERIES = Histogram(
+    "simplecrm_db_queries_per_request",
+    "Database queries run by a request",
+    LABELS,
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+)
+DB_DURATION = Histogram(
+    "simplecrm_db_duration_seconds",
+    "Time a request spent waiting on the database",
+    LABELS,
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+RESPONSE_SIZE = Histogram(
+    "simplecrm_http_response_size_bytes",
+    "Size of the response body",
+    LABELS,
+    buckets=tuple(256 * 4 ** i for i in range(10)),
+)
+
+# (view, method) -> children of the histograms. .labels() takes the lock of the metric, a dict
+# lookup doesn't, and racing threads at worst build the same children twice.
+_children = {}
+
+
+def get_children(view, method):
+    children = _children.get((view, method))
+    if children is None:
+        children = _children[(view, method)] = tuple(
+            metric.labels(view, method) for metric in (LATENCY, DB_QUERIES, DB_DURATION, RESPONSE_SIZE)
+        )
+    return children
+
+
+def get_view_name(request):
+    match = getattr(request, "resolver_match", None)
+    return match.view_name if match is not None else UNRESOLVED
+
+
+class QueryTimer:
+    """execute_wrapper counting the queries of a request and the time they took"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        timer = QueryTimer()
+        started = time.perf_counter()
+        with request_wrapper(timer):
+            response = self.get_response(request)
+        return self.record(request, response, timer, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        timer = QueryTimer()
+        started = time.perf_counter()
+        with request_wrapper(timer):
+            response = await self.get_response(request)
+        return self.record(request, response, timer, time.perf_counter() - started)
+
+    def record(self, request, response, timer, duration):
+        view = get_view_name(request)
+        method = request.method if request.method in METHODS else "other"
+        latency, db_queries, db_duration, response_size = get_children(view, method)
+        latency.observe(duration)
+        db_queries.observe(timer.count)
+        db_duration.observe(timer.duration)
+        REQUESTS.labels(view, method, str(response.status_code)).inc()
+
+        if response.streaming:
+            response.streaming_content = self.count_streamed(response.streaming_content, response_size)
+        else:
+            response_size.observe(len(response.content))
+        return response
+
+    @staticmethod
+    def count_streamed(content, response_size):
+        size = 0
+        for chunk in content:
+            size += len(chunk)
+            yield chunk
+        response_size.observe(size)
+
+
+def get_registry():
+    """The registry of this process, or one reading the files of every worker in multiprocess mode"""
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if not path:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, path=path)
+    return registry
+
+
+def metrics_view(request):
+    """
+        Prometheus text format. Not behind authentication, nginx doesn't expose it: scrape the app
+        containers directly.
+    """
+    return HttpResponse(generate_latest(get_registry()), content_type=CONTENT_TYPE_LATEST)
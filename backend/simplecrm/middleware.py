@@ -0,0 +1,121 @@
+"""
+    Path-aware middleware stack.
+
+    The API authenticates with JWT headers: sessions, CSRF, Django's auth, messages and
+    X-Frame-Options only matter to the admin and the other HTML pages. SiteMiddleware runs
+    settings.SITE_MIDDLEWARE as a nested stack for every path outside settings.API_PATH_PREFIX and
+    skips it entirely for the API.
+
+    The nested middleware behave as if they were listed in MIDDLEWARE at the position of
+    SiteMiddleware, including their process_view (CSRF), process_exception and
+    process_template_response hooks. Under ASGI the nested stack is adapted the way Django adapts
+    MIDDLEWARE, and the API requests pass through SiteMiddleware without a thread switch.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.handlers.base import BaseHandler
+from django.core.handlers.exception import convert_exception_to_response
+from django.utils.module_loading import import_string
+
+
+class SiteMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.api_path_prefix = settings.API_PATH_PREFIX
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+            # BaseHandler doesn't wrap coroutine hooks with sync_to_async
+            self.process_view = self.aprocess_view
+            self.process_template_response = self.aprocess_template_response
+
+        # the same chain BaseHandler.load_middleware builds for MIDDLEWARE
+        adapt_method_mode = BaseHandler().adapt_method_mode
+        self.view_middleware = []
+        self.template_response_middleware = []
+        self.exception_middleware = []
+        handler = convert_exception_to_response(get_response)
+        handler_is_async = self.async_mode
+        for middleware_path in reversed(settings.SITE_MIDDLEWARE):
+            middleware = import_string(middleware_path)
+            middleware_can_sync = getattr(middleware, "sync_capable", True)
+            middleware_can_async = getattr(middleware, "async_capable", False)
+            if not handler_is_async and middleware_can_sync:
+                middleware_is_async = False
+            else:
+                middleware_is_async = middleware_can_async
+            try:
+                middleware = middleware(adapt_method_mode(middleware_is_async, handler, handler_is_async))
+            except MiddlewareNotUsed:
+                continue
+            if hasattr(middleware, "process_view"):
+                self.view_middleware.insert(0, adapt_method_mode(self.async_mode, middleware.process_view))
+            if hasattr(middleware, "process_template_response"):
+                self.template_response_middleware.append(
+                    adapt_method_mode(self.async_mode, middleware.process_template_response)
+                )
+            if hasattr(middleware, "process_exception"):
+                self.exception_middleware.append(adapt_method_mode(False, middleware.process_exception))
+            handler = convert_exception_to_response(middleware)
+            handler_is_async = middleware_is_async
+        self.site_handler = adapt_method_mode(self.async_mode, handler, handler_is_async)
+
+    def is_api(self, request):
+        return request.path_info.startswith(self.api_path_prefix)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if self.is_api(request):
+            return self.get_response(request)
+        return self.site_handler(request)
+
+    async def __acall__(self, request):
+        if self.is_api(request):
+            return await self.get_response(request)
+        return await self.site_handler(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if self.is_api(request):
+            return None
+        for process_view in self.view_middleware:
+            response = process_view(request, view_func, view_args, view_kwargs)
+            if response is not None:
+                return response
+        return None
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        if self.is_api(request):
+            return None
+        for process_view in self.view_middleware:
+            response = await process_view(request, view_func, view_args, view_kwargs)
+            if response is not None:
+                return response
+        return None
+
+    def process_template_response(self, request, response):
+        if self.is_api(request):
+            return response
+        for process_template_response in self.template_response_middleware:
+            response = process_template_response(request, response)
+        return response
+
+    async def aprocess_template_response(self, request, response):
+        if self.is_api(request):
+            return response
+        for process_template_response in self.template_response_middleware:
+            response = await process_template_response(request, response)
+        return response
+
+    def process_exception(self, request, exception):
+        if self.is_api(request):
+            return None
+        for process_exception in self.exception_middleware:
+            response = process_exception(request, exception)
+            if response is not None:
+                return response
+        return None
@@ -0,0 +1,166 @@
+"""
+    Opt-in slow-query and N+1 detector for API requests (settings.QUERY_INSPECTOR).
+
+    QueryInspectorMiddleware wraps the queries of the requests under PATH_PREFIX with an execute
+    wrapper (simplecrm.query_wrappers), sync under WSGI and async under ASGI. Every statement is reduced to a fingerprint (literals and
+    placeholders replaced by ?), and two kinds of findings are logged to the "simplecrm.queries"
+    logger as one JSON object per line:
+
+    - "n_plus_one": a fingerprint ran more than REPEAT_THRESHOLD times in the request
+    - "slow_query": a statement took more than SLOW_QUERY_MS
+
+    Both carry the view name and the first frame of leads/ or core/ that issued the statement
+    (e.g. "leads/permissions.py:27 in has_permission"). Parameters are never logged.
+    When ENABLED is false the middleware removes itself on startup.
+"""
+import json
+import logging
+import os
+import re
+import sys
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .query_wrappers import request_wrapper
+
+logger = logging.getLogger("simplecrm.queries")
+
+# apps whose frames are reported as the origin of a statement
+FRAME_APPS = ["leads", "core"]
+
+LITERALS = re.compile(r"'(?:[^']|'')*'|%s|\b\d+(?:\.\d+)?\b")
+PLACEHOLDER_LISTS = re.compile(r"\(\?(?:, \?)+\)")
+VALUES_LISTS = re.compile(r"\(\.\.\.\)(?:, \(\.\.\.\))+")
+WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint(sql):
+    """
+        The statement without its values, so the queries of an N+1 look the same:
+        literals and placeholders become ?, lists of them (IN, VALUES) are collapsed.
+    """
+    sql = LITERALS.sub("?", WHITESPACE.sub(" ", sql.strip()))
+    sql = PLACEHOLDER_LISTS.sub("(...)", sql)
+    return VALUES_LISTS.sub("(...), ...", sql)
+
+
+def get_frame_prefixes():
+    return tuple(os.path.join(apps.get_app_config(label).path, "") for label in FRAME_APPS)
+
+
+def find_frame(prefixes):
+    """'<path>:<line> in <function>' of the innermost frame in one of the FRAME_APPS, or None"""
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(prefixes):
+            path = os.path.relpath(filename, settings.BASE_DIR)
+            return f"{path}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return None
+
+
+class RequestQueries:
+    """execute_wrapper collecting the findings of one request, its queries run one at a time"""
+
+    def __init__(self, repeat_threshold, slow_seconds, prefixes):
+        self.repeat_threshold = repeat_threshold
+        self.slow_seconds = slow_seconds
+        self.prefixes = prefixes
+        self.counts = {}
+        self.repeated = {}
+        self.slow = []
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.count += 1
+            self.duration += duration
+
+            key = fingerprint(sql)
+            count = self.counts[key] = self.counts.get(key, 0) + 1
+            if count == self.repeat_threshold + 1:
+                self.repeated[key] = find_frame(self.prefixes)
+            if duration > self.slow_seconds:
+                self.slow.append((key, duration, find_frame(self.prefixes)))
+
+    def findings(self):
+        for key, frame in self.repeated.items():
+            yield {"event": "n_plus_one", "fingerprint": key, "count": self.counts[key], "frame": frame}
+        for key, duration, frame in self.slow:
+            yield {
+                "event": "slow_query", "fingerprint": key, "duration_ms": round(duration * 1000, 3), "frame": frame,
+            }
+
+
+class QueryInspectorMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        config = settings.QUERY_INSPECTOR
+        if not config["ENABLED"]:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.path_prefix = config["PATH_PREFIX"]
+        self.repeat_threshold = config["REPEAT_THRESHOLD"]
+        self.slow_seconds = config["SLOW_QUERY_MS"] / 1000
+        self.prefixes = get_frame_prefixes()
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not request.path.startswith(self.path_prefix):
+            return self.get_response(request)
+
+        queries = RequestQueries(self.repeat_threshold, self.slow_seconds, self.prefixes)
+        with request_wrapper(queries):
+            response = self.get_response(request)
+        return self.inspect(request, response, queries)
+
+    async def __acall__(self, request):
+        if not request.path.startswith(self.path_prefix):
+            return await self.get_response(request)
+
+        queries = RequestQueries(self.repeat_threshold, self.slow_seconds, self.prefixes)
+        with request_wrapper(queries):
+            response = await self.get_response(request)
+        return self.inspect(request, response, queries)
+
+    def inspect(self, request, response, queries):
+        if response.streaming:
+            # e.g. the export reads the leads while the response is sent
+            response.streaming_content = self.inspect_streamed(response.streaming_content, request, queries)
+        else:
+            self.log(request, queries)
+        return response
+
+    def inspect_streamed(self, content, request, queries):
+        with request_wrapper(queries):
+            yield from content
+        self.log(request, queries)
+
+    @staticmethod
+    def log(request, queries):
+        match = request.resolver_match
+        request_fields = {
+            "method": request.method,
+            "path": request.path,
+            "view": match.view_name if match is not None else None,
+            "queries": queries.count,
+            "db_ms": round(queries.duration * 1000, 3),
+        }
+        for finding in queries.findings():
+            logger.warning(json.dumps({**finding, **request_fields}))
@@ -0,0 +1,50 @@
+"""
+    Execute wrappers of the current request, on every database connection.
+
+    connection.execute_wrapper() only wraps the connections of the calling thread. Under ASGI the
+    queries of a request run in the threads of sync_to_async(), so the wrappers of the request are
+    kept in a ContextVar, which sync_to_async() copies into these threads. call_request_wrappers
+    is installed once on every connection and passes the queries through them.
+"""
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+_wrappers = ContextVar("request_execute_wrappers", default=())
+
+
+def call_request_wrappers(execute, sql, params, many, context):
+    # the first wrapper is the outermost, as with nested connection.execute_wrapper() blocks
+    for wrapper in reversed(_wrappers.get()):
+        execute = functools.partial(wrapper, execute)
+    return execute(sql, params, many, context)
+
+
+def install(connection):
+    if call_request_wrappers not in connection.execute_wrappers:
+        # first: connection.execute_wrapper() removes the last wrapper when its block exits
+        connection.execute_wrappers.insert(0, call_request_wrappers)
+
+
+@receiver(connection_created)
+def install_on_new_connection(sender, connection, **kwargs):
+    install(connection)
+
+
+@contextmanager
+def request_wrapper(wrapper):
+    """Queries run within the block, in this thread or in the ones it awaits, go through wrapper"""
+    # connections of this thread opened before this module was imported
+    for connection in connections.all(initialized_only=True):
+        install(connection)
+    previous = _wrappers.get()
+    # set() instead of a token: a streamed response leaves and enters the block between chunks
+    _wrappers.set((*previous, wrapper))
+    try:
+        yield
+    finally:
+        _wrappers.set(previous)
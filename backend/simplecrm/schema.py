@@ -0,0 +1,111 @@
+"""
+    Pre-rendered OpenAPI schema.
+
+    drf_yasg walks every route and serializer to build the schema, which the Swagger and ReDoc
+    pages used to do on every load. The schema only changes with the code, so it is rendered
+    once per code version (manage.py generate_openapi_schema at deploy time) to
+    OPENAPI_SCHEMA_DIR/openapi-<version>.json|yaml and schema_file_view serves those bytes with a
+    strong ETag. A version without a file is rendered on its first request.
+
+    The version is settings.CODE_VERSION (e.g. the git commit of the image), or a hash of the
+    Python sources when it isn't set.
+"""
+import hashlib
+import os
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.http import require_safe
+from drf_yasg import openapi
+from drf_yasg.codecs import OpenAPICodecJson, OpenAPICodecYaml
+from drf_yasg.generators import OpenAPISchemaGenerator
+
+API_INFO = openapi.Info(
+    title="SimpleCRM",
+    default_version='v1',
+    description="SimpleCRM is a simple crm based on Django rest framework",
+    terms_of_service="https://www.myapp.com/policies/terms/",
+    contact=openapi.Contact(email="contact@myapp.local"),
+    license=openapi.License(name="Good License"),
+)
+
+CODECS = {
+    "json": OpenAPICodecJson,
+    "yaml": OpenAPICodecYaml,
+}
+# packages whose code ends up in the schema
+SOURCE_DIRS = ["core", "leads", "simplecrm"]
+
+# (version, format) -> (etag, content) of this process
+_schemas = {}
+
+
+@lru_cache(maxsize=None)
+def get_code_version():
+    if settings.CODE_VERSION:
+        return settings.CODE_VERSION
+    digest = hashlib.sha1()
+    for name in SOURCE_DIRS:
+        for path in sorted(Path(settings.BASE_DIR, name).rglob("*.py")):
+            digest.update(str(path.relative_to(settings.BASE_DIR)).encode())
+            digest.update(path.read_bytes())
+    return digest.hexdigest()[:12]
+
+
+def schema_path(version, schema_format):
+    return Path(settings.OPENAPI_SCHEMA_DIR) / f"openapi-{version}.{schema_format}"
+
+
+def render_schema(schema_format):
+    """The public schema, without the host of a request"""
+    schema = OpenAPISchemaGenerator(API_INFO).get_schema(request=None, public=True)
+    return CODECS[schema_format](validators=[]).encode(schema)
+
+
+def write_schema(version, schema_format):
+    """Render the schema to its file, replaced atomically so a reader never sees half of it"""
+    path = schema_path(version, schema_format)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    content = render_schema(schema_format)
+    descriptor, temporary = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(descriptor, "wb") as file:
+            file.write(content)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+    return path, content
+
+
+def get_schema(schema_format):
+    """(etag, content) of the schema of the running code"""
+    version = get_code_version()
+    schema = _schemas.get((version, schema_format))
+    if schema is None:
+        try:
+            content = schema_path(version, schema_format).read_bytes()
+        except FileNotFoundError:
+            content = write_schema(version, schema_format)[1]
+        # the same bytes for as long as this version is deployed: a strong validator
+        etag = f'"{hashlib.sha256(content).hexdigest()[:32]}"'
+        schema = _schemas[(version, schema_format)] = (etag, content)
+    return schema
+
+
+@require_safe
+def schema_file_view(request, schema_format):
+    if schema_format not in CODECS:
+        raise Http404
+    etag, content = get_schema(schema_format)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(content, content_type=CODECS[schema_format].media_type)
+    response["ETag"] = etag
+    # clients revalidate, which costs a 304 until the next deploy
+    patch_cache_control(response, public=True, no_cache=True)
+    return response
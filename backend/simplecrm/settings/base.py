@@ -42,7 +42,6 @@ INSTALLED_APPS = [
     'rest_framework',
     'django_filters',
     'djoser',
-    "debug_toolbar",
     'drf_yasg',
 
     # Local
@@ -52,16 +51,30 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
-    "debug_toolbar.middleware.DebugToolbarMiddleware",
+    # first, so the latency covers every other middleware
+    "simplecrm.metrics.MetricsMiddleware",
+    "simplecrm.query_inspector.QueryInspectorMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
+    "simplecrm.db_router.ReplicaPinningMiddleware",
+    # SITE_MIDDLEWARE, skipped for API_PATH_PREFIX
+    "simplecrm.middleware.SiteMiddleware",
+]
+
+# JWT authenticated, the API needs neither sessions nor CSRF, see simplecrm/middleware.py
+API_PATH_PREFIX = '/api/'
+
+SITE_MIDDLEWARE = [
+    "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# the admin looks for its middleware in MIDDLEWARE, they are in SITE_MIDDLEWARE
+SILENCED_SYSTEM_CHECKS = ['admin.E408', 'admin.E409', 'admin.E410']
+
 ROOT_URLCONF = "simplecrm.urls"
 
 TEMPLATES = [
@@ -110,6 +123,32 @@ AUTH_PASSWORD_VALIDATORS = [
 #     }
 # }
 
+# Read replicas, see simplecrm/db_router.py
+# aliases of DATABASES, added by the development and production profiles
+
+DATABASE_ROUTERS = ['simplecrm.db_router.ReplicaRouter']
+
+DATABASE_REPLICAS = env.list('DATABASE_REPLICAS', default=[])
+
+DATABASE_REPLICA_MODELS = ['leads.lead', 'leads.leadstats']
+
+# round_robin or least_lag
+DATABASE_REPLICA_SELECTION = env('DATABASE_REPLICA_SELECTION', default='round_robin')
+
+# least_lag: seconds between two measures of the lag, replicas further behind are skipped
+DATABASE_REPLICA_LAG_CHECK_INTERVAL = 1
+DATABASE_REPLICA_MAX_LAG = 5
+
+# a client reads from the primary for this long after it wrote
+READ_YOUR_WRITES_SECONDS = 5
+
+# Cache
+# locmemcache:// by default, e.g. redis://127.0.0.1:6379/1 or pymemcache://127.0.0.1:11211 in production
+
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+
 # Internationalization
 # https://docs.djangoproject.com/en/4.1/topics/i18n/
 
@@ -143,11 +182,15 @@ REST_FRAMEWORK = {
     #     'rest_framework.permissions.IsAuthenticated',
     # ],
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'core.authentication.CachedJWTAuthentication',
     ),
 }
 
 DJOSER = {
+    # JWT only, rest_framework.authtoken is not installed
+    'TOKEN_MODEL': None,
+    'PASSWORD_RESET_CONFIRM_URL': 'password/reset/confirm/{uid}/{token}',
+    'USERNAME_RESET_CONFIRM_URL': 'username/reset/confirm/{uid}/{token}',
     'PERMISSIONS': {
         'user_create': ['rest_framework.permissions.IsAdminUser'],
     },
@@ -158,6 +201,60 @@ DJOSER = {
     }
 }
 
+# Slow-query and N+1 detector, see simplecrm/query_inspector.py
+
+QUERY_INSPECTOR = {
+    'ENABLED': env.bool('QUERY_INSPECTOR', default=False),
+    'PATH_PREFIX': API_PATH_PREFIX,
+    # a statement running more often than this in one request is a probable N+1
+    'REPEAT_THRESHOLD': env.int('QUERY_INSPECTOR_REPEAT_THRESHOLD', default=5),
+    'SLOW_QUERY_MS': env.int('QUERY_INSPECTOR_SLOW_QUERY_MS', default=100),
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        # the messages are JSON objects
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'queries': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'message',
+        },
+    },
+    'loggers': {
+        'simplecrm.queries': {
+            'handlers': ['queries'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+if env('QUERY_INSPECTOR_LOG', default=None):
+    LOGGING['handlers']['queries'] = {
+        'class': 'logging.handlers.WatchedFileHandler',
+        'filename': env('QUERY_INSPECTOR_LOG'),
+        'formatter': 'message',
+    }
+
+# Pre-rendered OpenAPI schema, see simplecrm/schema.py
+
+# e.g. the git commit of the deployed image, a hash of the sources when unset
+CODE_VERSION = env('CODE_VERSION', default=None)
+
+OPENAPI_SCHEMA_DIR = env('OPENAPI_SCHEMA_DIR', default=str(BASE_DIR / 'schema'))
+
+SWAGGER_SETTINGS = {
+    'SPEC_URL': ('schema-file', {'schema_format': 'json'}),
+}
+
+REDOC_SETTINGS = {
+    'SPEC_URL': ('schema-file', {'schema_format': 'json'}),
+}
+
 SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('JWT',),
     'ACCESS_TOKEN_LIFETIME': timedelta(days=10)
@@ -1,5 +1,15 @@
 from .base import *
 
+# dev-only apps, never imported by the production profile
+INSTALLED_APPS = INSTALLED_APPS + ["debug_toolbar"]
+
+SECURITY_MIDDLEWARE_INDEX = MIDDLEWARE.index("django.middleware.security.SecurityMiddleware")
+MIDDLEWARE = [
+    *MIDDLEWARE[:SECURITY_MIDDLEWARE_INDEX],
+    "debug_toolbar.middleware.DebugToolbarMiddleware",
+    *MIDDLEWARE[SECURITY_MIDDLEWARE_INDEX:],
+]
+
 DATABASES = {
     'default': {
         'ENGINE': env('PG_ENGINE'),
@@ -12,3 +22,9 @@ DATABASES = {
     }
 }
 
+# the same server by default: set DATABASE_REPLICAS=replica to try the replica routing locally
+DATABASES['replica'] = {
+    **DATABASES['default'],
+    'HOST': env('PG_REPLICA_HOST', default=DATABASES['default']['HOST']),
+    'TEST': {'MIRROR': 'default'},
+}
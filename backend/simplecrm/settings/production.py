@@ -1 +1,37 @@
-from .base import *
\ No newline at end of file
+from .base import *
+
+# API-only profile: no dev apps (see development.py), no browsable API
+
+DEBUG = False
+
+ALLOWED_HOSTS = env.list('ALLOWED_HOSTS', default=["*"])
+
+DATABASES = {
+    'default': {
+        'ENGINE': env('PG_ENGINE', default='django.db.backends.postgresql'),
+        'NAME': env("PG_DB"),
+        'USER': env("PG_USER"),
+        'PASSWORD': env("PG_PASSWORD"),
+        'HOST': env("PG_HOST"),
+        'PORT': env("PG_PORT"),
+        # one connection per worker thread instead of one per request
+        'CONN_MAX_AGE': env.int('CONN_MAX_AGE', default=60),
+        'CONN_HEALTH_CHECKS': True,
+    }
+}
+
+# PG_REPLICA_HOSTS=host1,host2: replica0, replica1 with the credentials of the primary
+for index, host in enumerate(env.list('PG_REPLICA_HOSTS', default=[])):
+    DATABASES[f'replica{index}'] = {**DATABASES['default'], 'HOST': host}
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    # views with their own renderers (export, XML) keep them
+    'DEFAULT_RENDERER_CLASSES': (
+        'rest_framework.renderers.JSONRenderer',
+    ),
+}
+
+# nginx terminates TLS
+SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
@@ -1,19 +1,17 @@
+from django.apps import apps
 from django.contrib import admin
 from django.urls import path, include
 from rest_framework import permissions
 from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
+from rest_framework_simplejwt.views import TokenObtainPairView
+
+from core.serializers import TokenObtainPairSerializer
+from simplecrm.metrics import metrics_view
+from simplecrm.schema import API_INFO, schema_file_view
 
 
 schema_view = get_schema_view(
-   openapi.Info(
-      title="SimpleCRM",
-      default_version='v1',
-      description="SimpleCRM is a simple crm based on Django rest framework",
-      terms_of_service="https://www.myapp.com/policies/terms/",
-      contact=openapi.Contact(email="contact@myapp.local"),
-      license=openapi.License(name="Good License"),
-   ),
+   API_INFO,
    public=True,
    permission_classes=[permissions.AllowAny],
 )
@@ -21,13 +19,24 @@ schema_view = get_schema_view(
 urlpatterns = [
     path("admin/", admin.site.urls),
     path('api/auth/', include('djoser.urls'), ),
+    path(
+        'api/auth/jwt/create/',
+        TokenObtainPairView.as_view(serializer_class=TokenObtainPairSerializer),
+        name='jwt-create',
+    ),
     path('api/auth/', include('djoser.urls.jwt')),
     path("api/", include('leads.urls')),
+    path("api/async/", include('leads.async_urls')),
     # path("api/", include('leads.urls')),
 
+    # the pages load the pre-rendered schema, see simplecrm/schema.py
+    path('openapi.<str:schema_format>', schema_file_view, name='schema-file'),
     path('', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
     path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
 
-    path('__debug__/', include('debug_toolbar.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
 
+if apps.is_installed('debug_toolbar'):
+    urlpatterns.append(path('__debug__/', include('debug_toolbar.urls')))
+